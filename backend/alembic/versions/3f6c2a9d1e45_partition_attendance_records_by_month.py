@@ -0,0 +1,116 @@
+"""Partition attendance_records by month on check_in_time
+
+Revision ID: 3f6c2a9d1e45
+Revises: 89b362abaff7
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6c2a9d1e45'
+down_revision: Union[str, Sequence[str], None] = '89b362abaff7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created ahead of the current month; later ones come from
+# app.services.partition_service (scripts/maintain_partitions.py)
+MONTHS_AHEAD = 3
+
+
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"attendance_records_y{month.year}m{month.month:02d}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    # Partition key columns must be part of the primary key and cannot be NULL
+    op.execute("UPDATE attendance_records SET check_in_time = created_at WHERE check_in_time IS NULL")
+
+    op.execute("ALTER TABLE attendance_records RENAME TO attendance_records_unpartitioned")
+    op.execute("ALTER TABLE attendance_records_unpartitioned RENAME CONSTRAINT attendance_records_pkey TO attendance_records_unpartitioned_pkey")
+
+    op.execute("""
+        CREATE TABLE attendance_records (
+            LIKE attendance_records_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE (check_in_time)
+    """)
+    op.execute("ALTER TABLE attendance_records ALTER COLUMN check_in_time SET NOT NULL")
+    op.execute("ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_pkey PRIMARY KEY (id, check_in_time)")
+    op.create_foreign_key(None, 'attendance_records', 'employees', ['employee_id'], ['id'])
+    op.create_foreign_key(None, 'attendance_records', 'employees', ['approved_by'], ['id'])
+    op.create_foreign_key(None, 'attendance_records', 'work_shifts', ['shift_id'], ['id'])
+    op.create_index('ix_attendance_records_employee_check_in', 'attendance_records', ['employee_id', 'check_in_time'])
+
+    # One partition per month from the oldest record to a few months ahead (or
+    # to the newest record, if later), plus a default partition for anything
+    # outside that range. No existing row starts out in the default partition:
+    # PostgreSQL would refuse to create the partition of its month later on.
+    oldest = newest = None
+    if not context.is_offline_mode():
+        oldest, newest = bind.execute(sa.text(
+            "SELECT min(check_in_time), max(check_in_time) FROM attendance_records_unpartitioned"
+        )).one()
+    today = datetime.utcnow()
+    month = _month_start(oldest or today)
+    last = _month_start(today)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    if newest is not None:
+        last = max(last, _month_start(newest))
+
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {_partition_name(month)} PARTITION OF attendance_records "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+    op.execute("CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT")
+
+    # Move the data; PostgreSQL routes each row to its partition
+    op.execute("INSERT INTO attendance_records SELECT * FROM attendance_records_unpartitioned")
+
+    op.execute("DROP TABLE attendance_records_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE attendance_records RENAME TO attendance_records_partitioned")
+    op.execute("ALTER TABLE attendance_records_partitioned RENAME CONSTRAINT attendance_records_pkey TO attendance_records_partitioned_pkey")
+    op.execute("ALTER INDEX ix_attendance_records_employee_check_in RENAME TO ix_attendance_records_partitioned_employee_check_in")
+
+    op.execute("""
+        CREATE TABLE attendance_records (
+            LIKE attendance_records_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        )
+    """)
+    op.execute("ALTER TABLE attendance_records ALTER COLUMN check_in_time DROP NOT NULL")
+    op.execute("ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_pkey PRIMARY KEY (id)")
+    op.create_foreign_key(None, 'attendance_records', 'employees', ['employee_id'], ['id'])
+    op.create_foreign_key(None, 'attendance_records', 'employees', ['approved_by'], ['id'])
+    op.create_foreign_key(None, 'attendance_records', 'work_shifts', ['shift_id'], ['id'])
+
+    op.execute("INSERT INTO attendance_records SELECT * FROM attendance_records_partitioned")
+    # Dropping the parent drops all attached partitions with it
+    op.execute("DROP TABLE attendance_records_partitioned")
@@ -0,0 +1,61 @@
+"""Add department_closure table and backfill employee_count
+
+Revision ID: 7b2e4f8c9a10
+Revises: 3f6c2a9d1e45
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4f8c9a10'
+down_revision: Union[str, Sequence[str], None] = '3f6c2a9d1e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'department_closure',
+        sa.Column('ancestor_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('descendant_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('depth', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_department_closure_descendant', 'department_closure', ['descendant_id', 'depth'])
+
+    # Closure rows from the existing parent pointers
+    op.execute("""
+        INSERT INTO department_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM departments
+            UNION ALL
+            SELECT tree.ancestor_id, d.id, tree.depth + 1
+            FROM tree JOIN departments d ON d.parent_department_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+    """)
+
+    # Levels and direct active employee counts that nothing maintained before
+    op.execute("""
+        UPDATE departments SET department_level = (
+            SELECT max(depth) + 1 FROM department_closure WHERE descendant_id = departments.id
+        )
+    """)
+    op.execute("""
+        UPDATE departments SET employee_count = (
+            SELECT count(*) FROM employees
+            WHERE employees.department_id = departments.id AND employees.is_active
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_department_closure_descendant', table_name='department_closure')
+    op.drop_table('department_closure')
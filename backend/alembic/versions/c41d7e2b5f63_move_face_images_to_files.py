@@ -0,0 +1,142 @@
+"""Move inline registration face images out of employees.face_images
+
+Revision ID: c41d7e2b5f63
+Revises: 7b2e4f8c9a10
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import base64
+import hashlib
+import io
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+from PIL import Image
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2b5f63'
+down_revision: Union[str, Sequence[str], None] = '7b2e4f8c9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the file layout as of this revision; later changes to
+# app.services.file_service must not change what this migration does.
+INLINE_IMAGE_MIN_LENGTH = 512
+BATCH_SIZE = 100
+MIME_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif", "bmp": "image/bmp"}
+
+employees = sa.table(
+    "employees",
+    sa.column("id", UUID(as_uuid=True)),
+    sa.column("face_images", ARRAY(sa.String)),
+)
+
+
+def _face_image_root() -> str:
+    from app.core.config import settings
+
+    return os.path.abspath(settings.FACE_IMAGE_DIR)
+
+
+def _is_inline(value) -> bool:
+    return bool(value) and (value.startswith("data:") or len(value) >= INLINE_IMAGE_MIN_LENGTH)
+
+
+def _decode(data: str) -> bytes:
+    if data.startswith("data:"):
+        data = data.split(",", 1)[1]
+    return base64.b64decode(data)
+
+
+def _reference_path(root: str, reference: str) -> str:
+    path = os.path.abspath(os.path.join(root, reference))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("Invalid face image reference")
+    return path
+
+
+def _save(root: str, employee_id, image_data: bytes) -> str:
+    with Image.open(io.BytesIO(image_data)) as image:
+        extension = (image.format or "jpeg").lower().replace("jpeg", "jpg")
+    reference = f"{employee_id}/{hashlib.sha256(image_data).hexdigest()[:20]}.{extension}"
+    path = _reference_path(root, reference)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(image_data)
+        os.replace(tmp_path, path)
+    return reference
+
+
+def _inline(root: str, reference: str) -> str:
+    with open(_reference_path(root, reference), "rb") as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    extension = reference.rsplit(".", 1)[-1].lower()
+    return f"data:{MIME_TYPES.get(extension, 'image/jpeg')};base64,{data}"
+
+
+def _rewrite_face_images(convert) -> int:
+    """Walk employees in primary-key batches, passing each array value through convert.
+
+    convert returns the replacement value, or None to drop it. Returns the
+    number of values replaced.
+    """
+    connection = op.get_bind()
+    changed = 0
+    last_id = None
+    while True:
+        query = sa.select(employees.c.id, employees.c.face_images).where(employees.c.face_images.isnot(None))
+        if last_id is not None:
+            query = query.where(employees.c.id > last_id)
+        rows = connection.execute(query.order_by(employees.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            return changed
+        for employee_id, images in rows:
+            values = []
+            for image in images or []:
+                try:
+                    value = convert(employee_id, image)
+                except Exception as e:
+                    # An unreadable image is dropped rather than blocking the migration
+                    print(f"Dropping unreadable face image of employee {employee_id}: {e}")
+                    continue
+                changed += value != image
+                values.append(value)
+            if values != list(images or []):
+                connection.execute(
+                    sa.update(employees).where(employees.c.id == employee_id).values(face_images=values or None)
+                )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Data-only: images are written under FACE_IMAGE_DIR and the arrays keep
+    # file references. Nothing to do when only rendering SQL.
+    if context.is_offline_mode():
+        return
+    root = _face_image_root()
+
+    def to_reference(employee_id, image):
+        return _save(root, employee_id, _decode(image)) if _is_inline(image) else image
+
+    print(f"Extracted {_rewrite_face_images(to_reference)} inline face images")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The previous code expects the images themselves in the array, so read
+    # the files back as data URLs. The files are left in place.
+    if context.is_offline_mode():
+        raise NotImplementedError("Re-inlining face images needs a database connection; run the downgrade online")
+    root = _face_image_root()
+
+    def to_inline(employee_id, image):
+        return image if _is_inline(image) else _inline(root, image)
+
+    print(f"Re-inlined {_rewrite_face_images(to_inline)} face images")
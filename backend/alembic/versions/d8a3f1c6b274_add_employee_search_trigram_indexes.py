@@ -0,0 +1,41 @@
+"""Add pg_trgm GIN indexes for employee search
+
+Revision ID: d8a3f1c6b274
+Revises: c41d7e2b5f63
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f1c6b274'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e2b5f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Expression indexes matching the lower(...) terms used by app.services.search_service
+SEARCH_INDEXES = {
+    'ix_employees_full_name_trgm': 'full_name',
+    'ix_employees_employee_code_trgm': 'employee_code',
+    'ix_employees_email_trgm': 'email',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in SEARCH_INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON employees USING gin (lower({column}) gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
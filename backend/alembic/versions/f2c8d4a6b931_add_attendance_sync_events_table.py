@@ -0,0 +1,43 @@
+"""Add attendance_sync_events table
+
+Revision ID: f2c8d4a6b931
+Revises: e5b9c2a7d416
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8d4a6b931'
+down_revision: Union[str, Sequence[str], None] = 'e5b9c2a7d416'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'attendance_sync_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('device_id', sa.String(length=100), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+        sa.Column('action', sa.String(length=20), nullable=False),
+        sa.Column('event_time', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=30), nullable=False),
+        sa.Column('employee_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('employees.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('attendance_record_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('message', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('device_id', 'idempotency_key'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('attendance_sync_events')
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.api.v1.auth import get_current_admin
+from app.core.admission import get_admission_controller
+from app.core.database import get_db
+from app.core.db_routing import get_replica_router
+from app.core.invalidation import get_invalidation_bus
+from app.core.rate_limit import get_rate_limiter
+from app.models.user import User
+from app.services.frame_quality import get_frame_quality_gate
+from app.services.payroll_service import PayrollService
+
+router = APIRouter()
+
+@router.get("/db/pools")
+async def get_db_pool_stats(current_user: User = Depends(get_current_admin)):
+    """Connection pool statistics and replica health per database target"""
+    return get_replica_router().pool_stats()
+
+@router.get("/admission")
+async def get_admission_stats(current_user: User = Depends(get_current_admin)):
+    """In-flight and queued requests per admission class with recent queue-time percentiles"""
+    return get_admission_controller().snapshot()
+
+@router.get("/rate-limits")
+async def get_rate_limit_stats(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin)
+):
+    """Kiosk rate-limit rules and per-device counters, most limited first"""
+    return get_rate_limiter().snapshot(limit)
+
+@router.get("/invalidation")
+async def get_invalidation_stats(current_user: User = Depends(get_current_admin)):
+    """Cache invalidation bus backend, event counters and per-cache subscriptions"""
+    return get_invalidation_bus().snapshot()
+
+@router.get("/frame-quality")
+async def get_frame_quality_stats(current_user: User = Depends(get_current_admin)):
+    """Frame-quality gate thresholds and rejections per reason in this worker"""
+    return get_frame_quality_gate().snapshot()
+
+@router.post("/payroll/recalculate")
+async def recalculate_payroll(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Recompute work hours, late/early minutes and overtime for a month against employee shifts"""
+    try:
+        return await run_in_threadpool(PayrollService(db).recalculate_month, year, month)
+    except Exception as e:
+        db.rollback()
+        print(f"Error recalculating payroll for {year}-{month:02d}: {e}")
+        raise HTTPException(status_code=500, detail="Payroll recalculation failed")
@@ -1,84 +1,127 @@
 # app/api/v1/attendance.py
-from fastapi import APIRouter, HTTPException, Depends, Body
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, time, timedelta
 from typing import Optional, Dict, Any
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.attendance import AttendanceRecord, AttendanceStatus
 from app.models.employee import Employee
-from app.core.database import get_db
+from app.core.database import current_engine, get_db, get_async_db
+from app.core.db_routing import get_async_read_db, get_replica_router
 from app.core.config import settings
+from app.core.invalidation import ATTENDANCE, get_invalidation_bus
+from app.core.kiosk_protocol import (
+    KIOSK_OPENAPI, KIOSK_SYNC_OPENAPI, kiosk_response, parse_kiosk_request, parse_kiosk_sync_request
+)
+from app.core.profiling import profile_stage, profiled_threadpool
+from app.core.responses import FastJSONResponse
+from app.api.v1.auth import get_current_user
+from app.models.user import User
+from app.schemas.attendance import KioskAttendanceRequest, KioskSyncRequest
+from app.services.attendance_service import (
+    LOCAL_TZ, AttendanceSyncService, calculate_work_hours, local_now, parse_local_time
+)
+from app.services.directory_service import get_employee_directory
+from app.services.export_service import AttendanceExporter, ExportError, EXPORT_FORMATS
 from app.services.file_service import FileService
-import pytz
-
-# Set timezone to Bangkok/Vietnam (UTC+7)
-LOCAL_TZ = pytz.timezone('Asia/Bangkok')
-
-# Initialize face recognition service
-def get_face_service():
-    """Get face recognition service - uses SimpleFaceService"""
-    from app.services.simple_face_service import SimpleFaceService
-    return SimpleFaceService()
+from app.services.frame_quality import FrameQualityError, get_frame_quality_gate
+from app.services.simple_face_service import SimpleFaceService, get_face_service
+from app.services.today_status_service import get_today_status_cache
+from collections import Counter
+import binascii
+import uuid
 
 router = APIRouter()
-face_service = get_face_service()
 file_service = FileService()
 
-print(f"Using face recognition service: {type(face_service).__name__}")
+def read_image(payload: KioskAttendanceRequest) -> bytes:
+    """Raw image bytes of a kiosk request (base64-decoded once for JSON bodies)"""
+    if not payload.image_data:
+        raise HTTPException(status_code=400, detail="image_data is required")
+    try:
+        return payload.image_bytes()
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
+def event_time(timestamp: Optional[str]) -> datetime:
+    """
+    Kiosk timestamp, or server time when missing, as naive local time: the
+    DateTime columns are timezone-naive (asyncpg rejects aware values) and
+    the day bounds and today-status compare in local time
+    """
+    if not timestamp:
+        return local_now()
+    try:
+        return parse_local_time(timestamp)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid timestamp")
+
+def check_frame_quality(image_bytes: bytes) -> None:
+    """Reject dark, overexposed, flat or blurred frames before recognition (422, X-Error-Code says why)"""
+    try:
+        get_frame_quality_gate().check(image_bytes)
+    except FrameQualityError as e:
+        raise HTTPException(status_code=422, detail=str(e), headers={"X-Error-Code": e.code})
 
-@router.post("/check-in")
+@router.post("/check-in", openapi_extra=KIOSK_OPENAPI)
 async def check_in(
-    data: Dict[str, Any] = Body(...),
-    db = Depends(get_db)
+    request: Request,
+    payload: KioskAttendanceRequest = Depends(parse_kiosk_request),
+    db: AsyncSession = Depends(get_async_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
-    """Process check-in with face recognition"""
-    
-    # Extract data from request body
-    image_data = data.get("image_data")
-    location = data.get("location")
-    device_info = data.get("device_info")
-    timestamp = data.get("timestamp")  # Get timestamp from frontend
+    """Process check-in with face recognition (JSON or msgpack, see app/core/kiosk_protocol.py)"""
     
-    if not image_data:
-        raise HTTPException(status_code=400, detail="image_data is required")
+    image_bytes = read_image(payload)
+    check_frame_quality(image_bytes)
+    location = payload.location
+    device_info = payload.device_info
+    timestamp = payload.timestamp  # Get timestamp from frontend
     
-    # Identify employee
-    employee_id_str = face_service.identify_face(image_data, db)
+    # Identify employee (CPU-bound, so keep it off the event loop)
+    await face_service.ensure_gallery_async(db)
+    employee_id_str = await profiled_threadpool(face_service.identify_face, image_bytes)
     
     if not employee_id_str:
         raise HTTPException(status_code=404, detail="Face not recognized")
     
     # Convert string ID to UUID
-    import uuid
     try:
         employee_id = uuid.UUID(employee_id_str)
     except ValueError:
         raise HTTPException(status_code=500, detail="Invalid employee ID format")
     
     # Use timestamp from frontend if provided, otherwise use server time
-    if timestamp:
-        # Parse the timestamp from frontend (assumes ISO format)
-        check_in_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-    else:
-        # Fallback to server time in local timezone
-        check_in_time = datetime.now(LOCAL_TZ)
+    check_in_time = event_time(timestamp)
     
     # Get today's date for checking existing records
     local_today = check_in_time.replace(hour=0, minute=0, second=0, microsecond=0)
     
     # Check if already checked in today
-    existing_record = db.query(AttendanceRecord).filter(
-        AttendanceRecord.employee_id == employee_id,
-        AttendanceRecord.check_in_time >= local_today
-    ).first()
+    with profile_stage("db"):
+        existing_record = (await db.execute(
+            select(AttendanceRecord).where(
+                AttendanceRecord.employee_id == employee_id,
+                AttendanceRecord.check_in_time >= local_today,
+                AttendanceRecord.check_in_time < local_today + timedelta(days=1)
+            ).limit(1)
+        )).scalars().first()
     
     if existing_record and not existing_record.check_out_time:
         raise HTTPException(status_code=400, detail="Already checked in")
     
     # Save image to storage
-    image_url = await file_service.save_base64_image(image_data, f"checkin_{employee_id}_{check_in_time.strftime('%Y%m%d_%H%M%S')}.jpg")
+    with profile_stage("file_io"):
+        image_url = await file_service.save_image_bytes(image_bytes, f"checkin_{employee_id}_{check_in_time.strftime('%Y%m%d_%H%M%S')}.jpg")
+    
+    employee = await get_employee_directory().get_async(db, employee_id)
     
     # Create attendance record with check-in time
     record = AttendanceRecord(
         employee_id=employee_id,
+        shift_id=employee.shift_id if employee else None,
         check_in_time=check_in_time,
         check_in_image=image_url,
         check_in_location=location,
@@ -86,205 +129,271 @@ async def check_in(
         status=AttendanceStatus.ON_TIME  # Calculate based on shift
     )
     
-    db.add(record)
-    db.commit()
-    
-    # Get employee info for response
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    with profile_stage("db"):
+        db.add(record)
+        await db.commit()
+    get_invalidation_bus().publish(ATTENDANCE, keys=[employee_id])
     
-    return {
+    return kiosk_response(request, {
         "success": True,
         "employee_id": str(employee_id),
-        "employee_name": f"{employee.first_name} {employee.last_name}" if employee else None,
+        "employee_name": employee.display_name if employee else None,
         "check_in_time": record.check_in_time.isoformat(),
         "message": "Check-in successful"
-    }
+    })
 
-@router.post("/check-out")
+@router.post("/check-out", openapi_extra=KIOSK_OPENAPI)
 async def check_out(
-    data: Dict[str, Any] = Body(...),
-    db = Depends(get_db)
+    request: Request,
+    payload: KioskAttendanceRequest = Depends(parse_kiosk_request),
+    db: AsyncSession = Depends(get_async_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
-    """Process check-out with face recognition"""
+    """Process check-out with face recognition (JSON or msgpack, see app/core/kiosk_protocol.py)"""
     
-    # Extract data from request body
-    image_data = data.get("image_data")
-    timestamp = data.get("timestamp")  # Get timestamp from frontend
+    image_bytes = read_image(payload)
+    check_frame_quality(image_bytes)
+    timestamp = payload.timestamp  # Get timestamp from frontend
     
-    if not image_data:
-        raise HTTPException(status_code=400, detail="image_data is required")
-    
-    employee_id_str = face_service.identify_face(image_data, db)
+    await face_service.ensure_gallery_async(db)
+    employee_id_str = await profiled_threadpool(face_service.identify_face, image_bytes)
     
     if not employee_id_str:
         raise HTTPException(status_code=404, detail="Face not recognized")
     
     # Convert string ID to UUID
-    import uuid
     try:
         employee_id = uuid.UUID(employee_id_str)
     except ValueError:
         raise HTTPException(status_code=500, detail="Invalid employee ID format")
     
     # Use timestamp from frontend if provided, otherwise use server time
-    if timestamp:
-        # Parse the timestamp from frontend (assumes ISO format)
-        check_out_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-    else:
-        # Fallback to server time in local timezone
-        check_out_time = datetime.now(LOCAL_TZ)
+    check_out_time = event_time(timestamp)
     
     # Get today's date for finding check-in record
     local_today = check_out_time.replace(hour=0, minute=0, second=0, microsecond=0)
     
     # Find today's check-in record
-    record = db.query(AttendanceRecord).filter(
-        AttendanceRecord.employee_id == employee_id,
-        AttendanceRecord.check_in_time >= local_today,
-        AttendanceRecord.check_out_time == None
-    ).first()
+    with profile_stage("db"):
+        record = (await db.execute(
+            select(AttendanceRecord).where(
+                AttendanceRecord.employee_id == employee_id,
+                AttendanceRecord.check_in_time >= local_today,
+                AttendanceRecord.check_in_time < local_today + timedelta(days=1),
+                AttendanceRecord.check_out_time == None
+            ).limit(1)
+        )).scalars().first()
     
     if not record:
         raise HTTPException(status_code=400, detail="No check-in record found")
     
     # Update record with check-out time
     record.check_out_time = check_out_time
-    record.check_out_image = await file_service.save_base64_image(image_data, f"checkout_{employee_id}_{check_out_time.strftime('%Y%m%d_%H%M%S')}.jpg")
+    with profile_stage("file_io"):
+        record.check_out_image = await file_service.save_image_bytes(image_bytes, f"checkout_{employee_id}_{check_out_time.strftime('%Y%m%d_%H%M%S')}.jpg")
     record.work_hours = calculate_work_hours(
         record.check_in_time, 
         record.check_out_time
     )
     
-    db.commit()
+    with profile_stage("db"):
+        await db.commit()
+    get_invalidation_bus().publish(ATTENDANCE, keys=[employee_id])
     
-    # Get employee info for response
-    from app.models.employee import Employee
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    employee = await get_employee_directory().get_async(db, employee_id)
     
-    return {
+    return kiosk_response(request, {
         "success": True,
         "employee_id": str(employee_id),
-        "employee_name": f"{employee.first_name} {employee.last_name}" if employee else None,
+        "employee_name": employee.display_name if employee else None,
         "check_out_time": record.check_out_time.isoformat(),
         "work_hours": record.work_hours,
         "message": "Check-out successful"
-    }
+    })
 
-def calculate_work_hours(check_in_time: datetime, check_out_time: datetime) -> float:
-    """Calculate work hours between check-in and check-out times"""
-    time_diff = check_out_time - check_in_time
-    return round(time_diff.total_seconds() / 3600, 2)  # Convert to hours
+@router.post("/sync", openapi_extra=KIOSK_SYNC_OPENAPI)
+async def sync_offline_events(
+    request: Request,
+    payload: KioskSyncRequest = Depends(parse_kiosk_sync_request),
+    db: AsyncSession = Depends(get_async_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
+):
+    """Replay check-ins/check-outs a kiosk queued while offline (see app/services/attendance_service.py)"""
+    device_id = payload.device_id or request.headers.get("x-device-id")
+    if not device_id or len(device_id) > 100:
+        raise HTTPException(status_code=400, detail="device_id (or the X-Device-Id header) of at most 100 characters is required")
+    if len(payload.events) > settings.KIOSK_SYNC_MAX_EVENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.KIOSK_SYNC_MAX_EVENTS} events per sync; send the rest in another request"
+        )
+    
+    results = await AttendanceSyncService(db, face_service, file_service).sync(device_id, payload.events)
+    return kiosk_response(request, {
+        "device_id": device_id,
+        "results": results,
+        "summary": dict(Counter(result["status"] for result in results)),
+    })
 
 @router.get("/today-status")
-async def get_today_status(db = Depends(get_db)):
+async def get_today_status(db: AsyncSession = Depends(get_async_db)):
     """Get today's attendance status summary"""
-    from app.models.employee import Employee
-    from sqlalchemy import func, and_
-    
     # Get today in local timezone
     local_now = datetime.now(LOCAL_TZ)
     today = local_now.date()
+    cache = get_today_status_cache()
+    cached = cache.get(today)
+    if cached is not None:
+        return cached
+    version = cache.version
+    # Range bounds rather than date(check_in_time) so only today's partition is scanned
+    day_start = datetime.combine(today, time.min)
+    day_end = day_start + timedelta(days=1)
     
     # Get total number of active employees
-    total_employees = db.query(func.count(Employee.id)).filter(
-        Employee.is_active == True
-    ).scalar()
+    total_employees = (await db.execute(
+        select(func.count(Employee.id)).where(Employee.is_active == True)
+    )).scalar()
     
     # Get number of employees who checked in today
-    checked_in = db.query(func.count(AttendanceRecord.id.distinct())).filter(
-        func.date(AttendanceRecord.check_in_time) == today
-    ).scalar()
+    checked_in = (await db.execute(
+        select(func.count(AttendanceRecord.id.distinct())).where(
+            AttendanceRecord.check_in_time >= day_start,
+            AttendanceRecord.check_in_time < day_end
+        )
+    )).scalar()
     
     # Get number of employees who checked out today
-    checked_out = db.query(func.count(AttendanceRecord.id)).filter(
-        and_(
-            func.date(AttendanceRecord.check_in_time) == today,
+    checked_out = (await db.execute(
+        select(func.count(AttendanceRecord.id)).where(
+            AttendanceRecord.check_in_time >= day_start,
+            AttendanceRecord.check_in_time < day_end,
             AttendanceRecord.check_out_time != None
         )
-    ).scalar()
+    )).scalar()
     
     # Calculate absent employees
     absent = total_employees - checked_in if total_employees > checked_in else 0
     
-    return {
+    summary = {
         "total_employees": total_employees,
         "checked_in": checked_in,
         "checked_out": checked_out,
         "absent": absent,
         "date": today.isoformat()
     }
+    cache.put(today, summary, version)
+    return summary
 
 @router.get("/history")
 async def get_attendance_history(
     employee_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get attendance history with optional filters"""
-    from app.models.employee import Employee
-    
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
+    # Names come from the in-memory directory, so the query touches only attendance_records
+    query = select(
+        AttendanceRecord.id, AttendanceRecord.employee_id, AttendanceRecord.check_in_time,
+        AttendanceRecord.check_out_time, AttendanceRecord.status, AttendanceRecord.work_hours,
+        AttendanceRecord.check_in_location,
+    )
     
     if employee_id:
-        query = query.filter(AttendanceRecord.employee_id == employee_id)
+        try:
+            query = query.where(AttendanceRecord.employee_id == uuid.UUID(employee_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid employee ID format")
     
     if start_date:
-        query = query.filter(AttendanceRecord.check_in_time >= datetime.fromisoformat(start_date))
+        query = query.where(AttendanceRecord.check_in_time >= datetime.fromisoformat(start_date))
     
     if end_date:
-        query = query.filter(AttendanceRecord.check_in_time <= datetime.fromisoformat(end_date))
+        query = query.where(AttendanceRecord.check_in_time <= datetime.fromisoformat(end_date))
     
-    records = query.order_by(AttendanceRecord.check_in_time.desc()).all()
+    rows = (await db.execute(query.order_by(AttendanceRecord.check_in_time.desc()))).all()
+    employees = await get_employee_directory().lookup_async(db, {row.employee_id for row in rows})
     
-    # Format the response
+    # Plain dicts; FastJSONResponse renders UUIDs, datetimes and enums itself
     result = []
-    for record in records:
+    for row in rows:
+        employee = employees.get(row.employee_id)
         result.append({
-            "id": str(record.id),
-            "employee_id": str(record.employee_id),
-            "employee_name": f"{record.employee.first_name} {record.employee.last_name}" if record.employee else None,
-            "check_in_time": record.check_in_time.isoformat() if record.check_in_time else None,
-            "check_out_time": record.check_out_time.isoformat() if record.check_out_time else None,
-            "status": record.status,
-            "work_hours": record.work_hours,
-            "location": record.check_in_location
+            "id": row.id,
+            "employee_id": row.employee_id,
+            "employee_name": employee.display_name if employee else None,
+            "check_in_time": row.check_in_time,
+            "check_out_time": row.check_out_time,
+            "status": row.status,
+            "work_hours": row.work_hours,
+            "location": row.check_in_location
         })
     
-    return result
+    return FastJSONResponse(result)
+
+@router.get("/export")
+async def export_attendance(
+    request: Request,
+    start_date: date,
+    end_date: date,
+    format: str = "parquet",
+    department: Optional[str] = None,
+    columns: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream attendance joined with employees as Parquet, Arrow or gzipped CSV"""
+    # May probe replica health, which is blocking. Without a replica the export
+    # reads the primary through the reporting pool, not the check-ins' main pool.
+    source = await run_in_threadpool(get_replica_router().choose_engine, request)
+    try:
+        exporter = AttendanceExporter(
+            source or current_engine(),
+            start_date,
+            end_date,
+            department_code=department,
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+        )
+        chunks = exporter.stream(format)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"attendance_{start_date.isoformat()}_{end_date.isoformat()}.{extension}"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.post("/test-face-recognition")
 async def test_face_recognition(
     data: Dict[str, Any] = Body(...),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
     """Test face recognition with InsightFace service"""
     image_data = data.get("image_data")
-    service_type = data.get("service", "current")  # current or insightface only
     
     if not image_data:
         raise HTTPException(status_code=400, detail="image_data is required")
     
     try:
-        # Get the appropriate service (only InsightFace supported now)
-        if service_type == "insightface" or service_type == "current":
-            from app.services.insightface_service import InsightFaceService
-            test_service = InsightFaceService()
-        else:
-            test_service = face_service
+        # Only the shared SimpleFaceService is available ("insightface" is an alias)
+        test_service = face_service
         
         # Try to identify face
         employee_id = test_service.identify_face(image_data, db)
         
         if employee_id:
             # Get employee info
-            employee = db.query(Employee).filter(Employee.id == employee_id).first()
+            employee = get_employee_directory().get(db, uuid.UUID(employee_id))
             return {
                 "success": True,
                 "service_used": type(test_service).__name__,
                 "model_used": getattr(test_service, 'model_name', 'unknown'),
                 "employee_id": employee_id,
-                "employee_name": f"{employee.first_name} {employee.last_name}" if employee else None
+                "employee_name": employee.display_name if employee else None
             }
         else:
             return {
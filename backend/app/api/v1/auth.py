@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
 from typing import Optional
@@ -8,8 +8,9 @@ from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.database import get_db
-from app.models.user import User
-from app.schemas.auth import Token, TokenData, UserCreate, UserResponse
+from app.models.user import User, UserRole
+from app.schemas.auth import RefreshRequest, Token, TokenData, UserCreate, UserResponse
+from app.services.token_service import RefreshTokenService, TokenError
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -56,14 +57,38 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     return user
 
+async def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role not in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
 from pydantic import BaseModel
 
 class LoginRequest(BaseModel):
     username: str
     password: str
 
+def issue_tokens(user: User, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+def client_details(request: Request) -> dict:
+    return {
+        "user_agent": request.headers.get("user-agent"),
+        "ip_address": request.client.host if request.client else None,
+    }
+
 @router.post("/login", response_model=Token)
-async def login(payload: LoginRequest, db: Session = Depends(get_db)):
+def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    # Sync on purpose: the bcrypt verify runs in the threadpool, not on the event loop
     user = authenticate_user(db, payload.username, payload.password)
     if not user:
         raise HTTPException(
@@ -71,11 +96,43 @@ async def login(payload: LoginRequest, db: Session = Depends(get_db)):
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    details = client_details(request)
+    tokens = RefreshTokenService(db)
+    tokens.purge_expired(user.id)
+    _, refresh_token = tokens.issue(user, **details)
+    user.last_login = datetime.utcnow()
+    user.last_login_ip = details["ip_address"]
+    db.commit()
+    return issue_tokens(user, refresh_token)
+
+@router.post("/refresh", response_model=Token)
+def refresh(payload: RefreshRequest, request: Request, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token and a rotated refresh token"""
+    try:
+        user, refresh_token = RefreshTokenService(db).rotate(payload.refresh_token, **client_details(request))
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return issue_tokens(user, refresh_token)
+
+@router.post("/logout")
+def logout(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke the session the refresh token belongs to"""
+    try:
+        RefreshTokenService(db).revoke(payload.refresh_token)
+    except TokenError:
+        pass  # Unknown tokens are already unusable
+    return {"message": "Logged out"}
+
+@router.post("/logout-all")
+def logout_all(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Revoke every refresh token of the current user"""
+    revoked = RefreshTokenService(db).revoke_user(current_user.id)
+    db.commit()
+    return {"message": "All sessions revoked", "revoked": revoked}
 
 @router.post("/register", response_model=UserResponse)
 async def register(user: UserCreate, db: Session = Depends(get_db)):
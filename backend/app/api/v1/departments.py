@@ -0,0 +1,180 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+import uuid
+
+from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.invalidation import DIRECTORY, LEAVE_CALENDAR, get_invalidation_bus
+from app.models.department import Department
+from app.models.user import User
+from app.schemas.department import (
+    DepartmentCreate, DepartmentNode, DepartmentResponse, DepartmentRollupResponse, DepartmentUpdate
+)
+from app.services.department_service import DepartmentError, DepartmentService
+from app.api.v1.auth import get_current_admin, get_current_user
+from app.api.v1.attendance import LOCAL_TZ
+
+router = APIRouter()
+
+def _get_department(db: Session, department_id: uuid.UUID) -> Department:
+    department = db.get(Department, department_id)
+    if not department:
+        raise HTTPException(status_code=404, detail="Department not found")
+    return department
+
+def _rollup_response(department: Department, start_date: date, end_date: date, stats_by_id: dict, children: List[Department]):
+    def entry(d: Department):
+        return {
+            "department_id": d.id,
+            "department_code": d.department_code,
+            "department_name": d.department_name,
+            **stats_by_id[d.id],
+        }
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "department": entry(department),
+        "children": [entry(child) for child in children],
+    }
+
+@router.post("/rebuild")
+async def rebuild_hierarchy(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Rebuild the closure table, levels and employee counts from parent pointers"""
+    return DepartmentService(db).rebuild()
+
+@router.get("/", response_model=List[DepartmentResponse])
+async def list_departments(
+    parent_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Direct children of a department, or the top-level departments"""
+    return DepartmentService(db).children(parent_id)
+
+@router.post("/", response_model=DepartmentResponse)
+async def create_department(
+    department: DepartmentCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Create a department under an optional parent"""
+    if db.query(Department).filter(Department.department_code == department.department_code).first():
+        raise HTTPException(status_code=400, detail="Department code already exists")
+    fields = department.dict()
+    parent_id = fields.pop("parent_department_id")
+    try:
+        return DepartmentService(db).create_department(parent_id, **fields)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{department_id}", response_model=DepartmentResponse)
+async def get_department(
+    department_id: uuid.UUID,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a department"""
+    return _get_department(db, department_id)
+
+@router.put("/{department_id}", response_model=DepartmentResponse)
+async def update_department(
+    department_id: uuid.UUID,
+    department_update: DepartmentUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Update a department; changing parent_department_id moves its whole subtree"""
+    department = _get_department(db, department_id)
+    updates = department_update.dict(exclude_unset=True)
+    move = "parent_department_id" in updates
+    new_parent_id = updates.pop("parent_department_id", None)
+    code = updates.get("department_code")
+    if code and code != department.department_code and db.query(Department).filter(Department.department_code == code).first():
+        raise HTTPException(status_code=400, detail="Department code already exists")
+
+    for field, value in updates.items():
+        setattr(department, field, value)
+    try:
+        if move:
+            DepartmentService(db).move_department(department, new_parent_id)
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except DepartmentError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        # A concurrent update took the code, or manager_id names no employee
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Department code already exists" if code else "Invalid department update")
+    db.refresh(department)
+    get_invalidation_bus().publish(DIRECTORY, keys=[department.id])
+    return department
+
+@router.delete("/{department_id}")
+async def delete_department(
+    department_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Delete an empty leaf department"""
+    department = _get_department(db, department_id)
+    try:
+        DepartmentService(db).delete_department(department)
+    except DepartmentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    get_invalidation_bus().publish(DIRECTORY, LEAVE_CALENDAR, keys=[department_id])
+    return {"message": "Department deleted successfully"}
+
+@router.get("/{department_id}/subtree", response_model=List[DepartmentNode])
+async def get_subtree(
+    department_id: uuid.UUID,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The department and all of its descendants, ordered by depth"""
+    _get_department(db, department_id)
+    return DepartmentService(db).subtree(department_id)
+
+@router.get("/{department_id}/rollup", response_model=DepartmentRollupResponse)
+async def get_rollup(
+    department_id: uuid.UUID,
+    start_date: date,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Attendance totals for the department's subtree and for each direct child's subtree"""
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    department = _get_department(db, department_id)
+    service = DepartmentService(db)
+    children = service.children(department_id)
+    stats = service.attendance_rollup(
+        [department_id] + [child.id for child in children],
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    )
+    return _rollup_response(department, start_date, end_date, stats, children)
+
+@router.get("/{department_id}/today-status", response_model=DepartmentRollupResponse)
+async def get_today_status(
+    department_id: uuid.UUID,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Today's check-in status for the department's subtree and each direct child's subtree"""
+    department = _get_department(db, department_id)
+    today = datetime.now(LOCAL_TZ).date()
+    service = DepartmentService(db)
+    children = service.children(department_id)
+    stats = service.today_status([department_id] + [child.id for child in children], today)
+    return _rollup_response(department, today, today, stats, children)
@@ -1,21 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import func, select, text, tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import base64
+import os
 from io import BytesIO
 from pydantic import BaseModel
 import secrets
 import string
+import uuid
 
 from app.core.database import get_db
+from app.core.db_routing import get_read_db
+from app.core.invalidation import ATTENDANCE, DIRECTORY, GALLERY, LEAVE_CALENDAR, SEARCH, get_invalidation_bus
+from app.core.responses import FastJSONResponse
 from app.models.employee import Employee
 from app.models.user import User, UserRole
-from app.schemas.employee import EmployeeCreate, EmployeeResponse, EmployeeUpdate
-from app.services.simple_face_service import SimpleFaceService
+from app.schemas.employee import EmployeeCreate, EmployeeListItem, EmployeeResponse, EmployeeSearchResult, EmployeeUpdate
+from app.services.department_service import DepartmentService
+from app.services.file_service import FileService, decode_image_data, is_inline_image
+from app.services.search_service import get_employee_search
+from app.services.simple_face_service import SimpleFaceService, get_face_service
 from app.api.v1.auth import get_current_user, get_password_hash
 
 router = APIRouter()
-face_service = SimpleFaceService()
 
 class EmployeeRegistrationRequest(BaseModel):
     employee_code: str
@@ -28,10 +37,53 @@ class EmployeeRegistrationRequest(BaseModel):
     password: Optional[str] = None  # If not provided, will generate random password
 
 class PaginatedEmployeeResponse(BaseModel):
-    items: List[EmployeeResponse]
-    total: int
+    items: List[EmployeeListItem]
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     page: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+# Fields a list page may request; the face columns are heavy and only sent when asked for
+LIST_FIELDS = {
+    "id", "employee_code", "full_name", "first_name", "last_name", "email", "phone",
+    "department_id", "position", "hire_date", "is_active", "has_face", "face_encoding", "face_images",
+}
+DEFAULT_LIST_FIELDS = LIST_FIELDS - {"face_encoding", "face_images"}
+
+# Below this many rows an exact count is cheap enough to use instead of the planner estimate
+EXACT_COUNT_THRESHOLD = 10000
+
+def encode_cursor(employee_code: str, employee_id) -> str:
+    return base64.urlsafe_b64encode(f"{employee_code}\x1f{employee_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        employee_code, employee_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("\x1f")
+        return employee_code, uuid.UUID(employee_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def count_employees(db: Session, mode: str):
+    """Row count per `mode`: exact, estimated (planner statistics on PostgreSQL) or none"""
+    if mode == "none":
+        return None, False
+    if mode == "estimated" and db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'employees'"
+        )).scalar()
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            return int(estimate), True
+    return db.query(func.count(Employee.id)).scalar(), False
+
+def publish_employee_updated(employee: Employee, updates: dict) -> None:
+    """Invalidate the caches an update touches, in this and every other worker"""
+    topics = [GALLERY, DIRECTORY, SEARCH]
+    if "department_id" in updates:
+        topics.append(LEAVE_CALENDAR)
+    if "is_active" in updates:
+        topics.append(ATTENDANCE)
+    get_invalidation_bus().publish(*topics, keys=[employee.id])
 
 def generate_random_password(length: int = 8) -> str:
     """Generate a random password with letters and digits"""
@@ -42,7 +94,9 @@ def generate_random_password(length: int = 8) -> str:
 async def register_employee(
     registration_data: EmployeeRegistrationRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    face_service: SimpleFaceService = Depends(get_face_service),
+    file_service: FileService = Depends(FileService)
 ):
     """Register a new employee with face images and create a user account"""
     # Check if employee already exists
@@ -66,19 +120,20 @@ async def register_employee(
     
     # Process face images and get encoding
     face_encoding = None
-    face_images = []
+    face_image_data = None
     if registration_data.face_images:
         for face_image in registration_data.face_images:
             encoding = face_service.encode_face(face_image)
             if encoding:
                 face_encoding = encoding
-                # Store the base64 image for later use
-                face_images.append(face_image)
+                # Kept for later use as a file; the row only holds a reference
+                face_image_data = decode_image_data(face_image)
                 break
     
     # Generate password if not provided
     password = registration_data.password if registration_data.password else generate_random_password()
     
+    saved_images = []
     try:
         # Create employee first
         db_employee = Employee(
@@ -91,12 +146,14 @@ async def register_employee(
             department_id=None,  # Will be updated when department system is implemented
             position=registration_data.position,
             face_encoding=face_encoding,
-            face_images=face_images if face_images else None,
             is_active=True
         )
         
         db.add(db_employee)
         db.flush()  # Flush to get the employee ID without committing
+        if face_image_data:
+            saved_images.append(file_service.save_face_image(db_employee.id, face_image_data))
+            db_employee.face_images = saved_images
         
         # Create user account linked to employee
         db_user = User(
@@ -113,6 +170,8 @@ async def register_employee(
         db.add(db_user)
         db.commit()
         db.refresh(db_employee)
+        get_employee_search().employee_changed(db_employee)
+        get_invalidation_bus().publish(GALLERY, DIRECTORY, SEARCH, ATTENDANCE, keys=[db_employee.id])
         
         # Return response with credentials info
         return {
@@ -126,6 +185,7 @@ async def register_employee(
         
     except Exception as e:
         db.rollback()
+        file_service.delete_face_images(saved_images)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/", response_model=EmployeeResponse)
@@ -144,33 +204,78 @@ async def create_employee(
     
     db_employee = Employee(**employee.dict())
     db.add(db_employee)
+    DepartmentService(db).employee_moved(None, False, db_employee.department_id, db_employee.is_active)
     db.commit()
     db.refresh(db_employee)
+    get_employee_search().employee_changed(db_employee)
+    get_invalidation_bus().publish(DIRECTORY, SEARCH, ATTENDANCE, keys=[db_employee.id])
     return db_employee
 
-@router.get("/", response_model=PaginatedEmployeeResponse)
+@router.get("/", response_model=PaginatedEmployeeResponse, response_model_exclude_unset=True)
 async def get_employees(
-    page: int = 1,
-    limit: int = 10,
-    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all employees with pagination"""
-    skip = (page - 1) * limit
-    
-    # Get total count
-    total = db.query(Employee).count()
-    
-    # Get employees with pagination
-    employees = db.query(Employee).offset(skip).limit(limit).all()
-    
-    # Return paginated response matching frontend expectations
-    return PaginatedEmployeeResponse(
-        items=employees,
-        total=total,
-        page=page,
-        pages=(total + limit - 1) // limit  # Calculate total pages
-    )
+    """Get employees ordered by employee code.
+
+    Pass `cursor` (the previous response's next_cursor) for keyset paging,
+    which costs the same at any depth; `page` keeps working for offset paging.
+    `fields` is a comma-separated projection; face_encoding and face_images
+    are only included when requested.
+    """
+    requested = DEFAULT_LIST_FIELDS
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - LIST_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # Plain column rows straight to dicts: no ORM entities and no per-row
+    # model validation; FastJSONResponse serializes UUIDs and dates natively
+    ordered = [name for name in EmployeeListItem.model_fields if name in requested]
+    columns = [
+        Employee.face_encoding.isnot(None).label("has_face") if name == "has_face" else getattr(Employee, name)
+        for name in ordered if name not in ("id", "employee_code")
+    ]
+    query = select(Employee.id, Employee.employee_code, *columns).order_by(Employee.employee_code, Employee.id)
+
+    if cursor:
+        query = query.where(tuple_(Employee.employee_code, Employee.id) > decode_cursor(cursor))
+    else:
+        query = query.offset((page - 1) * limit)
+
+    # One extra row tells whether there is a next page without counting
+    rows = db.execute(query.limit(limit + 1)).mappings().all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    total, estimated = count_employees(db, count)
+    response = {
+        "items": [{name: row[name] for name in ordered} for row in rows],
+        "total_is_estimate": estimated,
+        "page": page,
+        "next_cursor": encode_cursor(rows[-1]["employee_code"], rows[-1]["id"]) if more else None,
+    }
+    if total is not None:
+        response["total"] = total
+        response["pages"] = (total + limit - 1) // limit  # Calculate total pages
+    return FastJSONResponse(response)
+
+@router.get("/search", response_model=List[EmployeeSearchResult])
+async def search_employees(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    active_only: bool = True,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Search employees by name, code or email (prefix and fuzzy), best matches first"""
+    return get_employee_search().search(db, q, limit, active_only)
 
 @router.get("/{employee_code}", response_model=EmployeeResponse)
 async def get_employee(
@@ -196,11 +301,16 @@ async def update_employee(
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    for field, value in employee_update.dict(exclude_unset=True).items():
+    updates = employee_update.dict(exclude_unset=True)
+    old_department_id, old_active = db_employee.department_id, db_employee.is_active
+    for field, value in updates.items():
         setattr(db_employee, field, value)
+    DepartmentService(db).employee_moved(old_department_id, old_active, db_employee.department_id, db_employee.is_active)
     
     db.commit()
     db.refresh(db_employee)
+    get_employee_search().employee_changed(db_employee)
+    publish_employee_updated(db_employee, updates)
     return db_employee
 
 @router.patch("/{employee_code}", response_model=EmployeeResponse)
@@ -215,26 +325,37 @@ async def patch_employee(
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    for field, value in employee_update.dict(exclude_unset=True).items():
+    updates = employee_update.dict(exclude_unset=True)
+    old_department_id, old_active = db_employee.department_id, db_employee.is_active
+    for field, value in updates.items():
         setattr(db_employee, field, value)
+    DepartmentService(db).employee_moved(old_department_id, old_active, db_employee.department_id, db_employee.is_active)
     
     db.commit()
     db.refresh(db_employee)
+    get_employee_search().employee_changed(db_employee)
+    publish_employee_updated(db_employee, updates)
     return db_employee
 
 @router.delete("/{employee_code}")
 async def delete_employee(
     employee_code: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    file_service: FileService = Depends(FileService)
 ):
     """Delete employee"""
     db_employee = db.query(Employee).filter(Employee.employee_code == employee_code).first()
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
+    DepartmentService(db).employee_moved(db_employee.department_id, db_employee.is_active, None, False)
+    employee_id, face_images = db_employee.id, db_employee.face_images
     db.delete(db_employee)
     db.commit()
+    get_employee_search().employee_removed(employee_id)
+    get_invalidation_bus().publish(GALLERY, DIRECTORY, SEARCH, LEAVE_CALENDAR, ATTENDANCE, keys=[employee_id])
+    file_service.delete_face_images(face_images)
     return {"message": "Employee deleted successfully"}
 
 @router.post("/{employee_code}/face-registration")
@@ -242,7 +363,9 @@ async def register_face(
     employee_code: str,
     image: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    face_service: SimpleFaceService = Depends(get_face_service),
+    file_service: FileService = Depends(FileService)
 ):
     """Register employee face for recognition"""
     # Validate image
@@ -263,18 +386,45 @@ async def register_face(
     if not face_encoding:
         raise HTTPException(status_code=400, detail="No face detected in image")
     
-    # Update employee with face encoding
+    # Update employee with face encoding and keep the image as a file
     employee.face_encoding = face_encoding
+    reference = file_service.save_face_image(employee.id, image_data)
+    employee.face_images = [*(employee.face_images or []), reference]
     db.commit()
+    get_invalidation_bus().publish(GALLERY, keys=[employee.id])
     
     return {"message": "Face registered successfully"}
 
+@router.get("/{employee_code}/face-images/{index}")
+async def get_face_image(
+    employee_code: str,
+    index: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    file_service: FileService = Depends(FileService)
+):
+    """Serve one of the employee's registration face images"""
+    face_images = db.query(Employee.face_images).filter(Employee.employee_code == employee_code).scalar()
+    if not face_images or not 0 <= index < len(face_images):
+        raise HTTPException(status_code=404, detail="Face image not found")
+    reference = face_images[index]
+    if is_inline_image(reference):
+        # Not yet moved out by the c41d7e2b5f63 migration
+        return Response(content=decode_image_data(reference), media_type="image/jpeg")
+    try:
+        path = file_service.face_image_path(reference)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Face image not found")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Face image not found")
+    return FileResponse(path, headers={"Cache-Control": "private, max-age=86400"})
+
 @router.get("/{employee_code}/attendance")
 async def get_employee_attendance(
     employee_code: str,
     start_date: str = None,
     end_date: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get employee attendance records"""
@@ -282,18 +432,18 @@ async def get_employee_attendance(
     from datetime import datetime
     
     # First get the employee to get their ID
-    employee = db.query(Employee).filter(Employee.employee_code == employee_code).first()
-    if not employee:
+    employee_id = db.execute(select(Employee.id).where(Employee.employee_code == employee_code)).scalar()
+    if not employee_id:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    query = db.query(AttendanceRecord).filter(
-        AttendanceRecord.employee_id == employee.id
-    )
+    query = select(*AttendanceRecord.__table__.columns).where(AttendanceRecord.employee_id == employee_id)
     
+    # Bound check_in_time as timestamps so PostgreSQL can prune partitions
     if start_date:
-        query = query.filter(AttendanceRecord.check_in_time >= start_date)
+        query = query.where(AttendanceRecord.check_in_time >= datetime.fromisoformat(start_date))
     if end_date:
-        query = query.filter(AttendanceRecord.check_in_time <= end_date)
+        query = query.where(AttendanceRecord.check_in_time <= datetime.fromisoformat(end_date))
     
-    records = query.order_by(AttendanceRecord.check_in_time.desc()).all()
-    return records
+    # Column rows as dicts rather than ORM objects run through jsonable_encoder
+    rows = db.execute(query.order_by(AttendanceRecord.check_in_time.desc())).mappings().all()
+    return FastJSONResponse([dict(row) for row in rows])
@@ -1,18 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from sqlalchemy.orm import Session
 import base64
+import uuid
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.services.simple_face_service import SimpleFaceService
-from app.models.employee import Employee
+from app.services.directory_service import get_employee_directory
+from app.services.simple_face_service import SimpleFaceService, get_face_service
 
 router = APIRouter()
-face_service = SimpleFaceService()
 
 @router.post("/identify")
 async def identify_face(
     image: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
     """Identify employee from face image"""
     # Validate image
@@ -29,19 +31,44 @@ async def identify_face(
     if not employee_id:
         raise HTTPException(status_code=404, detail="Face not recognized")
     
-    # Get employee details
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    # Employee details from the in-memory directory rather than another query
+    employee = get_employee_directory().get(db, uuid.UUID(employee_id))
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
     
     return {
-        "employee_id": employee.employee_id,
-        "name": employee.first_name + " " + employee.last_name,
-        "department": employee.department.name if employee.department else None
+        "employee_id": str(employee.id),
+        "employee_code": employee.employee_code,
+        "name": employee.display_name,
+        "department": employee.department_name
+    }
+
+@router.post("/detect")
+async def detect_faces(
+    image: UploadFile = File(...),
+    face_service: SimpleFaceService = Depends(get_face_service)
+):
+    """Face bounding boxes and confidences in an image (what FACE_ROI_ENABLED crops to)"""
+    if not image.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    detected = face_service.detect_faces(await image.read())
+    if detected is None:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    
+    (width, height), faces = detected
+    return {
+        "width": width,
+        "height": height,
+        "faces": [face.as_dict() for face in faces],
+        "roi_enabled": settings.FACE_ROI_ENABLED
     }
 
 @router.post("/encode")
 async def encode_face(
     image: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
     """Encode face from image (for testing/debugging)"""
     # Validate image
@@ -67,7 +94,8 @@ async def encode_face(
 async def verify_face(
     image1: UploadFile = File(...),
     image2: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    face_service: SimpleFaceService = Depends(get_face_service)
 ):
     """Verify if two face images belong to the same person"""
     # Validate images
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+import uuid
+
+from app.core.database import get_db
+from app.models.employee import Employee
+from app.models.leave import Leave, LeaveStatus
+from app.models.user import User
+from app.schemas.leave import (
+    AvailabilityResponse, LeaveCreate, LeaveDecision, LeaveIntervalResponse, LeaveResponse
+)
+from app.services.leave_service import LeaveError, LeaveService
+from app.api.v1.auth import get_current_admin, get_current_user
+
+router = APIRouter()
+
+def _check_range(start_date: date, end_date: date):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+@router.post("/", response_model=LeaveResponse)
+async def create_leave(
+    leave: LeaveCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Request leave for an employee"""
+    employee = db.query(Employee).filter(Employee.employee_code == leave.employee_code).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    try:
+        return LeaveService(db).create_leave(
+            employee,
+            leave.leave_type,
+            leave.start_date,
+            leave.end_date,
+            leave.reason,
+            is_half_day=leave.is_half_day,
+            half_day_period=leave.half_day_period,
+            is_emergency=leave.is_emergency,
+        )
+    except LeaveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=List[LeaveResponse])
+async def list_leaves(
+    status: Optional[str] = None,
+    employee_code: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List leave requests, newest first"""
+    query = db.query(Leave)
+    if status:
+        try:
+            query = query.filter(Leave.status == LeaveStatus(status))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+    if employee_code:
+        query = query.join(Employee, Leave.employee_id == Employee.id).filter(Employee.employee_code == employee_code)
+    return query.order_by(Leave.start_date.desc()).limit(limit).all()
+
+@router.get("/off", response_model=List[LeaveIntervalResponse])
+async def who_is_off(
+    start_date: date,
+    end_date: Optional[date] = None,
+    department_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Approved leaves overlapping a date or date range, optionally for one department"""
+    end_date = end_date or start_date
+    _check_range(start_date, end_date)
+    return LeaveService(db).who_is_off(start_date, end_date, department_id)
+
+@router.get("/availability/{department_id}", response_model=AvailabilityResponse)
+async def department_availability(
+    department_id: uuid.UUID,
+    start_date: date,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Which active employees of a department are available or on leave in a range"""
+    end_date = end_date or start_date
+    _check_range(start_date, end_date)
+    return LeaveService(db).availability(department_id, start_date, end_date)
+
+@router.post("/balances/recompute")
+async def recompute_balances(
+    year: int = Query(..., ge=2000, le=2100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Recompute used/remaining leave balances for a year from approved leaves"""
+    return LeaveService(db).recompute_balances(year)
+
+def _decide(action, leave_id: uuid.UUID, *args):
+    try:
+        return action(leave_id, *args)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LeaveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/{leave_id}/approve", response_model=LeaveResponse)
+async def approve_leave(
+    leave_id: uuid.UUID,
+    decision: LeaveDecision = LeaveDecision(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Approve a pending leave and add it to the department calendar"""
+    return _decide(LeaveService(db).approve, leave_id, current_user.employee_id, decision.notes)
+
+@router.post("/{leave_id}/reject", response_model=LeaveResponse)
+async def reject_leave(
+    leave_id: uuid.UUID,
+    decision: LeaveDecision = LeaveDecision(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Reject a pending leave"""
+    return _decide(LeaveService(db).reject, leave_id, decision.notes)
+
+@router.post("/{leave_id}/cancel", response_model=LeaveResponse)
+async def cancel_leave(
+    leave_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a pending or approved leave (own leaves, or any as an admin) and remove it from the calendar"""
+    leave = db.get(Leave, leave_id)
+    if not leave:
+        raise HTTPException(status_code=404, detail="Leave not found")
+    if leave.employee_id != current_user.employee_id:
+        await get_current_admin(current_user)  # 403 unless an admin
+    return _decide(LeaveService(db).cancel, leave_id)
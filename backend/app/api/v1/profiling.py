@@ -0,0 +1,130 @@
+import os
+import tempfile
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Response
+from pydantic import BaseModel
+
+from app.api.v1.auth import get_current_admin
+from app.core.profiling import profiler
+from app.models.user import User
+
+router = APIRouter()
+
+class ArmProfilerRequest(BaseModel):
+    requests: int = 0
+    route_prefix: Optional[str] = None
+
+@router.get("/status")
+async def get_profiler_status(current_user: User = Depends(get_current_admin)):
+    """Get profiler state"""
+    return profiler.status()
+
+@router.post("/arm")
+async def arm_profiler(
+    payload: ArmProfilerRequest,
+    current_user: User = Depends(get_current_admin)
+):
+    """Profile the next N requests, or every request under a route prefix"""
+    if payload.requests <= 0 and not payload.route_prefix:
+        raise HTTPException(status_code=400, detail="Either requests or route_prefix is required")
+    profiler.arm(requests=payload.requests, route_prefix=payload.route_prefix)
+    return profiler.status()
+
+@router.post("/disarm")
+async def disarm_profiler(current_user: User = Depends(get_current_admin)):
+    """Stop profiling new requests (captured profiles are kept)"""
+    profiler.disarm()
+    return profiler.status()
+
+@router.get("/profiles")
+async def list_profiles(current_user: User = Depends(get_current_admin)):
+    """List captured request profiles, slowest first"""
+    return [profile.summary() for profile in profiler.profiles()]
+
+@router.delete("/profiles")
+async def clear_profiles(current_user: User = Depends(get_current_admin)):
+    """Drop all captured request profiles"""
+    profiler.clear()
+    return {"message": "Profiles cleared"}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: int,
+    limit: int = 25,
+    current_user: User = Depends(get_current_admin)
+):
+    """Get a captured profile with its stage breakdown and top functions"""
+    profile = profiler.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {**profile.summary(), "top_functions": profile.top_functions(limit)}
+
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(
+    profile_id: int,
+    part: Literal["loop", "threads"] = "loop",
+    current_user: User = Depends(get_current_admin)
+):
+    """Download the event-loop or threadpool part of a profile in pstats format (open with snakeviz or pstats)"""
+    profile = profiler.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    content = profile.stats_data if part == "loop" else profile.thread_stats_data
+    if not content:
+        raise HTTPException(status_code=404, detail="No threadpool work was profiled for this request")
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="request_{profile_id}_{part}.prof"'}
+    )
+
+@router.post("/memory/start")
+async def start_memory_tracing(
+    frames: int = 10,
+    current_user: User = Depends(get_current_admin)
+):
+    """Start tracemalloc and take a baseline snapshot"""
+    profiler.start_memory_tracing(frames)
+    return profiler.status()
+
+@router.post("/memory/stop")
+async def stop_memory_tracing(current_user: User = Depends(get_current_admin)):
+    """Stop tracemalloc"""
+    profiler.stop_memory_tracing()
+    return profiler.status()
+
+@router.get("/memory/growth")
+async def get_memory_growth(
+    limit: int = 25,
+    current_user: User = Depends(get_current_admin)
+):
+    """Top allocation sites that grew since tracing started"""
+    try:
+        return profiler.memory_growth(limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/memory/snapshot")
+async def download_memory_snapshot(current_user: User = Depends(get_current_admin)):
+    """Download a tracemalloc snapshot (load with tracemalloc.Snapshot.load)"""
+    try:
+        snapshot = profiler.memory_snapshot()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # Snapshot.dump only writes to a path, so go through a temporary file
+    fd, path = tempfile.mkstemp(suffix=".tracemalloc")
+    os.close(fd)
+    try:
+        snapshot.dump(path)
+        with open(path, "rb") as f:
+            content = f.read()
+    finally:
+        os.remove(path)
+
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="memory.tracemalloc"'}
+    )
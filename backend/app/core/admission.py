@@ -0,0 +1,269 @@
+# app/core/admission.py
+"""
+Priority admission control.
+
+Every request is put in one of three classes:
+
+- recognition: kiosk check-in/check-out, offline sync and face identification
+- mutation: writes and light reads (the dashboard's everyday calls)
+- reporting: history, exports, listings, roll-ups and bulk recomputes
+
+Each class has its own concurrency limit, and all classes share
+ADMISSION_MAX_CONCURRENT slots. When a slot frees up, waiting requests are
+admitted in priority order, so a queue of reports never delays a check-in,
+while reporting can never hold more than its own limit. A request that
+waits longer than its class timeout, or finds its class queue full, gets
+503 with Retry-After instead of piling onto the database.
+
+The class is also published through `request_class` so sessions come from
+that class's connection pool (see DB_POOL_PARTITIONS). Limits are per worker
+process.
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import request_class
+
+RECOGNITION = "recognition"
+MUTATION = "mutation"
+REPORTING = "reporting"
+PRIORITIES = {RECOGNITION: 0, MUTATION: 1, REPORTING: 2}
+
+RECOGNITION_ROUTES = [
+    re.compile(r"^/api/v1/attendance/(check-in|check-out|sync|test-face-recognition)/?$"),
+    re.compile(r"^/api/v1/face/"),
+]
+
+REPORTING_ROUTES = [
+    ("GET", re.compile(r"^/api/v1/attendance/(history|export|today-status)/?$")),
+    ("GET", re.compile(r"^/api/v1/employees/?$")),
+    ("GET", re.compile(r"^/api/v1/employees/[^/]+/attendance/?$")),
+    ("GET", re.compile(r"^/api/v1/departments/[^/]+/(subtree|rollup|today-status)/?$")),
+    ("GET", re.compile(r"^/api/v1/leaves/availability/")),
+    ("POST", re.compile(r"^/api/v1/admin/payroll/recalculate/?$")),
+    ("POST", re.compile(r"^/api/v1/leaves/balances/recompute/?$")),
+    ("POST", re.compile(r"^/api/v1/departments/rebuild/?$")),
+]
+
+# Never queued: probes, docs, static files and the admin views used to diagnose overload
+EXEMPT_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json", "/uploads", "/api/v1/admin/admission", "/api/v1/admin/profiling")
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Admission class of a request, or None when it bypasses admission"""
+    if path == "/" or path.startswith(EXEMPT_PREFIXES) or method == "OPTIONS":
+        return None
+    if any(pattern.match(path) for pattern in RECOGNITION_ROUTES):
+        return RECOGNITION
+    if any(method == m and pattern.match(path) for m, pattern in REPORTING_ROUTES):
+        return REPORTING
+    return MUTATION
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ClassStats:
+    """Counters and recent queue waits for one admission class"""
+
+    def __init__(self, keep: int = 2000):
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.waits: Deque[float] = deque(maxlen=keep)
+
+    def snapshot(self) -> dict:
+        waits = np.fromiter(self.waits, dtype=np.float64)
+        stats = {
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected_queue_full": self.rejected,
+            "rejected_timeout": self.timed_out,
+        }
+        if len(waits):
+            p50, p95, p99 = np.percentile(waits, [50, 95, 99])
+            stats["queue_ms"] = {
+                "samples": len(waits),
+                "p50": round(float(p50) * 1000, 2),
+                "p95": round(float(p95) * 1000, 2),
+                "p99": round(float(p99) * 1000, 2),
+                "max": round(float(waits.max()) * 1000, 2),
+            }
+        else:
+            stats["queue_ms"] = None
+        return stats
+
+
+class AdmissionController:
+    """Priority scheduler over per-class and shared concurrency limits.
+
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, max_concurrent: int, limits: Dict[str, int], queue_limits: Dict[str, int], timeouts: Dict[str, float]):
+        self.max_concurrent = max_concurrent
+        self.limits = limits
+        self.queue_limits = queue_limits
+        self.timeouts = timeouts
+        self.in_flight = {name: 0 for name in PRIORITIES}
+        self.queued = {name: 0 for name in PRIORITIES}
+        self.stats = {name: ClassStats() for name in PRIORITIES}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    def _fits(self, name: str) -> bool:
+        return self.total_in_flight < self.max_concurrent and self.in_flight[name] < self.limits.get(name, self.max_concurrent)
+
+    def _admit(self, name: str) -> None:
+        self.in_flight[name] += 1
+        self.stats[name].admitted += 1
+
+    def _ahead(self, name: str) -> bool:
+        """Whether a waiter of equal or higher priority could take the next slot"""
+        return any(
+            priority <= PRIORITIES[name] and not future.done() and self._fits(waiting)
+            for priority, _, waiting, future in self._waiters
+        )
+
+    async def acquire(self, name: str) -> float:
+        """Wait for a slot; returns the time spent queued in seconds"""
+        if self._fits(name) and not self._ahead(name):
+            self._admit(name)
+            self.stats[name].waits.append(0.0)
+            return 0.0
+
+        if self.queued[name] >= self.queue_limits.get(name, 100):
+            self.stats[name].rejected += 1
+            raise AdmissionRejected(f"Too many queued {name} requests", retry_after=1)
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[name], next(self._sequence), name, future))
+        self.queued[name] += 1
+        self.stats[name].queued_total += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.timeouts.get(name, 30.0))
+        except asyncio.TimeoutError:
+            if not (future.done() and not future.cancelled()):
+                future.cancel()
+                self.stats[name].timed_out += 1
+                raise AdmissionRejected(f"Server busy, {name} request not admitted in time", retry_after=max(int(self.timeouts.get(name, 30.0) / 2), 1))
+        except BaseException:
+            # Client went away: give the slot back if it had already been granted
+            if future.done() and not future.cancelled():
+                self.release(name)
+            else:
+                future.cancel()
+            raise
+        finally:
+            self.queued[name] -= 1
+        waited = time.perf_counter() - started
+        self.stats[name].waits.append(waited)
+        return waited
+
+    def release(self, name: str) -> None:
+        self.in_flight[name] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiters in priority order while slots remain; a waiter whose
+        own class is full does not block lower classes that still fit"""
+        skipped = []
+        while self._waiters and self.total_in_flight < self.max_concurrent:
+            priority, sequence, name, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if not self._fits(name):
+                skipped.append((priority, sequence, name, future))
+                continue
+            self._admit(name)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight_total": self.total_in_flight,
+            "classes": {
+                name: {
+                    "priority": PRIORITIES[name],
+                    "limit": self.limits.get(name),
+                    "in_flight": self.in_flight[name],
+                    "queued": self.queued[name],
+                    **self.stats[name].snapshot(),
+                }
+                for name in PRIORITIES
+            },
+        }
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        settings.ADMISSION_MAX_CONCURRENT,
+        settings.ADMISSION_LIMITS,
+        settings.ADMISSION_QUEUE_LIMITS,
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+
+
+class AdmissionMiddleware:
+    """Queues requests by class before they reach the application"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        controller = get_admission_controller()
+        try:
+            waited = await controller.acquire(name)
+        except AdmissionRejected as e:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", str(e.retry_after).encode())],
+            })
+            await send({"type": "http.response.body", "body": f'{{"detail": "{e.reason}"}}'.encode()})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-queue-time-ms", f"{waited * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_class.set(name)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_class.reset(token)
+            controller.release(name)
@@ -0,0 +1,144 @@
+# app/core/compression.py
+"""
+Response compression.
+
+Text-like responses (JSON, msgpack, CSV, text) of at least
+COMPRESSION_MIN_SIZE bytes are compressed with brotli when the client
+accepts it and the brotli package is installed, otherwise with gzip.
+Streaming responses are compressed chunk by chunk. Responses that are
+already encoded or binary formats (images, Parquet, gzipped exports) pass
+through untouched.
+"""
+
+import gzip
+import zlib
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+# Bigger bodies are compressed in the threadpool (a 3 MB page takes ~60 ms)
+THREADPOOL_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/", "application/javascript", "application/xml")
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = {part.split(";", 1)[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+COMPRESSORS = {"gzip": _Gzip, "br": _Brotli}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                response_headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (
+                    b"content-encoding" in response_headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until the first body chunk shows the size
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start is not None and compressor is None:
+                if not more_body:
+                    # Whole body in one message
+                    if len(body) < settings.COMPRESSION_MIN_SIZE:
+                        await send(start)
+                    else:
+                        if len(body) >= THREADPOOL_THRESHOLD:
+                            body = await run_in_threadpool(compress, body, encoding)
+                        else:
+                            body = compress(body, encoding)
+                        await send(self._encoded_start(start, encoding, len(body)))
+                    start = None
+                    passthrough = True
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = COMPRESSORS[encoding]()
+                await send(self._encoded_start(start, encoding, None))
+                start = None
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _encoded_start(start: dict, encoding: str, length):
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return {**start, "headers": headers}
@@ -1,5 +1,12 @@
 # app/core/database.py
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -18,10 +25,100 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base
 Base = declarative_base()
 
+# Admission class of the current request, set by AdmissionMiddleware
+request_class: ContextVar[Optional[str]] = ContextVar("request_class", default=None)
+
+def pool_partition(name: Optional[str]) -> Optional[tuple]:
+    """(pool_size, max_overflow) of the partition serving an admission class, if any"""
+    if name not in settings.DB_POOL_PARTITIONS or make_url(settings.DATABASE_URL).get_backend_name() == "sqlite":
+        return None
+    return tuple(settings.DB_POOL_PARTITIONS[name])
+
+# Dedicated pools on the primary so one class of requests (reports) cannot
+# hold every connection another (check-ins) needs
+@lru_cache(maxsize=None)
+def get_partition_engine(name: str) -> Engine:
+    pool_size, max_overflow = pool_partition(name)
+    return create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow)
+
+def current_engine() -> Engine:
+    """Primary engine for the current request's admission class"""
+    name = request_class.get()
+    return get_partition_engine(name) if pool_partition(name) else engine
+
 # Dependency to get DB session
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=current_engine())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def advisory_lock(bind: Engine, name: str) -> Iterator[bool]:
+    """
+    Hold a PostgreSQL session advisory lock named `name` for the block, without
+    waiting: yields False when another process (worker, container, cron job)
+    holds it. Other databases have no other process to coordinate with, so the
+    lock is always granted there.
+    """
+    if bind.dialect.name != "postgresql":
+        yield True
+        return
+    with bind.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": name}).scalar()
+        connection.commit()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": name})
+                connection.commit()
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver of a database URL for its async counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str, pool_size: int = 10, max_overflow: int = 20) -> AsyncEngine:
+    options = {"pool_pre_ping": True}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=pool_size, max_overflow=max_overflow)
+    return create_async_engine(url, **options)
+
+# The async engine is built on first use so the async driver is only
+# required by deployments that actually serve async endpoints.
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    return create_async_db_engine(settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL))
+
+@lru_cache(maxsize=None)
+def get_async_partition_engine(name: str) -> AsyncEngine:
+    pool_size, max_overflow = pool_partition(name)
+    url = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+    return create_async_db_engine(url, pool_size=pool_size, max_overflow=max_overflow)
+
+def current_async_engine() -> AsyncEngine:
+    """Async primary engine for the current request's admission class"""
+    name = request_class.get()
+    return get_async_partition_engine(name) if pool_partition(name) else get_async_engine()
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker() -> async_sessionmaker:
+    # expire_on_commit=False: attributes stay readable after commit without
+    # an implicit (and in async, illegal) lazy refresh
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+# Dependency to get async DB session
+async def get_async_db():
+    async with get_async_sessionmaker()(bind=current_async_engine()) as db:
+        yield db
@@ -0,0 +1,332 @@
+# app/core/db_routing.py
+"""
+Read-replica routing.
+
+Read-only endpoints ask for a session through `get_read_db` / `get_async_read_db`.
+Those sessions run SELECTs on a healthy replica and everything else (flushes,
+INSERT/UPDATE/DELETE) on the primary. A client that recently performed a
+mutation is pinned to the primary for READ_YOUR_WRITES_SECONDS, and replicas
+that lag more than REPLICA_MAX_LAG_SECONDS or fail their health probe are
+skipped until the next probe.
+
+The time of a client's last write travels with the client (an X-Last-Write
+response header it echoes back, and a last_write cookie), so the next read
+stays on the primary whichever worker or container serves it. A read whose
+replica connection fails is retried on the primary and the replica is
+skipped until it passes a probe again.
+"""
+
+import itertools
+import math
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Delete, Insert, Update
+
+from app.core.config import settings
+from app.core.database import (
+    create_async_db_engine, current_async_engine, current_engine, engine, get_async_engine,
+    get_async_partition_engine, get_partition_engine, pool_partition, to_async_url,
+)
+
+# Replication delay on a PostgreSQL standby; 0 when it has replayed everything it received
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+LAST_WRITE_HEADER = "X-Last-Write"
+LAST_WRITE_COOKIE = "last_write"
+
+
+def last_write_marker(request: Request) -> Optional[float]:
+    """Unix time of the client's last write, as it sent it back (header or cookie)"""
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """A failure to reach the database, as opposed to an error in the statement"""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, (OperationalError, InterfaceError))
+    return isinstance(error, OSError)
+
+
+@dataclass
+class ReplicaTarget:
+    """A replica database with its engines and last health probe"""
+    name: str
+    url: str
+    engine: Engine
+    lag_seconds: Optional[float] = None
+    healthy: bool = True
+    checked_at: float = 0.0
+    _async_engine: Optional[AsyncEngine] = None
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            self._async_engine = create_async_db_engine(to_async_url(self.url))
+        return self._async_engine
+
+
+class RoutingSession(Session):
+    """Session that sends reads to its replica and writes to the primary"""
+
+    def __init__(self, *args, replica: Optional[Engine] = None,
+                 on_replica_error: Optional[Callable[[Engine, BaseException], None]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.on_replica_error = on_replica_error
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is None or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            if self.replica is not None:
+                self._wrote = True
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        return self.replica
+
+    def _with_fallback(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except Exception as e:
+            # Only a read-only session can start over on the primary
+            if self.replica is None or self._wrote or not is_connection_error(e):
+                raise
+            failed, self.replica = self.replica, None
+            if self.on_replica_error is not None:
+                self.on_replica_error(failed, e)
+            self.rollback()
+            return method(*args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._with_fallback(super().execute, *args, **kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._with_fallback(super().scalar, *args, **kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._with_fallback(super().scalars, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Chooses a replica for read-only requests and tracks recent writers"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [
+            ReplicaTarget(
+                name=f"replica-{index}",
+                url=url,
+                engine=create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20),
+            )
+            for index, url in enumerate(urls, start=1)
+        ]
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._last_write: Dict[str, float] = {}
+
+    # ---- Read-your-writes ----------------------------------------------
+    # The marker the client sends back works across workers; the local map
+    # covers clients that drop headers and cookies on the worker that saw the write
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        """Identify the caller: its bearer token when present, otherwise its address"""
+        authorization = request.headers.get("authorization")
+        if authorization:
+            return authorization
+        return request.client.host if request.client else "unknown"
+
+    def record_write(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[key] = now
+            # Forget clients whose stickiness window has passed
+            if len(self._last_write) > 10000:
+                cutoff = now - settings.READ_YOUR_WRITES_SECONDS
+                self._last_write = {k: t for k, t in self._last_write.items() if t >= cutoff}
+
+    def recently_wrote(self, request: Request) -> bool:
+        marker = last_write_marker(request)
+        if marker is not None and -1.0 <= time.time() - marker < settings.READ_YOUR_WRITES_SECONDS:
+            return True
+        last_write = self._last_write.get(self.client_key(request))
+        return last_write is not None and time.monotonic() - last_write < settings.READ_YOUR_WRITES_SECONDS
+
+    # ---- Replica selection ---------------------------------------------
+
+    def _probe(self, replica: ReplicaTarget) -> None:
+        try:
+            with replica.engine.connect() as connection:
+                if replica.engine.dialect.name == "postgresql":
+                    replica.lag_seconds = float(connection.execute(REPLICA_LAG_SQL).scalar() or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    replica.lag_seconds = 0.0
+            replica.healthy = replica.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            print(f"Replica {replica.name} health probe failed: {e}")
+            replica.healthy = False
+            replica.lag_seconds = None
+        replica.checked_at = time.monotonic()
+
+    def replica_failed(self, bind: Engine, error: BaseException) -> None:
+        """A query could not reach a replica: skip it until its next probe"""
+        for replica in self.replicas:
+            if bind is replica.engine or (replica._async_engine is not None and bind is replica._async_engine.sync_engine):
+                print(f"Replica {replica.name} failed, reading from the primary: {error}")
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+
+    def probe_due(self) -> bool:
+        now = time.monotonic()
+        return any(now - r.checked_at >= settings.REPLICA_CHECK_INTERVAL_SECONDS for r in self.replicas)
+
+    def pick_replica(self) -> Optional[ReplicaTarget]:
+        """Next healthy replica in round-robin order, or None to use the primary"""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        for replica in self.replicas:
+            if now - replica.checked_at >= settings.REPLICA_CHECK_INTERVAL_SECONDS:
+                self._probe(replica)
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    def choose(self, request: Request) -> Optional[ReplicaTarget]:
+        if not self.replicas or self.recently_wrote(request):
+            return None
+        return self.pick_replica()
+
+    def choose_engine(self, request: Request) -> Optional[Engine]:
+        """Replica engine for a raw-connection read, or None for the primary"""
+        replica = self.choose(request)
+        return replica.engine if replica else None
+
+    # ---- Stats ---------------------------------------------------------
+
+    def pool_stats(self) -> List[dict]:
+        # Only report the primary's async pool once something has created it
+        primary_async = get_async_engine() if get_async_engine.cache_info().currsize else None
+        targets = [("primary", settings.DATABASE_URL, engine, primary_async)]
+        for name in settings.DB_POOL_PARTITIONS:
+            if pool_partition(name):
+                partition_async = get_async_partition_engine(name) if primary_async else None
+                targets.append((f"primary:{name}", settings.DATABASE_URL, get_partition_engine(name), partition_async))
+        targets += [(r.name, r.url, r.engine, r._async_engine) for r in self.replicas]
+        stats = []
+        for name, url, sync_engine, async_engine in targets:
+            entry = {
+                "target": name,
+                "url": make_url(url).render_as_string(hide_password=True),
+                "sync_pool": _pool_stats(sync_engine),
+                "async_pool": _pool_stats(async_engine.sync_engine) if async_engine else None,
+            }
+            replica = next((r for r in self.replicas if r.name == name), None)
+            if replica is not None:
+                entry.update(healthy=replica.healthy, lag_seconds=replica.lag_seconds)
+            stats.append(entry)
+        return stats
+
+
+def _pool_stats(sync_engine: Engine) -> dict:
+    pool = sync_engine.pool
+    stats = {"status": pool.status()}
+    for attribute in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, attribute):
+            stats[attribute] = getattr(pool, attribute)()
+    return stats
+
+
+@lru_cache(maxsize=None)
+def get_replica_router() -> ReplicaRouter:
+    return ReplicaRouter(settings.DATABASE_REPLICA_URLS)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins clients to the primary after a successful mutating request: records
+    the write locally and hands the client an X-Last-Write header and a
+    last_write cookie carrying its time, for other workers to honor
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not settings.DATABASE_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                router = get_replica_router()
+                router.record_write(router.client_key(Request(scope)))
+                marker = f"{time.time():.3f}"
+                max_age = math.ceil(settings.READ_YOUR_WRITES_SECONDS)
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (LAST_WRITE_HEADER.lower().encode(), marker.encode()),
+                    (b"set-cookie", f"{LAST_WRITE_COOKIE}={marker}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax".encode()),
+                ]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# Dependency to get a read-only DB session (replica when possible)
+def get_read_db(request: Request):
+    router = get_replica_router()
+    replica = router.choose(request)
+    db = RoutingSession(
+        bind=current_engine(),
+        replica=replica.engine if replica else None,
+        on_replica_error=router.replica_failed,
+        autocommit=False,
+        autoflush=False,
+    )
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency to get a read-only async DB session (replica when possible)
+async def get_async_read_db(request: Request):
+    router = get_replica_router()
+    if router.replicas and router.probe_due():
+        # Health probes use the sync engine, keep them off the event loop
+        replica = await run_in_threadpool(router.choose, request)
+    else:
+        replica = router.choose(request)
+    db = AsyncSession(
+        bind=current_async_engine(),
+        sync_session_class=RoutingSession,
+        replica=replica.async_engine.sync_engine if replica else None,
+        on_replica_error=router.replica_failed,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+    try:
+        yield db
+    finally:
+        await db.close()
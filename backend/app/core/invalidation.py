@@ -0,0 +1,400 @@
+# app/core/invalidation.py
+"""
+Cache invalidation bus.
+
+In-process caches (face gallery, employee directory, search index, leave
+calendar, today's counters) are only correct while every process that holds
+one hears about the writes that affect it. Handlers publish an
+InvalidationEvent naming the topics a write touched after committing it, and
+each cache subscribes to its topic when it is constructed.
+
+Events carry the publishing process's origin id and a per-origin version;
+a subscriber never sees an event from an origin twice or out of order.
+Events from this process are delivered immediately, so a worker reads its
+own writes. Events from other processes are debounced per subscription: a
+burst (a bulk import, a department move) is coalesced into one invalidation
+and one optional reload, INVALIDATION_DEBOUNCE_SECONDS after the burst
+settles.
+
+The in-process backend only delivers locally. With INVALIDATION_BACKEND=
+postgres and a PostgreSQL DATABASE_URL, events are also sent with
+pg_notify on INVALIDATION_CHANNEL and a listener thread delivers those of
+other processes, in every worker and container. After the listener loses
+its connection it reconnects (backing off until a send succeeds again) and
+invalidates every topic, since notifications sent meanwhile are lost. A
+NOTIFY payload is limited to 8000 bytes: an event too large for it is sent
+without its keys, which subscribers treat as "the whole topic changed". An
+event PostgreSQL rejects for any reason other than a lost connection is
+dropped and counted rather than retried forever.
+"""
+
+import itertools
+import json
+import os
+import queue
+import select
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+GALLERY = "face_gallery"
+DIRECTORY = "employee_directory"
+SEARCH = "employee_search"
+LEAVE_CALENDAR = "leave_calendar"
+ATTENDANCE = "attendance"
+TOPICS = (GALLERY, DIRECTORY, SEARCH, LEAVE_CALENDAR, ATTENDANCE)
+
+# pg_notify rejects payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    topics: Tuple[str, ...]
+    origin: str
+    version: int
+    keys: Tuple[str, ...] = ()  # ids of the changed rows, when known
+    sent_at: float = field(default_factory=time.time)
+
+    @property
+    def id(self) -> str:
+        return f"{self.origin}:{self.version}"
+
+    def to_json(self) -> str:
+        return json.dumps({"t": self.topics, "o": self.origin, "v": self.version, "k": self.keys, "s": self.sent_at})
+
+    def to_payload(self, limit: int = MAX_PAYLOAD_BYTES) -> str:
+        """JSON for a notification, without the keys when they would not fit in `limit` bytes"""
+        payload = self.to_json()
+        if self.keys and len(payload.encode()) > limit:
+            payload = replace(self, keys=()).to_json()
+        return payload
+
+    @classmethod
+    def from_json(cls, payload: str) -> "InvalidationEvent":
+        data = json.loads(payload)
+        return cls(tuple(data["t"]), data["o"], int(data["v"]), tuple(data.get("k") or ()), float(data.get("s") or 0))
+
+
+class Subscription:
+    """One cache's callbacks; remote events are coalesced into a trailing debounce"""
+
+    def __init__(self, topic: str, invalidate: Callable[[List[InvalidationEvent]], None],
+                 reload: Optional[Callable[[], None]], local: bool, debounce: float):
+        self.topic = topic
+        self.invalidate = invalidate
+        self.reload = reload
+        self.local = local
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._pending: List[InvalidationEvent] = []
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self.invalidations = 0
+        self.reloads = 0
+
+    def deliver_local(self, event: InvalidationEvent) -> None:
+        if self.local:
+            self._run([event], reload=False)
+
+    def deliver_remote(self, event: InvalidationEvent) -> None:
+        if self.debounce <= 0:
+            self._run([event], reload=True)
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_at = now
+            self._pending.append(event)
+            self._last_at = now
+            if self._timer is None:
+                self._schedule(self.debounce)
+
+    def _schedule(self, delay: float) -> None:
+        self._timer = threading.Timer(delay, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            quiet = now - self._last_at
+            # Trailing debounce, but never hold events longer than 4 windows
+            if quiet < self.debounce and now - self._first_at < 4 * self.debounce:
+                self._schedule(self.debounce - quiet)
+                return
+            events, self._pending, self._timer = self._pending, [], None
+        if events:
+            self._run(events, reload=True)
+
+    def _run(self, events: List[InvalidationEvent], reload: bool) -> None:
+        try:
+            self.invalidate(events)
+            self.invalidations += 1
+            if reload and self.reload is not None:
+                self.reload()
+                self.reloads += 1
+        except Exception as e:
+            print(f"Error invalidating {self.topic}: {e}")
+
+    def flush(self) -> None:
+        """Run pending remote events now (shutdown, tests)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            events, self._pending, self._timer = self._pending, [], None
+        if events:
+            self._run(events, reload=True)
+
+
+class InvalidationBus:
+    """In-process backend: events reach this process's subscribers only"""
+
+    backend = "memory"
+
+    def __init__(self, debounce: Optional[float] = None):
+        self.origin = uuid.uuid4().hex[:12]
+        self.debounce = settings.INVALIDATION_DEBOUNCE_SECONDS if debounce is None else debounce
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._last_seen: Dict[str, int] = {}
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+
+    def subscribe(self, topic: str, invalidate: Callable[[List[InvalidationEvent]], None],
+                  reload: Optional[Callable[[], None]] = None, local: bool = True) -> Subscription:
+        """
+        Call invalidate(events) when `topic` changes; right away for this
+        process's events (unless local=False, for caches the writer updates
+        in place), debounced for other processes' events, followed by
+        reload() to warm the cache again.
+        """
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown invalidation topic {topic!r}")
+        subscription = Subscription(topic, invalidate, reload, local, self.debounce)
+        with self._lock:
+            self._subscriptions.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def publish(self, *topics: str, keys: Sequence = (), local: bool = True) -> InvalidationEvent:
+        """
+        Announce a committed change; call after db.commit(). local=False
+        when the writer already updated this process's caches in place.
+        """
+        unknown = set(topics) - set(TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown invalidation topics {sorted(unknown)}")
+        event = InvalidationEvent(tuple(topics), self.origin, next(self._versions), tuple(str(key) for key in keys))
+        self.published += 1
+        if local:
+            for subscription in self._matching(event):
+                subscription.deliver_local(event)
+        self._broadcast(event)
+        return event
+
+    def receive(self, event: InvalidationEvent) -> None:
+        """Deliver an event from another process"""
+        if event.origin == self.origin:
+            return
+        with self._lock:
+            if event.version <= self._last_seen.get(event.origin, 0):
+                self.dropped += 1
+                return
+            self._last_seen[event.origin] = event.version
+        self.received += 1
+        for subscription in self._matching(event):
+            subscription.deliver_remote(event)
+
+    def invalidate_all(self) -> None:
+        """Treat every topic as changed elsewhere (after missed notifications)"""
+        event = InvalidationEvent(TOPICS, "resync", 0)
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in subscriptions:
+                subscription.deliver_remote(event)
+
+    def _matching(self, event: InvalidationEvent) -> List[Subscription]:
+        with self._lock:
+            return [s for topic in event.topics for s in self._subscriptions.get(topic, ())]
+
+    def _broadcast(self, event: InvalidationEvent) -> None:
+        pass
+
+    def flush(self) -> None:
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in subscriptions:
+                subscription.flush()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            subscriptions = [s for subs in self._subscriptions.values() for s in subs]
+        return {
+            "backend": self.backend,
+            "origin": self.origin,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "known_origins": len(self._last_seen),
+            "subscriptions": [
+                {"topic": s.topic, "invalidations": s.invalidations, "reloads": s.reloads, "pending": len(s._pending)}
+                for s in subscriptions
+            ],
+        }
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """LISTEN/NOTIFY backend: one thread owns a dedicated connection for sending and listening"""
+
+    backend = "postgres"
+
+    def __init__(self, dsn: str, channel: str, debounce: Optional[float] = None):
+        super().__init__(debounce)
+        self.dsn = dsn
+        self.channel = channel
+        self._outbox: "queue.SimpleQueue[InvalidationEvent]" = queue.SimpleQueue()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.reconnects = 0
+        self.failed = 0  # events PostgreSQL rejected, dropped
+        self._backoff = 1.0
+
+    def _broadcast(self, event: InvalidationEvent) -> None:
+        # Never block the request on the database: the listener thread sends it
+        self._outbox.put(event)
+        self.start()
+        os.write(self._wake_write, b"\0")
+
+    def start(self) -> None:
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._run, name="invalidation-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        os.write(self._wake_write, b"\0")
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        super().stop()
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _wait_backoff(self) -> None:
+        self._stop.wait(self._backoff)
+        self._backoff = min(self._backoff * 2, 30.0)
+
+    def _run(self) -> None:
+        first = True
+        while not self._stop.is_set():
+            try:
+                connection = self._connect()
+            except Exception as e:
+                print(f"Invalidation listener could not connect: {e}")
+                self._wait_backoff()
+                continue
+            self.connected = True
+            if not first:
+                self.reconnects += 1
+                self.invalidate_all()
+            first = False
+            try:
+                self._listen(connection)
+            except Exception as e:
+                print(f"Invalidation listener lost its connection: {e}")
+            finally:
+                self.connected = False
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            # A connection that drops again right away must not turn into a
+            # reconnect (and invalidate-everything) loop; a send resets this
+            self._wait_backoff()
+
+    def _listen(self, connection) -> None:
+        while not self._stop.is_set():
+            self._send_pending(connection)
+            readable, _, _ = select.select([connection, self._wake_read], [], [], 5.0)
+            if self._wake_read in readable:
+                try:
+                    while os.read(self._wake_read, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+            connection.poll()
+            while connection.notifies:
+                notification = connection.notifies.pop(0)
+                try:
+                    self.receive(InvalidationEvent.from_json(notification.payload))
+                except (ValueError, KeyError) as e:
+                    print(f"Ignoring malformed invalidation event: {e}")
+        self._send_pending(connection)
+
+    def _send_pending(self, connection) -> None:
+        import psycopg2
+
+        with connection.cursor() as cursor:
+            while True:
+                try:
+                    event = self._outbox.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, event.to_payload()))
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    self._outbox.put(event)  # resent after reconnecting
+                    raise
+                except psycopg2.Error as e:
+                    # Sending it again would fail the same way
+                    self.failed += 1
+                    print(f"Dropping invalidation event {event.id}: {e}")
+                    continue
+                self._backoff = 1.0
+
+    def snapshot(self) -> dict:
+        return {
+            **super().snapshot(), "channel": self.channel, "connected": self.connected,
+            "reconnects": self.reconnects, "failed": self.failed,
+        }
+
+
+def create_bus() -> InvalidationBus:
+    from sqlalchemy.engine import make_url
+
+    url = make_url(settings.DATABASE_URL)
+    if settings.INVALIDATION_BACKEND == "postgres" and url.get_backend_name() == "postgresql":
+        try:
+            import psycopg2  # noqa: F401
+        except ImportError:
+            print("psycopg2 not installed, cache invalidation stays in-process")
+            return InvalidationBus()
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresInvalidationBus(dsn, settings.INVALIDATION_CHANNEL)
+    return InvalidationBus()
+
+
+@lru_cache(maxsize=None)
+def get_invalidation_bus() -> InvalidationBus:
+    return create_bus()
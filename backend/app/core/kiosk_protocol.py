@@ -0,0 +1,101 @@
+# app/core/kiosk_protocol.py
+"""
+Content negotiation for the kiosk check-in/check-out endpoints.
+
+Kiosks may post either JSON with a base64 `image_data` string or msgpack
+(Content-Type: application/msgpack) with the image as raw bytes, which
+skips the base64 round trip and a third of the payload. Responses follow
+the Accept header the same way. Both encodings are validated into the same
+typed KioskAttendanceRequest (KioskSyncRequest for offline batch sync).
+"""
+
+import json
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pydantic import ValidationError
+
+from app.core.responses import FastJSONResponse
+from app.schemas.attendance import KioskAttendanceRequest, KioskSyncRequest
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MSGPACK_MEDIA_TYPE = MSGPACK_TYPES[0]
+
+
+def _require_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise HTTPException(status_code=415, detail="msgpack is not available on this server; send application/json")
+    return msgpack
+
+
+def is_msgpack(content_type: str) -> bool:
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_TYPES
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_TYPES)
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return _require_msgpack().packb(content, use_bin_type=True, datetime=False, default=str)
+
+
+async def parse_kiosk_body(request: Request, model):
+    """The request body as JSON or msgpack, validated into `model`"""
+    body = await request.body()
+    try:
+        if is_msgpack(request.headers.get("content-type", "")):
+            try:
+                data = _require_msgpack().unpackb(body, raw=False)
+            except HTTPException:
+                raise
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid msgpack body")
+        else:
+            # json.loads + model_validate beats model_validate_json on a
+            # megabyte-long image string
+            try:
+                data = json.loads(body)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+
+async def parse_kiosk_request(request: Request) -> KioskAttendanceRequest:
+    """Dependency: the kiosk body as JSON or msgpack"""
+    return await parse_kiosk_body(request, KioskAttendanceRequest)
+
+
+async def parse_kiosk_sync_request(request: Request) -> KioskSyncRequest:
+    """Dependency: an offline batch as JSON or msgpack"""
+    return await parse_kiosk_body(request, KioskSyncRequest)
+
+
+def kiosk_response(request: Request, content: dict, status_code: int = 200) -> Response:
+    if wants_msgpack(request):
+        return MsgpackResponse(content, status_code=status_code)
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def _openapi_body(model) -> dict:
+    schema = model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}, MSGPACK_MEDIA_TYPE: {"schema": schema}},
+        }
+    }
+
+
+# Documents both body encodings on the routes that use the parsers above
+KIOSK_OPENAPI = _openapi_body(KioskAttendanceRequest)
+KIOSK_SYNC_OPENAPI = _openapi_body(KioskSyncRequest)
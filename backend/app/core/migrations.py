@@ -0,0 +1,26 @@
+# app/core/migrations.py
+import os
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic.ini")
+
+
+def get_alembic_heads() -> set:
+    """Head revisions of the migration scripts shipped with the app"""
+    script = ScriptDirectory.from_config(Config(ALEMBIC_INI))
+    return set(script.get_heads())
+
+
+def get_database_revisions(engine: Engine) -> set:
+    """Revisions recorded in the database's alembic_version table"""
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def schema_is_current(engine: Engine) -> bool:
+    """True when the database has been migrated to the Alembic head"""
+    return get_database_revisions(engine) == get_alembic_heads()
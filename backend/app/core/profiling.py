@@ -0,0 +1,353 @@
+# app/core/profiling.py
+"""
+On-demand request profiling.
+
+Profiling is armed from the admin API, either for the next N requests or for
+every request to a given route prefix. While disarmed the middleware does a
+single attribute check per request, so the steady-state overhead is negligible.
+
+A profile has two parts, since cProfile only sees the thread it was enabled in:
+
+  event loop   everything that ran on the event-loop thread while the request
+               was in flight. Coroutines of other requests interleaved with it
+               are included, so read it as loop time, not this request's alone.
+  threads      work the request handed to the threadpool through
+               profiled_threadpool (face recognition, frame checks), profiled
+               in the worker thread and attributed to this request only.
+
+Sync route handlers and dependencies, which FastAPI runs in the threadpool
+itself, appear in neither part; only their stage timings are recorded.
+"""
+
+import cProfile
+import heapq
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class RequestProfile:
+    """Captured profile of a single request"""
+    id: int
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    started_at: datetime
+    stages: Dict[str, float] = field(default_factory=dict)
+    stats_data: bytes = b""  # event-loop thread
+    thread_stats_data: bytes = b""  # this request's profiled_threadpool calls, merged
+    thread_calls: int = 0
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration_ms, 3),
+            "started_at": self.started_at.isoformat(),
+            "stages": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "thread_calls": self.thread_calls,
+        }
+
+    def top_functions(self, limit: int = 25) -> str:
+        """Render both parts of the profile as text, sorted by cumulative time"""
+        stream = io.StringIO()
+        stream.write("=== Event loop (includes other requests' coroutines that ran meanwhile) ===\n")
+        _print_stats(self.stats_data, stream, limit)
+        stream.write(f"\n=== Threadpool work of this request ({self.thread_calls} calls) ===\n")
+        if self.thread_stats_data:
+            _print_stats(self.thread_stats_data, stream, limit)
+        else:
+            stream.write("None recorded\n")
+        return stream.getvalue()
+
+
+class _StoredStats:
+    """Adapter that lets pstats.Stats load marshalled profiler stats"""
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _load_stats(data: bytes) -> pstats.Stats:
+    return pstats.Stats(_StoredStats(data))
+
+
+def _print_stats(data: bytes, stream, limit: int) -> None:
+    stats = _load_stats(data)
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(limit)
+
+
+class _ThreadProfiles:
+    """Collects the cProfile stats of one request's threadpool calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: List[dict] = []
+
+    def add(self, stats: dict) -> None:
+        with self._lock:
+            self._stats.append(stats)
+
+    def merged(self) -> tuple:
+        """(marshalled merged stats or b"", number of calls)"""
+        with self._lock:
+            collected = list(self._stats)
+        if not collected:
+            return b"", 0
+        stats = _load_stats(marshal.dumps(collected[0]))
+        for extra in collected[1:]:
+            stats.add(_StoredStats(marshal.dumps(extra)))
+        return marshal.dumps(stats.stats), len(collected)
+
+
+# Stage timings of the request currently being profiled (None when not profiling)
+_current_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("profile_stages", default=None)
+_current_threads: ContextVar[Optional[_ThreadProfiles]] = ContextVar("profile_threads", default=None)
+
+
+@contextmanager
+def _timed_stage(stages: Dict[str, float], name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def profile_stage(name: str):
+    """Time a block as a named stage of the current request profile.
+
+    Returns a no-op context manager when the request is not being profiled.
+    """
+    stages = _current_stages.get()
+    if stages is None:
+        return nullcontext()
+    return _timed_stage(stages, name)
+
+
+async def profiled_threadpool(func: Callable[..., T], *args, **kwargs) -> T:
+    """run_in_threadpool that, for a profiled request, profiles the call in the worker thread"""
+    threads = _current_threads.get()
+    if threads is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+
+    def profiled():
+        thread_profiler = cProfile.Profile()
+        thread_profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            thread_profiler.disable()
+            thread_profiler.create_stats()
+            threads.add(thread_profiler.stats)
+
+    return await run_in_threadpool(profiled)
+
+
+class RequestProfiler:
+    """Arms cProfile for selected requests and keeps the slowest K profiles"""
+
+    def __init__(self, keep_slowest: int):
+        self.keep_slowest = keep_slowest
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._route_prefix: Optional[str] = None
+        self._heap: List[tuple] = []  # min-heap of (duration_ms, id, RequestProfile)
+        self._ids = itertools.count(1)
+        self._active = False
+        self._memory_baseline: Optional[tracemalloc.Snapshot] = None
+
+    # ---- Control -------------------------------------------------------
+
+    def arm(self, requests: int = 0, route_prefix: Optional[str] = None) -> None:
+        """Profile the next `requests` requests, or all requests under `route_prefix`"""
+        with self._lock:
+            self._remaining = requests
+            self._route_prefix = route_prefix
+            self.enabled = requests > 0 or route_prefix is not None
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._remaining = 0
+            self._route_prefix = None
+            self.enabled = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap = []
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "remaining_requests": self._remaining,
+            "route_prefix": self._route_prefix,
+            "captured": len(self._heap),
+            "keep_slowest": self.keep_slowest,
+            "tracemalloc_tracing": tracemalloc.is_tracing(),
+        }
+
+    def should_profile(self, path: str) -> bool:
+        """Claim a profiling slot for this request, if one is available"""
+        with self._lock:
+            # cProfile can only be active once per interpreter, so concurrent
+            # requests are skipped rather than profiled together.
+            if self._active:
+                return False
+            if self._route_prefix is not None:
+                if not path.startswith(self._route_prefix):
+                    return False
+            elif self._remaining <= 0:
+                return False
+            else:
+                self._remaining -= 1
+                if self._remaining == 0:
+                    self.enabled = False
+            self._active = True
+            return True
+
+    # ---- Capture -------------------------------------------------------
+
+    async def profile_request(self, app, scope, receive, send) -> None:
+        """Run an ASGI request under cProfile and record the result"""
+        stages: Dict[str, float] = {}
+        threads = _ThreadProfiles()
+        token = _current_stages.set(stages)
+        threads_token = _current_threads.set(threads)
+        profiler = cProfile.Profile()
+        started_at = datetime.utcnow()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            await app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+            _current_stages.reset(token)
+            _current_threads.reset(threads_token)
+            profiler.create_stats()
+            thread_stats_data, thread_calls = threads.merged()
+            self._record(RequestProfile(
+                id=next(self._ids),
+                method=scope.get("method", ""),
+                path=scope["path"],
+                status_code=status_code,
+                duration_ms=duration_ms,
+                started_at=started_at,
+                stages=stages,
+                stats_data=marshal.dumps(profiler.stats),
+                thread_stats_data=thread_stats_data,
+                thread_calls=thread_calls,
+            ))
+
+    def _record(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active = False
+            entry = (profile.duration_ms, profile.id, profile)
+            if len(self._heap) < self.keep_slowest:
+                heapq.heappush(self._heap, entry)
+            elif entry > self._heap[0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def profiles(self) -> List[RequestProfile]:
+        """Captured profiles, slowest first"""
+        with self._lock:
+            return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def get_profile(self, profile_id: int) -> Optional[RequestProfile]:
+        for profile in self.profiles():
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    # ---- Memory --------------------------------------------------------
+
+    def start_memory_tracing(self, frames: int = 10) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._memory_baseline = tracemalloc.take_snapshot()
+
+    def stop_memory_tracing(self) -> None:
+        self._memory_baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def memory_snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+        return tracemalloc.take_snapshot()
+
+    def memory_growth(self, limit: int = 25) -> List[dict]:
+        """Top allocation sites that grew since tracing was started"""
+        snapshot = self.memory_snapshot()
+        if self._memory_baseline is None:
+            stats = snapshot.statistics("lineno")
+            return [
+                {"location": str(stat.traceback), "size_kb": stat.size / 1024, "count": stat.count}
+                for stat in stats[:limit]
+            ]
+        diff = snapshot.compare_to(self._memory_baseline, "lineno")
+        return [
+            {
+                "location": str(stat.traceback),
+                "size_kb": stat.size / 1024,
+                "size_diff_kb": stat.size_diff / 1024,
+                "count_diff": stat.count_diff,
+            }
+            for stat in diff[:limit]
+        ]
+
+
+profiler = RequestProfiler(keep_slowest=settings.PROFILER_KEEP_SLOWEST)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands armed requests to the profiler.
+
+    Implemented as plain ASGI rather than BaseHTTPMiddleware so that the
+    disarmed path costs a single attribute check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and profiler.enabled
+            and profiler.should_profile(scope["path"])
+        ):
+            await profiler.profile_request(self.app, scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
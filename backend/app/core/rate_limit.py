@@ -0,0 +1,262 @@
+# app/core/rate_limit.py
+"""
+Per-device token-bucket rate limiting for the kiosk (recognition) endpoints.
+
+A request is keyed by its kiosk: the X-Device-Id header, else X-API-Key,
+else the client address. Each key has a bucket of RATE_LIMIT_BURST tokens
+refilled at RATE_LIMIT_PER_MINUTE, and every client address has a wider
+bucket on top so rotating device ids does not escape the limit. A request
+that finds its bucket empty gets 429 with Retry-After. Failed recognitions
+(4xx) cost RATE_LIMIT_FAILURE_COST tokens, so a kiosk stuck retrying
+"Face not recognized" backs off quickly while working kiosks are untouched.
+
+Buckets live in process memory by default. With RATE_LIMIT_BACKEND=redis
+(and the redis package installed) they are shared by all workers; if Redis
+is unreachable the in-memory store takes over.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.admission import RECOGNITION, classify
+from app.core.config import settings
+
+
+@dataclass
+class BucketRule:
+    rate: float  # tokens per second
+    burst: float
+
+    @classmethod
+    def per_minute(cls, per_minute: float, burst: float) -> "BucketRule":
+        return cls(rate=per_minute / 60.0, burst=float(burst))
+
+    def retry_after(self, tokens: float, cost: float = 1.0) -> int:
+        return max(int(math.ceil((cost - tokens) / self.rate)), 1)
+
+
+class MemoryRateLimitStore:
+    """Buckets in a dict; the local stand-in for the shared store"""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 50000):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated)
+        self.max_keys = max_keys
+
+    async def take(self, key: str, rule: BucketRule, cost: float = 1.0, force: bool = False) -> Tuple[bool, float]:
+        """Take `cost` tokens if available (always with force); returns (allowed, tokens left)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.burst, now))
+            tokens = min(rule.burst, tokens + (now - updated) * rule.rate)
+            allowed = tokens >= cost
+            if allowed or force:
+                # Penalties may go below zero, down to one burst of debt
+                tokens = max(tokens - cost, -rule.burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, tokens
+
+    def _prune(self, now: float) -> None:
+        # Drop buckets idle long enough to have refilled completely
+        idle = 600.0
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < idle}
+
+
+# Token bucket with the server clock so every worker agrees on refill
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local force = ARGV[4] == '1'
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then allowed = 1 end
+if allowed == 1 or force then tokens = math.max(tokens - cost, -burst) end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(2 * burst / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitStore:
+    """Buckets in Redis, updated atomically by a Lua script"""
+
+    name = "redis"
+
+    def __init__(self, url: str, fallback: MemoryRateLimitStore, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(TAKE_SCRIPT)
+        self._fallback = fallback
+        self._prefix = prefix
+        self._retry_at = 0.0
+
+    async def take(self, key: str, rule: BucketRule, cost: float = 1.0, force: bool = False) -> Tuple[bool, float]:
+        if time.monotonic() >= self._retry_at:
+            try:
+                allowed, tokens = await self._script(
+                    keys=[self._prefix + hashlib.sha1(key.encode()).hexdigest()],
+                    args=[rule.rate, rule.burst, cost, 1 if force else 0],
+                )
+                return bool(allowed), float(tokens)
+            except Exception as e:
+                print(f"Rate limit store unavailable, using in-memory buckets: {e}")
+                self._retry_at = time.monotonic() + 30.0
+        return await self._fallback.take(key, rule, cost, force)
+
+
+@dataclass
+class DeviceStats:
+    allowed: int = 0
+    limited: int = 0
+    failures: int = 0
+    last_seen: float = 0.0
+
+
+class RateLimiter:
+    def __init__(self, store, device_rule: BucketRule, address_rule: BucketRule, failure_cost: float, track_devices: int = 1000):
+        self.store = store
+        self.device_rule = device_rule
+        self.address_rule = address_rule
+        self.failure_cost = failure_cost
+        self.track_devices = track_devices
+        self._stats: Dict[str, DeviceStats] = {}
+
+    @staticmethod
+    def keys(scope) -> Tuple[str, str]:
+        """(device key, address key) of a request"""
+        headers = dict(scope.get("headers") or [])
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        device_id = headers.get(b"x-device-id")
+        api_key = headers.get(b"x-api-key")
+        if device_id:
+            device = "device:" + device_id.decode("latin-1")[:128]
+        elif api_key:
+            # Never keep raw API keys in memory or in metrics
+            device = "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+        else:
+            device = "ip:" + address
+        return device, "ip:" + address
+
+    def _device_stats(self, device: str) -> DeviceStats:
+        stats = self._stats.get(device)
+        if stats is None:
+            if len(self._stats) >= self.track_devices:
+                oldest = min(self._stats, key=lambda k: self._stats[k].last_seen)
+                del self._stats[oldest]
+            stats = self._stats[device] = DeviceStats()
+        stats.last_seen = time.time()
+        return stats
+
+    async def check(self, device: str, address: str) -> Optional[int]:
+        """None when admitted, otherwise the Retry-After in seconds"""
+        stats = self._device_stats(device)
+        allowed, tokens = await self.store.take(device, self.device_rule)
+        retry_after = None if allowed else self.device_rule.retry_after(tokens)
+        if allowed and address != device:
+            allowed, tokens = await self.store.take(address, self.address_rule)
+            if not allowed:
+                retry_after = self.address_rule.retry_after(tokens)
+        if allowed:
+            stats.allowed += 1
+        else:
+            stats.limited += 1
+        return retry_after
+
+    async def penalize(self, device: str) -> None:
+        """Charge the extra cost of a failed request"""
+        self._device_stats(device).failures += 1
+        if self.failure_cost > 1:
+            await self.store.take(device, self.device_rule, cost=self.failure_cost - 1, force=True)
+
+    def snapshot(self, limit: int = 50) -> dict:
+        devices = sorted(self._stats.items(), key=lambda item: (item[1].limited, item[1].failures), reverse=True)
+        return {
+            "backend": self.store.name,
+            "device_rule": {"per_minute": self.device_rule.rate * 60, "burst": self.device_rule.burst},
+            "address_rule": {"per_minute": self.address_rule.rate * 60, "burst": self.address_rule.burst},
+            "failure_cost": self.failure_cost,
+            "tracked_devices": len(self._stats),
+            "devices": [
+                {
+                    "key": key,
+                    "allowed": stats.allowed,
+                    "limited": stats.limited,
+                    "failures": stats.failures,
+                    "last_seen": stats.last_seen,
+                }
+                for key, stats in devices[:limit]
+            ],
+        }
+
+
+def create_store():
+    memory = MemoryRateLimitStore()
+    if settings.RATE_LIMIT_BACKEND == "redis" and settings.REDIS_URL:
+        try:
+            return RedisRateLimitStore(settings.REDIS_URL, fallback=memory)
+        except ImportError:
+            print("redis package not installed, rate limit buckets stay in memory")
+    return memory
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    return RateLimiter(
+        create_store(),
+        BucketRule.per_minute(settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_BURST),
+        BucketRule.per_minute(settings.RATE_LIMIT_ADDRESS_PER_MINUTE, settings.RATE_LIMIT_ADDRESS_BURST),
+        settings.RATE_LIMIT_FAILURE_COST,
+    )
+
+
+class RateLimitMiddleware:
+    """Answers 429 for kiosks that exceed their bucket, before any recognition work"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or classify(scope["method"], scope["path"]) != RECOGNITION:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_rate_limiter()
+        device, address = limiter.keys(scope)
+        retry_after = await limiter.check(device, address)
+        if retry_after is not None:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", str(retry_after).encode())],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail": "Too many requests from this device"}'})
+            return
+
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        if status is not None and 400 <= status < 500:
+            await limiter.penalize(device)
@@ -0,0 +1,52 @@
+# app/core/responses.py
+"""
+Fast JSON responses.
+
+FastJSONResponse is the application's default response class. It renders
+with orjson, which serializes UUID, datetime, date, Enum, dataclasses and
+NumPy arrays/scalars natively, so read endpoints can return plain row dicts
+without a jsonable_encoder pass. Without orjson installed it falls back to
+the standard encoder.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def _default(obj: Any):
+    """Types orjson does not handle itself"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    return jsonable_encoder(obj)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is None:
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows) -> list:
+    """Result rows (Row or RowMapping) as plain dicts, ready for FastJSONResponse"""
+    return [dict(row._mapping) if hasattr(row, "_mapping") else dict(row) for row in rows]
@@ -1,22 +1,127 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+import asyncio
 import os
+import threading
 
-from app.api.v1 import auth, attendance, employees, face_recognition
+from app.api.v1 import admin, auth, attendance, departments, employees, face_recognition, leaves, profiling
+from app.core.admission import AdmissionMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.profiling import ProfilingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.responses import FastJSONResponse
 from app.core.database import Base, engine, SessionLocal
+from app.core.db_routing import LAST_WRITE_HEADER, ReadYourWritesMiddleware
+from app.core.invalidation import get_invalidation_bus
+from app.core.migrations import schema_is_current
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
+from app.services.directory_service import get_employee_directory
+from app.services.partition_service import PartitionService
+from app.services.retention_service import run_retention_loop
+from app.services.simple_face_service import get_face_service
+
+def bootstrap_schema() -> None:
+    """Create tables and the default admin when the database is not managed by Alembic"""
+    try:
+        if schema_is_current(engine):
+            return
+    except Exception as e:
+        print(f"Could not read Alembic revision: {e}")
+
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+
+    # Seed default admin user if not exists
+    db = SessionLocal()
+    try:
+        existing = db.query(User).filter(User.username == "admin").first()
+        if not existing:
+            user = User(
+                username="admin",
+                email="admin@example.com",
+                full_name="System Administrator",
+                hashed_password=get_password_hash("123456"),
+                role=UserRole.ADMIN,
+                is_active=True,
+                is_verified=True,
+            )
+            db.add(user)
+            db.commit()
+            print("Default admin user created: admin/123456")
+    except Exception as e:
+        print(f"Error creating admin user: {e}")
+    finally:
+        db.close()
+
+def warm_up_face_gallery() -> None:
+    """Map (or load) the face gallery and load the employee directory so the first check-in does not pay for them"""
+    db = SessionLocal()
+    try:
+        get_face_service().ensure_gallery(db)
+        get_employee_directory().load(db)
+    except Exception as e:
+        print(f"Error warming up face gallery: {e}")
+    finally:
+        db.close()
+
+async def maintain_partitions_daily() -> None:
+    """Keep future attendance partitions created while the API runs (one worker at a time, under an advisory lock)"""
+    service = PartitionService(engine)
+    while True:
+        try:
+            result = await asyncio.to_thread(service.run_maintenance)
+            if result["created"] or result["detached"]:
+                print(f"Partition maintenance: {result}")
+        except Exception as e:
+            print(f"Error maintaining partitions: {e}")
+        await asyncio.sleep(24 * 60 * 60)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(bootstrap_schema)
+
+    # Hear other workers' writes (LISTEN/NOTIFY) so cached data follows them
+    invalidation_bus = get_invalidation_bus()
+    invalidation_bus.start()
+
+    # Warm up in the background; /health/ready reports when it is done
+    app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up_face_gallery))
+    background_tasks = []
+    if engine.dialect.name == "postgresql":
+        background_tasks.append(asyncio.create_task(maintain_partitions_daily()))
+
+    # Retention sleeps between batches, so it gets its own thread
+    stop_retention = threading.Event()
+    if settings.RETENTION_INTERVAL_SECONDS > 0:
+        threading.Thread(target=run_retention_loop, args=(stop_retention,), daemon=True).start()
+    yield
+    app.state.warm_up.cancel()
+    for task in background_tasks:
+        task.cancel()
+    stop_retention.set()
+    await asyncio.to_thread(invalidation_bus.stop)
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="Attendance Camera System API",
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Priority admission: check-ins before writes before reports. Added before
+# CORS so CORS still wraps its 503 (and the rate limiter's 429) responses.
+app.add_middleware(AdmissionMiddleware)
+
+# Per-kiosk token buckets, checked before a request can queue for admission
+app.add_middleware(RateLimitMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -24,8 +129,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
+# Pin clients to the primary database right after they write
+app.add_middleware(ReadYourWritesMiddleware)
+
+# On-demand request profiling (armed through /api/v1/admin/profiling)
+app.add_middleware(ProfilingMiddleware)
+
+# gzip/brotli for larger text responses (outermost, so it sees final bodies)
+app.add_middleware(CompressionMiddleware)
+
 # Mount static files for uploads
 if os.path.exists(settings.UPLOAD_DIR):
     app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
@@ -35,6 +150,10 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(employees.router, prefix="/api/v1/employees", tags=["Employees"])
 app.include_router(attendance.router, prefix="/api/v1/attendance", tags=["Attendance"])
 app.include_router(face_recognition.router, prefix="/api/v1/face", tags=["Face Recognition"])
+app.include_router(departments.router, prefix="/api/v1/departments", tags=["Departments"])
+app.include_router(leaves.router, prefix="/api/v1/leaves", tags=["Leaves"])
+app.include_router(profiling.router, prefix="/api/v1/admin/profiling", tags=["Profiling"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -46,34 +165,20 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy", "environment": settings.ENVIRONMENT}
 
-@app.on_event("startup")
-async def on_startup() -> None:
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
-
-    # Seed default admin user if not exists
-    db = SessionLocal()
-    try:
-        existing = db.query(User).filter(User.username == "admin").first()
-        if not existing:
-            user = User(
-                username="admin",
-                email="admin@example.com",
-                full_name="System Administrator",
-                hashed_password=get_password_hash("123456"),
-                role=UserRole.ADMIN,
-                is_active=True,
-                is_verified=True,
-            )
-            db.add(user)
-            db.commit()
-            print("Default admin user created: admin/123456")
-    except Exception as e:
-        print(f"Error creating admin user: {e}")
-    finally:
-        db.close()
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: startup warm-up has finished"""
+    warm_up = getattr(app.state, "warm_up", None)
+    gallery_loaded = get_face_service().gallery_loaded
+    ready = warm_up is not None and warm_up.done()
+    body = {
+        "status": "ready" if ready else "starting",
+        "face_gallery_loaded": gallery_loaded,
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
 
 if __name__ == "__main__":
     import uvicorn
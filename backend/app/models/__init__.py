@@ -1,10 +1,10 @@
 from app.models.base import BaseModel
 from app.models.employee import Employee
-from app.models.attendance import AttendanceRecord, AttendanceSummary
+from app.models.attendance import AttendanceRecord, AttendanceSummary, AttendanceSyncEvent
 from app.models.shift import WorkShift, EmployeeShift
-from app.models.department import Department
+from app.models.department import Department, DepartmentClosure
 from app.models.leave import Leave, LeaveBalance
-from app.models.user import User
+from app.models.user import User, RefreshToken
 from app.models.audit import AuditLog
 
 __all__ = [
@@ -12,11 +12,14 @@ __all__ = [
     "Employee",
     "AttendanceRecord",
     "AttendanceSummary",
+    "AttendanceSyncEvent",
     "WorkShift",
     "EmployeeShift",
     "Department",
+    "DepartmentClosure",
     "Leave",
     "LeaveBalance",
     "User",
+    "RefreshToken",
     "AuditLog"
 ]
\ No newline at end of file
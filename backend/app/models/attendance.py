@@ -23,7 +23,9 @@ class AttendanceRecord(Base, BaseModel):
     shift_id = Column(UUID(as_uuid=True), ForeignKey("work_shifts.id"))
     
     # Check-in/out Times
-    check_in_time = Column(DateTime)
+    # On PostgreSQL the table is range-partitioned by month on check_in_time
+    # (see app/services/partition_service.py), so always filter it by range
+    check_in_time = Column(DateTime, nullable=False)
     check_out_time = Column(DateTime)
     
     # Scheduled Times (from shift)
@@ -99,4 +101,21 @@ class AttendanceSummary(Base, BaseModel):
     # Unique constraint
     __table_args__ = (
         UniqueConstraint('employee_id', 'month', 'year'),
-    )
\ No newline at end of file
+    )
+
+class AttendanceSyncEvent(Base, BaseModel):
+    """Outcome of an offline kiosk event, keyed by the kiosk's idempotency key"""
+    __tablename__ = "attendance_sync_events"
+    
+    device_id = Column(String(100), nullable=False)
+    idempotency_key = Column(String(100), nullable=False)
+    action = Column(String(20), nullable=False)  # check_in / check_out
+    event_time = Column(DateTime)
+    status = Column(String(30), nullable=False)  # checked_in, checked_out, not_recognized, ...
+    employee_id = Column(UUID(as_uuid=True), ForeignKey("employees.id", ondelete="SET NULL"))
+    attendance_record_id = Column(UUID(as_uuid=True))  # no FK: attendance_records is partitioned
+    message = Column(String(255))
+    
+    __table_args__ = (
+        UniqueConstraint('device_id', 'idempotency_key'),
+    )
@@ -1,5 +1,5 @@
 # app/models/department.py
-from sqlalchemy import Column, String, Boolean, ForeignKey, Integer, Text
+from sqlalchemy import Column, String, Boolean, ForeignKey, Integer, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
@@ -27,7 +27,7 @@ class Department(Base, BaseModel):
     
     # Status
     is_active = Column(Boolean, default=True)
-    employee_count = Column(Integer, default=0)
+    employee_count = Column(Integer, default=0)  # Active employees directly in this department
     
     # Budget and Cost Center
     cost_center = Column(String(50))
@@ -36,4 +36,17 @@ class Department(Base, BaseModel):
     # Relationships
     employees = relationship("Employee", back_populates="department", foreign_keys="Employee.department_id")
     manager = relationship("Employee", foreign_keys=[manager_id])
-    sub_departments = relationship("Department", backref="parent_department", remote_side="Department.id")
\ No newline at end of file
+    sub_departments = relationship("Department", backref="parent_department", remote_side="Department.id")
+
+
+class DepartmentClosure(Base):
+    """Every (ancestor, descendant) pair of the department tree, including each department with itself at depth 0"""
+    __tablename__ = "department_closure"
+    
+    ancestor_id = Column(UUID(as_uuid=True), ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(UUID(as_uuid=True), ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_department_closure_descendant", "descendant_id", "depth"),
+    )
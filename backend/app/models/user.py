@@ -54,4 +54,19 @@ class User(Base, BaseModel):
     
     # Relationships
     employee = relationship("Employee", backref="user", uselist=False)
-    audit_logs = relationship("AuditLog", back_populates="user")
\ No newline at end of file
+    audit_logs = relationship("AuditLog", back_populates="user")
+
+
+class RefreshToken(Base, BaseModel):
+    """One issued refresh token. Tokens rotated from the same login share a family_id."""
+    __tablename__ = "refresh_tokens"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False)  # HMAC-SHA256 of the secret part, hex
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime)  # set when rotated; presenting it again is reuse
+    revoked_at = Column(DateTime)
+    replaced_by_id = Column(UUID(as_uuid=True))
+    user_agent = Column(String(255))
+    ip_address = Column(String(50))
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, StrictBytes, StrictStr
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from app.services.file_service import decode_image_data
+
+class KioskAttendanceRequest(BaseModel):
+    """Check-in/check-out body from a kiosk, as JSON or msgpack"""
+    # A base64 string / data URL (JSON) or raw image bytes (msgpack). str comes
+    # first: in JSON mode pydantic would otherwise take the string as bytes.
+    image_data: Union[StrictStr, StrictBytes]
+    location: Optional[str] = None
+    device_info: Optional[Dict[str, Any]] = None
+    timestamp: Optional[str] = None  # ISO format from the kiosk; server time when missing
+
+    def image_bytes(self) -> bytes:
+        if isinstance(self.image_data, bytes):
+            return self.image_data
+        return decode_image_data(self.image_data)
+
+class KioskSyncEvent(KioskAttendanceRequest):
+    """One check-in/check-out a kiosk queued while offline"""
+    idempotency_key: StrictStr  # generated by the kiosk, unique per device
+    action: Literal["check_in", "check_out"]
+    timestamp: StrictStr  # when it happened, not when it was synced
+
+class KioskSyncRequest(BaseModel):
+    """Offline events replayed in one request; device_id falls back to the X-Device-Id header"""
+    device_id: Optional[StrictStr] = None
+    events: List[KioskSyncEvent]
@@ -0,0 +1,68 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date
+import uuid
+
+class DepartmentCreate(BaseModel):
+    department_code: str
+    department_name: str
+    description: Optional[str] = None
+    parent_department_id: Optional[uuid.UUID] = None
+    manager_id: Optional[uuid.UUID] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    cost_center: Optional[str] = None
+    budget_code: Optional[str] = None
+
+class DepartmentUpdate(BaseModel):
+    department_code: Optional[str] = None
+    department_name: Optional[str] = None
+    description: Optional[str] = None
+    parent_department_id: Optional[uuid.UUID] = None
+    manager_id: Optional[uuid.UUID] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    is_active: Optional[bool] = None
+    cost_center: Optional[str] = None
+    budget_code: Optional[str] = None
+
+class DepartmentResponse(BaseModel):
+    id: uuid.UUID
+    department_code: str
+    department_name: str
+    description: Optional[str] = None
+    parent_department_id: Optional[uuid.UUID] = None
+    department_level: Optional[int] = None
+    manager_id: Optional[uuid.UUID] = None
+    is_active: Optional[bool] = None
+    employee_count: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class DepartmentNode(BaseModel):
+    department: DepartmentResponse
+    depth: int
+
+class DepartmentRollup(BaseModel):
+    department_id: uuid.UUID
+    department_code: str
+    department_name: str
+    total_employees: int
+    records: int
+    employees_present: int
+    late: int
+    still_working: int
+    work_hours: float
+    overtime_hours: float
+    checked_in: Optional[int] = None
+    not_checked_in: Optional[int] = None
+    attendance_rate: Optional[float] = None
+
+class DepartmentRollupResponse(BaseModel):
+    start_date: date
+    end_date: date
+    department: DepartmentRollup
+    children: List[DepartmentRollup]
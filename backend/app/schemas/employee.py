@@ -44,3 +44,33 @@ class EmployeeResponse(EmployeeBase):
 
     class Config:
         from_attributes = True
+
+class EmployeeListItem(BaseModel):
+    """Projection of an employee for list pages; only the requested fields are set"""
+    id: Optional[uuid.UUID] = None
+    employee_code: Optional[str] = None
+    full_name: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    department_id: Optional[uuid.UUID] = None
+    position: Optional[str] = None
+    hire_date: Optional[date] = None
+    is_active: Optional[bool] = None
+    has_face: Optional[bool] = None
+    face_encoding: Optional[List[float]] = None
+    face_images: Optional[List[str]] = None
+
+class EmployeeSearchResult(BaseModel):
+    id: uuid.UUID
+    employee_code: str
+    full_name: str
+    email: str
+    department_id: Optional[uuid.UUID] = None
+    position: Optional[str] = None
+    is_active: bool
+    score: float
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,61 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date, datetime
+import uuid
+
+from app.models.leave import LeaveStatus, LeaveType
+
+class LeaveCreate(BaseModel):
+    employee_code: str
+    leave_type: LeaveType
+    start_date: date
+    end_date: date
+    reason: str
+    is_half_day: bool = False
+    half_day_period: Optional[str] = None
+    is_emergency: bool = False
+
+class LeaveDecision(BaseModel):
+    notes: Optional[str] = None
+
+class LeaveResponse(BaseModel):
+    id: uuid.UUID
+    employee_id: uuid.UUID
+    leave_type: LeaveType
+    start_date: date
+    end_date: date
+    total_days: int
+    is_half_day: bool = False
+    half_day_period: Optional[str] = None
+    reason: str
+    status: LeaveStatus
+    approved_by: Optional[uuid.UUID] = None
+    approval_date: Optional[datetime] = None
+    approval_notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class LeaveIntervalResponse(BaseModel):
+    leave_id: uuid.UUID
+    employee_id: uuid.UUID
+    start: date
+    end: date
+    leave_type: LeaveType
+    is_half_day: bool = False
+
+    class Config:
+        from_attributes = True
+
+class AvailableEmployee(BaseModel):
+    employee_id: uuid.UUID
+    employee_code: str
+    full_name: str
+
+class AvailabilityResponse(BaseModel):
+    department_id: uuid.UUID
+    start_date: date
+    end_date: date
+    total_employees: int
+    available: List[AvailableEmployee]
+    on_leave: List[LeaveIntervalResponse]
@@ -0,0 +1,341 @@
+"""
+Attendance state transitions and offline kiosk sync.
+
+A kiosk that lost connectivity queues its check-ins and check-outs with the
+time they happened and an idempotency key it generated, and replays them
+through POST /attendance/sync when it is back online. For a batch the
+service
+
+  1. answers events whose (device, key) was synced before from
+     attendance_sync_events, so a retried upload changes nothing;
+  2. gates the remaining frames on quality and recognizes them in parallel
+     through the face service;
+  3. replays the events in timestamp order against the employees' open
+     attendance records, with the rules of /check-in and /check-out;
+  4. writes the records and the idempotency rows in one transaction per
+     KIOSK_SYNC_CHUNK_SIZE events.
+
+Every event gets a result, returned in request order. If a chunk cannot be
+committed (the same keys synced concurrently), it and the later events are
+reported as not_processed and can be retried with the same keys.
+"""
+
+import asyncio
+import binascii
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+import pytz
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.invalidation import ATTENDANCE, get_invalidation_bus
+from app.core.profiling import profiled_threadpool
+from app.models.attendance import AttendanceRecord, AttendanceStatus, AttendanceSyncEvent
+from app.schemas.attendance import KioskSyncEvent
+from app.services.directory_service import get_employee_directory
+from app.services.frame_quality import FrameQualityError, get_frame_quality_gate
+
+# Set timezone to Bangkok/Vietnam (UTC+7)
+LOCAL_TZ = pytz.timezone('Asia/Bangkok')
+
+CHECKED_IN = "checked_in"
+CHECKED_OUT = "checked_out"
+NOT_RECOGNIZED = "not_recognized"
+ALREADY_CHECKED_IN = "already_checked_in"
+NO_CHECK_IN = "no_check_in"
+INVALID = "invalid"
+NOT_PROCESSED = "not_processed"
+
+MESSAGES = {
+    CHECKED_IN: "Check-in successful",
+    CHECKED_OUT: "Check-out successful",
+    NOT_RECOGNIZED: "Face not recognized",
+    ALREADY_CHECKED_IN: "Already checked in",
+    NO_CHECK_IN: "No check-in record found",
+    NOT_PROCESSED: "Not processed; retry with the same key",
+}
+
+KEY_MAX_LENGTH = 100
+# A batch touching more employees than this announces a keyless ATTENDANCE
+# event (the whole topic changed) instead of a long list of ids
+INVALIDATION_MAX_KEYS = 20
+
+
+def calculate_work_hours(check_in_time: datetime, check_out_time: datetime) -> float:
+    """Calculate work hours between check-in and check-out times"""
+    time_diff = check_out_time - check_in_time
+    return round(time_diff.total_seconds() / 3600, 2)  # Convert to hours
+
+
+def local_now() -> datetime:
+    """Current time as naive local time, the convention of the attendance DateTime columns"""
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+
+def parse_local_time(timestamp: str) -> datetime:
+    """Kiosk ISO timestamp as naive local time (how today-status and the day bounds compare)"""
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(LOCAL_TZ).replace(tzinfo=None)
+    return parsed
+
+
+@dataclass
+class _Item:
+    index: int
+    event: KioskSyncEvent
+    time: Optional[datetime] = None
+    image: Optional[bytes] = None
+    employee_id: Optional[uuid.UUID] = None
+    status: Optional[str] = None
+    message: Optional[str] = None
+    record_id: Optional[uuid.UUID] = None
+    image_path: Optional[str] = None
+
+
+class AttendanceSyncService:
+    def __init__(self, db: AsyncSession, face_service, file_service):
+        self.db = db
+        self.face_service = face_service
+        self.file_service = file_service
+        self.directory = get_employee_directory()
+
+    async def sync(self, device_id: str, events: List[KioskSyncEvent]) -> List[dict]:
+        stored = await self._stored(device_id, {event.idempotency_key for event in events})
+
+        items: List[_Item] = []
+        results: List[Optional[dict]] = [None] * len(events)
+        first_seen: Dict[str, int] = {}
+        repeats: List[Tuple[int, int]] = []
+        for index, event in enumerate(events):
+            key = event.idempotency_key
+            if key in stored:
+                continue
+            if key in first_seen:
+                repeats.append((index, first_seen[key]))  # same key twice in one batch
+                continue
+            first_seen[key] = index
+            items.append(_Item(index, event))
+
+        self._prepare(items)
+        await self._recognize(items)
+        await self._apply(device_id, items)
+
+        employee_ids = {item.employee_id for item in items if item.employee_id}
+        employee_ids |= {row.employee_id for row in stored.values() if row.employee_id}
+        names = await self.directory.lookup_async(self.db, employee_ids)
+
+        for item in items:
+            results[item.index] = self._result(item, names)
+        for index, event in enumerate(events):
+            if event.idempotency_key in stored:
+                results[index] = self._stored_result(stored[event.idempotency_key], names)
+        for index, first in repeats:
+            results[index] = {**results[first], "replayed": True}
+
+        changed = {item.employee_id for item in items if item.status in (CHECKED_IN, CHECKED_OUT)}
+        if changed:
+            keys = sorted(changed, key=str) if len(changed) <= INVALIDATION_MAX_KEYS else ()
+            get_invalidation_bus().publish(ATTENDANCE, keys=keys)
+        return results
+
+    # ---- Steps ---------------------------------------------------------
+
+    async def _stored(self, device_id: str, keys) -> Dict[str, AttendanceSyncEvent]:
+        if not keys:
+            return {}
+        rows = (await self.db.execute(
+            select(AttendanceSyncEvent).where(
+                AttendanceSyncEvent.device_id == device_id,
+                AttendanceSyncEvent.idempotency_key.in_(keys),
+            )
+        )).scalars().all()
+        return {row.idempotency_key: row for row in rows}
+
+    def _prepare(self, items: List[_Item]) -> None:
+        """Parse timestamps and decode images; bad events are answered without recognition"""
+        for item in items:
+            if not item.event.idempotency_key or len(item.event.idempotency_key) > KEY_MAX_LENGTH:
+                item.status, item.message = INVALID, f"idempotency_key must be 1-{KEY_MAX_LENGTH} characters"
+                continue
+            try:
+                item.time = parse_local_time(item.event.timestamp)
+            except ValueError:
+                item.status, item.message = INVALID, "Invalid timestamp"
+                continue
+            try:
+                item.image = item.event.image_bytes()
+            except (binascii.Error, ValueError):
+                item.image = None
+            if not item.image:
+                item.status, item.message = INVALID, "Invalid image data"
+
+    async def _recognize(self, items: List[_Item]) -> None:
+        todo = [item for item in items if item.status is None]
+        if not todo:
+            return
+        await self.face_service.ensure_gallery_async(self.db)
+        limit = asyncio.Semaphore(max(settings.KIOSK_SYNC_RECOGNITION_CONCURRENCY, 1))
+        gate = get_frame_quality_gate()
+
+        async def identify(item: _Item) -> None:
+            async with limit:
+                try:
+                    await profiled_threadpool(gate.check, item.image)
+                except FrameQualityError as e:
+                    item.status, item.message = e.code, str(e)
+                    return
+                employee_id = await profiled_threadpool(self.face_service.identify_face, item.image)
+            if employee_id:
+                item.employee_id = uuid.UUID(employee_id)
+            else:
+                item.status = NOT_RECOGNIZED
+
+        await asyncio.gather(*(identify(item) for item in todo))
+
+    async def _open_records(self, items: List[_Item]) -> Dict[Tuple[uuid.UUID, datetime], AttendanceRecord]:
+        """Open (not checked-out) records of the batch's employees on the batch's days"""
+        recognized = [item for item in items if item.status is None]
+        if not recognized:
+            return {}
+        first_day = min(item.time for item in recognized).replace(hour=0, minute=0, second=0, microsecond=0)
+        last_day = max(item.time for item in recognized).replace(hour=0, minute=0, second=0, microsecond=0)
+        records = (await self.db.execute(
+            select(AttendanceRecord).where(
+                AttendanceRecord.employee_id.in_({item.employee_id for item in recognized}),
+                AttendanceRecord.check_in_time >= first_day,
+                AttendanceRecord.check_in_time < last_day + timedelta(days=1),
+                AttendanceRecord.check_out_time == None
+            )
+        )).scalars().all()
+        return {(record.employee_id, self._day(record.check_in_time)): record for record in records}
+
+    async def _apply(self, device_id: str, items: List[_Item]) -> None:
+        open_records = await self._open_records(items)
+        shifts = await self.directory.lookup_async(self.db, {item.employee_id for item in items if item.employee_id})
+        # Per employee this is timestamp order; unparseable events sort first
+        ordered = sorted(items, key=lambda item: (item.time or datetime.min, item.index))
+        chunk_size = max(settings.KIOSK_SYNC_CHUNK_SIZE, 1)
+
+        for start in range(0, len(ordered), chunk_size):
+            chunk = ordered[start:start + chunk_size]
+            for item in chunk:
+                if item.status is None:
+                    await self._transition(item, open_records, shifts)
+            # Events with unusable keys are answered but cannot be remembered
+            self.db.add_all([
+                self._sync_row(device_id, item) for item in chunk
+                if 0 < len(item.event.idempotency_key) <= KEY_MAX_LENGTH
+            ])
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                await self.db.rollback()
+                for item in ordered[start:]:
+                    if item.image_path:
+                        self.file_service.delete_file(item.image_path)
+                    item.status, item.message, item.record_id = NOT_PROCESSED, None, None
+                return
+
+    async def _transition(self, item: _Item, open_records, directory) -> None:
+        key = (item.employee_id, self._day(item.time))
+        open_record = open_records.get(key)
+        action = "checkin" if item.event.action == "check_in" else "checkout"
+        # Unique suffix: a rolled-back chunk deletes its photos, which must not be a concurrent replay's
+        filename = f"{action}_{item.employee_id}_{item.time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
+
+        if item.event.action == "check_in":
+            if open_record is not None:
+                item.status = ALREADY_CHECKED_IN
+                return
+            if not await self._save_image(item, filename):
+                return
+            entry = directory.get(item.employee_id)
+            record = AttendanceRecord(
+                id=uuid.uuid4(),
+                employee_id=item.employee_id,
+                shift_id=entry.shift_id if entry else None,
+                check_in_time=item.time,
+                check_in_image=item.image_path,
+                check_in_location=item.event.location,
+                check_in_device=item.event.device_info,
+                status=AttendanceStatus.ON_TIME  # Calculate based on shift
+            )
+            self.db.add(record)
+            open_records[key] = record
+            item.status, item.record_id = CHECKED_IN, record.id
+            return
+
+        if open_record is None or open_record.check_in_time > item.time:
+            item.status = NO_CHECK_IN
+            return
+        if not await self._save_image(item, filename):
+            return
+        open_record.check_out_time = item.time
+        open_record.check_out_image = item.image_path
+        open_record.check_out_location = item.event.location
+        open_record.check_out_device = item.event.device_info
+        open_record.work_hours = calculate_work_hours(open_record.check_in_time, item.time)
+        del open_records[key]
+        item.status, item.record_id = CHECKED_OUT, open_record.id
+
+    async def _save_image(self, item: _Item, filename: str) -> bool:
+        try:
+            item.image_path = await self.file_service.save_image_bytes(item.image, filename)
+            return True
+        except HTTPException as e:
+            item.status, item.message = INVALID, e.detail
+            return False
+
+    # ---- Results -------------------------------------------------------
+
+    @staticmethod
+    def _day(moment: datetime) -> datetime:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _sync_row(device_id: str, item: _Item) -> AttendanceSyncEvent:
+        return AttendanceSyncEvent(
+            device_id=device_id,
+            idempotency_key=item.event.idempotency_key,
+            action=item.event.action,
+            event_time=item.time,
+            status=item.status,
+            employee_id=item.employee_id,
+            attendance_record_id=item.record_id,
+            message=(item.message or "")[:255] or None,
+        )
+
+    @staticmethod
+    def _payload(key, action, status, message, employee_id, names, record_id, event_time, replayed) -> dict:
+        entry = names.get(employee_id) if employee_id else None
+        return {
+            "idempotency_key": key,
+            "action": action,
+            "status": status,
+            "success": status in (CHECKED_IN, CHECKED_OUT),
+            "message": message or MESSAGES.get(status, status),
+            "employee_id": str(employee_id) if employee_id else None,
+            "employee_name": entry.display_name if entry else None,
+            "attendance_id": str(record_id) if record_id else None,
+            "time": event_time.isoformat() if event_time else None,
+            "replayed": replayed,
+        }
+
+    def _result(self, item: _Item, names) -> dict:
+        return self._payload(
+            item.event.idempotency_key, item.event.action, item.status, item.message,
+            item.employee_id, names, item.record_id, item.time, False,
+        )
+
+    def _stored_result(self, row: AttendanceSyncEvent, names) -> dict:
+        return self._payload(
+            row.idempotency_key, row.action, row.status, row.message,
+            row.employee_id, names, row.attendance_record_id, row.event_time, True,
+        )
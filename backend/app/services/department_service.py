@@ -0,0 +1,263 @@
+"""
+Department hierarchy on a closure table.
+
+department_closure holds one row per (ancestor, descendant) pair, including
+each department with itself at depth 0, so a whole subtree is a single
+indexed lookup and per-subtree aggregates are one join away. The closure,
+department_level and the direct active employee_count are maintained here as
+departments and employees change.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+import uuid
+
+from sqlalchemy import and_, case, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.department import Department, DepartmentClosure
+from app.models.employee import Employee
+
+
+class DepartmentError(ValueError):
+    """Invalid department operation"""
+
+
+def subtree_ids(department_id: uuid.UUID):
+    """Subquery of the department and all of its descendants"""
+    return select(DepartmentClosure.descendant_id).where(DepartmentClosure.ancestor_id == department_id)
+
+
+class DepartmentService:
+    """Department CRUD that keeps the closure table and counters in step"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---- Tree maintenance ----------------------------------------------
+
+    def _link(self, department_id: uuid.UUID, parent_id: Optional[uuid.UUID]) -> None:
+        """Closure rows for a new leaf: itself plus every ancestor of its parent"""
+        self.db.execute(insert(DepartmentClosure).values(ancestor_id=department_id, descendant_id=department_id, depth=0))
+        if parent_id is not None:
+            self.db.execute(insert(DepartmentClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    DepartmentClosure.ancestor_id, literal(department_id, DepartmentClosure.descendant_id.type),
+                    DepartmentClosure.depth + 1,
+                ).where(DepartmentClosure.descendant_id == parent_id),
+            ))
+
+    def create_department(self, parent_id: Optional[uuid.UUID] = None, **fields) -> Department:
+        level = 1
+        if parent_id is not None:
+            parent = self.db.get(Department, parent_id)
+            if not parent:
+                raise LookupError("Parent department not found")
+            level = (parent.department_level or 1) + 1
+
+        department = Department(parent_department_id=parent_id, department_level=level, employee_count=0, **fields)
+        self.db.add(department)
+        self.db.flush()
+        self._link(department.id, parent_id)
+        self.db.commit()
+        self.db.refresh(department)
+        return department
+
+    def move_department(self, department: Department, new_parent_id: Optional[uuid.UUID]) -> Department:
+        """Re-parent a department together with its subtree"""
+        if new_parent_id == department.parent_department_id:
+            return department
+        if new_parent_id is not None:
+            if not self.db.get(Department, new_parent_id):
+                raise LookupError("Parent department not found")
+            inside = self.db.execute(
+                select(DepartmentClosure.depth).where(
+                    DepartmentClosure.ancestor_id == department.id, DepartmentClosure.descendant_id == new_parent_id
+                )
+            ).first()
+            if inside:
+                raise DepartmentError("A department cannot be moved under itself or one of its descendants")
+
+        subtree = subtree_ids(department.id)
+
+        # Detach: drop links from outside ancestors into the subtree
+        self.db.execute(delete(DepartmentClosure).where(
+            DepartmentClosure.descendant_id.in_(subtree),
+            DepartmentClosure.ancestor_id.notin_(subtree),
+        ).execution_options(synchronize_session=False))
+
+        # Attach: every ancestor of the new parent x every node of the subtree
+        if new_parent_id is not None:
+            above = aliased(DepartmentClosure)
+            below = aliased(DepartmentClosure)
+            self.db.execute(insert(DepartmentClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+                .select_from(above).join(below, below.ancestor_id == department.id)
+                .where(above.descendant_id == new_parent_id),
+            ))
+
+        department.parent_department_id = new_parent_id
+        self.db.flush()
+        self._update_levels(department.id)
+        self.db.commit()
+        self.db.refresh(department)
+        return department
+
+    def _update_levels(self, department_id: uuid.UUID) -> None:
+        depth = (
+            select(func.max(DepartmentClosure.depth) + 1)
+            .where(DepartmentClosure.descendant_id == Department.id)
+            .scalar_subquery()
+        )
+        self.db.execute(
+            update(Department).where(Department.id.in_(subtree_ids(department_id)))
+            .values(department_level=depth).execution_options(synchronize_session=False)
+        )
+
+    def delete_department(self, department: Department) -> None:
+        has_children = self.db.execute(
+            select(Department.id).where(Department.parent_department_id == department.id).limit(1)
+        ).first()
+        if has_children:
+            raise DepartmentError("Department has sub-departments")
+        has_employees = self.db.execute(
+            select(Employee.id).where(Employee.department_id == department.id).limit(1)
+        ).first()
+        if has_employees:
+            raise DepartmentError("Department still has employees")
+        self.db.execute(delete(DepartmentClosure).where(DepartmentClosure.descendant_id == department.id))
+        self.db.delete(department)
+        self.db.commit()
+
+    def rebuild(self) -> dict:
+        """Rebuild the closure, levels and employee counts from parent pointers"""
+        parents = dict(self.db.execute(select(Department.id, Department.parent_department_id)).all())
+        rows = []
+        for department_id in parents:
+            node, depth, seen = department_id, 0, set()
+            while node is not None and node not in seen:
+                seen.add(node)
+                rows.append({"ancestor_id": node, "descendant_id": department_id, "depth": depth})
+                node, depth = parents.get(node), depth + 1
+
+        self.db.execute(delete(DepartmentClosure))
+        if rows:
+            self.db.execute(insert(DepartmentClosure), rows)
+        self.db.flush()
+        for root in [d for d, parent in parents.items() if parent is None]:
+            self._update_levels(root)
+
+        counts = (
+            select(func.count(Employee.id))
+            .where(Employee.department_id == Department.id, Employee.is_active == True)
+            .scalar_subquery()
+        )
+        self.db.execute(update(Department).values(employee_count=counts).execution_options(synchronize_session=False))
+        self.db.commit()
+        return {"departments": len(parents), "closure_rows": len(rows)}
+
+    # ---- Employee counters ---------------------------------------------
+
+    def employee_moved(self, old_department_id: Optional[uuid.UUID], old_active: bool, new_department_id: Optional[uuid.UUID], new_active: bool) -> None:
+        """Adjust employee_count for an employee created, moved, (de)activated or deleted.
+
+        Pass (None, False) as the old state for a new employee and as the new
+        state for a deleted one. The caller commits.
+        """
+        if (old_department_id, bool(old_active)) == (new_department_id, bool(new_active)):
+            return
+        if old_department_id is not None and old_active:
+            self.db.execute(
+                update(Department).where(Department.id == old_department_id)
+                .values(employee_count=func.coalesce(Department.employee_count, 0) - 1)
+                .execution_options(synchronize_session=False)
+            )
+        if new_department_id is not None and new_active:
+            self.db.execute(
+                update(Department).where(Department.id == new_department_id)
+                .values(employee_count=func.coalesce(Department.employee_count, 0) + 1)
+                .execution_options(synchronize_session=False)
+            )
+
+    # ---- Roll-ups ------------------------------------------------------
+
+    def children(self, parent_id: Optional[uuid.UUID]) -> List[Department]:
+        return self.db.execute(
+            select(Department).where(Department.parent_department_id == parent_id).order_by(Department.department_code)
+        ).scalars().all()
+
+    def subtree(self, department_id: uuid.UUID) -> List[dict]:
+        """The department and its descendants with their depth below it"""
+        rows = self.db.execute(
+            select(Department, DepartmentClosure.depth)
+            .join(DepartmentClosure, DepartmentClosure.descendant_id == Department.id)
+            .where(DepartmentClosure.ancestor_id == department_id)
+            .order_by(DepartmentClosure.depth, Department.department_code)
+        ).all()
+        return [{"department": department, "depth": depth} for department, depth in rows]
+
+    def employee_totals(self, department_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, int]:
+        """Active employees in each department's subtree, from the maintained counters"""
+        rows = self.db.execute(
+            select(DepartmentClosure.ancestor_id, func.coalesce(func.sum(Department.employee_count), 0))
+            .join(Department, Department.id == DepartmentClosure.descendant_id)
+            .where(DepartmentClosure.ancestor_id.in_(list(department_ids)))
+            .group_by(DepartmentClosure.ancestor_id)
+        ).all()
+        return {department_id: int(total) for department_id, total in rows}
+
+    def attendance_rollup(self, department_ids: List[uuid.UUID], start: datetime, end: datetime) -> Dict[uuid.UUID, dict]:
+        """Attendance aggregates over [start, end) for each department's whole subtree in one grouped join"""
+        late = case((AttendanceRecord.status == AttendanceStatus.LATE, 1), else_=0)
+        rows = self.db.execute(
+            select(
+                DepartmentClosure.ancestor_id,
+                func.count(AttendanceRecord.id),
+                func.count(AttendanceRecord.employee_id.distinct()),
+                func.sum(late),
+                func.sum(case((AttendanceRecord.check_out_time.is_(None), 1), else_=0)),
+                func.coalesce(func.sum(AttendanceRecord.work_hours), 0.0),
+                func.coalesce(func.sum(AttendanceRecord.overtime_hours), 0.0),
+            )
+            .select_from(DepartmentClosure)
+            .join(Employee, Employee.department_id == DepartmentClosure.descendant_id)
+            .join(AttendanceRecord, and_(
+                AttendanceRecord.employee_id == Employee.id,
+                AttendanceRecord.check_in_time >= start,
+                AttendanceRecord.check_in_time < end,
+            ))
+            .where(DepartmentClosure.ancestor_id.in_(department_ids))
+            .group_by(DepartmentClosure.ancestor_id)
+        ).all()
+
+        totals = self.employee_totals(department_ids)
+        result = {}
+        for department_id in department_ids:
+            result[department_id] = {
+                "total_employees": totals.get(department_id, 0),
+                "records": 0, "employees_present": 0, "late": 0, "still_working": 0,
+                "work_hours": 0.0, "overtime_hours": 0.0,
+            }
+        for department_id, records, present, late_count, open_count, hours, overtime in rows:
+            result[department_id].update({
+                "records": records,
+                "employees_present": present,
+                "late": int(late_count or 0),
+                "still_working": int(open_count or 0),
+                "work_hours": round(float(hours), 2),
+                "overtime_hours": round(float(overtime), 2),
+            })
+        return result
+
+    def today_status(self, department_ids: List[uuid.UUID], today: date) -> Dict[uuid.UUID, dict]:
+        start = datetime.combine(today, time.min)
+        rollup = self.attendance_rollup(department_ids, start, start + timedelta(days=1))
+        for stats in rollup.values():
+            total = stats["total_employees"]
+            stats["checked_in"] = stats["employees_present"]
+            stats["not_checked_in"] = max(total - stats["employees_present"], 0)
+            stats["attendance_rate"] = round(stats["employees_present"] / total * 100, 1) if total else 0
+        return rollup
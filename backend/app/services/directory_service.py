@@ -0,0 +1,146 @@
+"""
+In-memory employee directory for response enrichment.
+
+Recognition and history responses only need an employee's code, display name,
+department and current shift. The directory loads those for every employee
+with one query and serves them from memory until an employee or department
+changes. Every invalidation bumps a version number, so a load that raced with
+a change is discarded rather than installed stale.
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+import uuid
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.invalidation import DIRECTORY, get_invalidation_bus
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.shift import EmployeeShift
+
+
+@dataclass(frozen=True)
+class DirectoryEntry:
+    id: uuid.UUID
+    employee_code: str
+    display_name: str
+    department_id: Optional[uuid.UUID]
+    department_code: Optional[str]
+    department_name: Optional[str]
+    is_active: bool
+    shift_id: Optional[uuid.UUID]
+
+
+class EmployeeDirectory:
+    """id -> DirectoryEntry for all employees, loaded once and invalidated on change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[uuid.UUID, DirectoryEntry]] = None
+        self._version = 0
+        self._loaded_on: Optional[date] = None  # current shifts are resolved for this day
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def loaded(self) -> bool:
+        return self._entries is not None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries = None
+
+    def _query(self):
+        today = date.today()
+        current_shift = (
+            select(EmployeeShift.shift_id)
+            .where(
+                EmployeeShift.employee_id == Employee.id,
+                EmployeeShift.is_active == True,
+                EmployeeShift.is_primary == True,
+                EmployeeShift.effective_date <= today,
+                or_(EmployeeShift.end_date.is_(None), EmployeeShift.end_date >= today),
+            )
+            .order_by(EmployeeShift.effective_date.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        return select(
+            Employee.id, Employee.employee_code, Employee.full_name, Employee.first_name, Employee.last_name,
+            Employee.is_active, Employee.department_id, Department.department_code, Department.department_name,
+            current_shift.label("shift_id"),
+        ).outerjoin(Department, Employee.department_id == Department.id)
+
+    def _install(self, rows, version: int) -> Dict[uuid.UUID, DirectoryEntry]:
+        entries = {}
+        for row in rows:
+            name = row.full_name or f"{row.first_name or ''} {row.last_name or ''}".strip()
+            entries[row.id] = DirectoryEntry(
+                id=row.id,
+                employee_code=row.employee_code,
+                display_name=name,
+                department_id=row.department_id,
+                department_code=row.department_code,
+                department_name=row.department_name,
+                is_active=bool(row.is_active),
+                shift_id=row.shift_id,
+            )
+        with self._lock:
+            if self._version == version:
+                self._entries = entries
+                self._loaded_on = date.today()
+        return entries
+
+    def reload(self) -> None:
+        """Load again with a session of its own (after another worker's change)"""
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def load(self, db: Session) -> Dict[uuid.UUID, DirectoryEntry]:
+        version = self._version
+        return self._install(db.execute(self._query()).all(), version)
+
+    async def load_async(self, db) -> Dict[uuid.UUID, DirectoryEntry]:
+        version = self._version
+        return self._install((await db.execute(self._query())).all(), version)
+
+    def _fresh(self) -> Optional[Dict[uuid.UUID, DirectoryEntry]]:
+        entries = self._entries
+        return entries if self._loaded_on == date.today() else None
+
+    def get(self, db: Session, employee_id: uuid.UUID) -> Optional[DirectoryEntry]:
+        entries = self._fresh()
+        if entries is None:
+            entries = self.load(db)
+        return entries.get(employee_id)
+
+    async def get_async(self, db, employee_id: uuid.UUID) -> Optional[DirectoryEntry]:
+        entries = self._fresh()
+        if entries is None:
+            entries = await self.load_async(db)
+        return entries.get(employee_id)
+
+    async def lookup_async(self, db, employee_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, DirectoryEntry]:
+        entries = self._fresh()
+        if entries is None:
+            entries = await self.load_async(db)
+        return {employee_id: entries[employee_id] for employee_id in employee_ids if employee_id in entries}
+
+
+@lru_cache(maxsize=None)
+def get_employee_directory() -> EmployeeDirectory:
+    directory = EmployeeDirectory()
+    get_invalidation_bus().subscribe(DIRECTORY, lambda events: directory.invalidate(), reload=directory.reload)
+    return directory
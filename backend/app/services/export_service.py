@@ -0,0 +1,215 @@
+"""
+Columnar attendance export for payroll.
+
+Rows of attendance_records joined with employees are read through a
+server-side cursor in fixed-size chunks and written out chunk by chunk as
+Parquet, Arrow IPC stream or gzip-compressed CSV, so memory use depends on the
+chunk size and not on the exported range. Parquet and Arrow need pyarrow;
+CSV does not.
+"""
+
+import csv
+import gzip
+import io
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models.attendance import AttendanceRecord
+from app.models.department import Department
+from app.models.employee import Employee
+
+# Exportable columns: name -> (SQL expression, Arrow type name)
+EXPORT_COLUMNS = {
+    "record_id": (AttendanceRecord.id, "string"),
+    "employee_id": (AttendanceRecord.employee_id, "string"),
+    "employee_code": (Employee.employee_code, "string"),
+    "employee_name": (Employee.full_name, "string"),
+    "department_code": (Department.department_code, "string"),
+    "check_in_time": (AttendanceRecord.check_in_time, "timestamp"),
+    "check_out_time": (AttendanceRecord.check_out_time, "timestamp"),
+    "status": (AttendanceRecord.status, "string"),
+    "work_hours": (AttendanceRecord.work_hours, "float64"),
+    "overtime_hours": (AttendanceRecord.overtime_hours, "float64"),
+    "late_minutes": (AttendanceRecord.late_minutes, "float64"),
+    "early_leave_minutes": (AttendanceRecord.early_leave_minutes, "float64"),
+    "check_in_location": (AttendanceRecord.check_in_location, "string"),
+    "check_out_location": (AttendanceRecord.check_out_location, "string"),
+}
+
+DEFAULT_COLUMNS = [
+    "employee_code", "employee_name", "department_code",
+    "check_in_time", "check_out_time", "status", "work_hours", "overtime_hours",
+]
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "csv": ("application/gzip", "csv.gz"),
+}
+
+
+class ExportError(ValueError):
+    """Invalid export request"""
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportError("pyarrow is required for Parquet and Arrow exports; use format=csv or install pyarrow")
+    return pyarrow
+
+
+def _cell(value):
+    """Plain Python value for enums and UUIDs"""
+    if value is None or isinstance(value, (int, float, str, datetime)):
+        return value
+    return str(getattr(value, "value", value))
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only file object whose contents are drained after every chunk"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class AttendanceExporter:
+    """Streams attendance rows from a server-side cursor into a columnar format"""
+
+    def __init__(
+        self,
+        engine: Engine,
+        start_date: date,
+        end_date: date,
+        department_code: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        chunk_size: int = 10000,
+    ):
+        self.engine = engine
+        self.start_date = start_date
+        self.end_date = end_date
+        self.department_code = department_code
+        self.columns = columns or DEFAULT_COLUMNS
+        self.chunk_size = chunk_size
+
+        unknown = [name for name in self.columns if name not in EXPORT_COLUMNS]
+        if unknown:
+            raise ExportError(f"Unknown columns: {', '.join(unknown)}")
+        if end_date < start_date:
+            raise ExportError("end_date must not be before start_date")
+
+    def query(self):
+        query = select(*[EXPORT_COLUMNS[name][0].label(name) for name in self.columns])
+        query = query.select_from(AttendanceRecord).join(
+            Employee, AttendanceRecord.employee_id == Employee.id
+        ).outerjoin(Department, Employee.department_id == Department.id)
+
+        # Half-open timestamp range so partitions outside it are pruned
+        start = datetime.combine(self.start_date, time.min)
+        end = datetime.combine(self.end_date + timedelta(days=1), time.min)
+        query = query.where(AttendanceRecord.check_in_time >= start, AttendanceRecord.check_in_time < end)
+        if self.department_code:
+            query = query.where(Department.department_code == self.department_code)
+        return query.order_by(AttendanceRecord.check_in_time, AttendanceRecord.id)
+
+    def iter_chunks(self) -> Iterator[Dict[str, list]]:
+        """Column-oriented chunks of at most chunk_size rows"""
+        with self.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=self.chunk_size
+            ).execute(self.query())
+            for rows in result.partitions(self.chunk_size):
+                columns = list(zip(*rows))
+                yield {
+                    name: [_cell(value) for value in values]
+                    for name, values in zip(self.columns, columns)
+                }
+
+    # ---- Writers -------------------------------------------------------
+
+    def arrow_schema(self):
+        pa = _require_pyarrow()
+        types = {
+            "string": pa.string(),
+            "timestamp": pa.timestamp("us"),
+            "float64": pa.float64(),
+        }
+        return pa.schema([(name, types[EXPORT_COLUMNS[name][1]]) for name in self.columns])
+
+    def stream(self, export_format: str) -> Iterator[bytes]:
+        """Encoded output, yielded once per chunk"""
+        if export_format not in EXPORT_FORMATS:
+            raise ExportError(f"Unsupported format '{export_format}'")
+        if export_format == "csv":
+            return self._stream_csv()
+        # Fail before the first byte is sent rather than mid-stream
+        _require_pyarrow()
+        return self._stream_arrow(export_format)
+
+    def _stream_arrow(self, export_format: str) -> Iterator[bytes]:
+        pa = _require_pyarrow()
+        schema = self.arrow_schema()
+        buffer = _ChunkBuffer()
+        if export_format == "parquet":
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(buffer, schema, compression="zstd")
+            write = writer.write_batch
+        else:
+            writer = pa.ipc.new_stream(buffer, schema)
+            write = writer.write_batch
+
+        for chunk in self.iter_chunks():
+            write(pa.RecordBatch.from_pydict(chunk, schema=schema))
+            data = buffer.drain()
+            if data:
+                yield data
+        writer.close()
+        yield buffer.drain()
+
+    def _stream_csv(self) -> Iterator[bytes]:
+        buffer = _ChunkBuffer()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as compressed:
+            text = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(self.columns)
+            for chunk in self.iter_chunks():
+                writer.writerows(zip(*(chunk[name] for name in self.columns)))
+                text.flush()
+                data = buffer.drain()
+                if data:
+                    yield data
+            text.flush()
+            text.detach()
+        yield buffer.drain()
+
+    def write_to(self, path: str, export_format: str) -> int:
+        """Write the export to a file; returns the number of bytes written"""
+        written = 0
+        with open(path, "wb") as f:
+            for data in self.stream(export_format):
+                f.write(data)
+                written += len(data)
+        return written
@@ -0,0 +1,198 @@
+"""
+Face localization before feature extraction.
+
+SimpleFaceService used to treat the whole camera frame as the face, so the
+background dominated both the cost of feature extraction and the features
+themselves. The detector finds face candidates on a copy of the frame
+subsampled to FACE_ROI_DETECT_WIDTH, in NumPy only:
+
+  1. skin-colored pixels by their YCbCr chrominance, smoothed with a box
+     filter over an integral image (drops speckle, closes eye/mouth holes);
+  2. connected skin blobs by run-length labeling;
+  3. a confidence per blob from its shape (face-like aspect ratio, the fill
+     of an ellipse) and a Haar-like two-rectangle feature on luminance:
+     the eye band is darker than the cheek band below it.
+
+Boxes come back in full-frame pixels with a margin, most confident first.
+"""
+
+import math
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Skin chrominance ranges (Chai & Ngan), robust across skin tones
+CB_RANGE = (77, 127)
+CR_RANGE = (133, 173)
+MIN_LUMA = 40  # shadows have skin-like chrominance too
+SMOOTH_RADIUS = 2  # box filter half-size in subsampled pixels
+FACE_ASPECT = 1.3  # height / width of a face with some forehead and chin
+
+
+@dataclass(frozen=True)
+class FaceBox:
+    x: int
+    y: int
+    width: int
+    height: int
+    confidence: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def integral_image(values: np.ndarray) -> np.ndarray:
+    """Summed-area table with a zero first row and column"""
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0), axis=1, out=table[1:, 1:])
+    return table
+
+
+def box_mean(table: np.ndarray, y0: int, x0: int, y1: int, x1: int) -> float:
+    """Mean of values[y0:y1, x0:x1] from its integral image"""
+    area = (y1 - y0) * (x1 - x0)
+    if area <= 0:
+        return 0.0
+    total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return float(total / area)
+
+
+def box_filter(values: np.ndarray, radius: int) -> np.ndarray:
+    """Mean over a (2r+1)^2 window at every pixel, clipped at the borders"""
+    table = integral_image(values)
+    height, width = values.shape
+    ys = np.arange(height)
+    xs = np.arange(width)
+    y0 = np.clip(ys - radius, 0, height)[:, None]
+    y1 = np.clip(ys + radius + 1, 0, height)[:, None]
+    x0 = np.clip(xs - radius, 0, width)[None, :]
+    x1 = np.clip(xs + radius + 1, 0, width)[None, :]
+    total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return total / ((y1 - y0) * (x1 - x0))
+
+
+def label_blobs(mask: np.ndarray) -> List[Tuple[int, int, int, int, int]]:
+    """(x0, y0, x1, y1, area) of every 8-connected blob, by run-length union-find"""
+    parent: List[int] = []
+
+    def find(label: int) -> int:
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    runs = []  # (row, start, end, label)
+    previous: List[Tuple[int, int, int]] = []
+    padded = np.zeros(mask.shape[1] + 2, dtype=np.int8)
+    for y in range(mask.shape[0]):
+        padded[1:-1] = mask[y]
+        edges = np.diff(padded)
+        current = []
+        for start, end in zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()):
+            label = None
+            for p_start, p_end, p_label in previous:
+                if p_start <= end and p_end >= start:  # overlapping or diagonally touching
+                    root = find(p_label)
+                    if label is None:
+                        label = root
+                    elif root != label:
+                        parent[root] = label
+            if label is None:
+                label = len(parent)
+                parent.append(label)
+            current.append((start, end, label))
+            runs.append((y, start, end, label))
+        previous = current
+
+    blobs: Dict[int, List[int]] = {}
+    for y, start, end, label in runs:
+        blob = blobs.setdefault(find(label), [start, y, end, y + 1, 0])
+        blob[0] = min(blob[0], start)
+        blob[1] = min(blob[1], y)
+        blob[2] = max(blob[2], end)
+        blob[3] = max(blob[3], y + 1)
+        blob[4] += end - start
+    return [tuple(blob) for blob in blobs.values()]
+
+
+class FaceDetector:
+    def __init__(self, detect_width: Optional[int] = None, min_area: Optional[float] = None,
+                 min_confidence: Optional[float] = None, max_faces: Optional[int] = None,
+                 margin: Optional[float] = None):
+        self.detect_width = detect_width or settings.FACE_ROI_DETECT_WIDTH
+        self.min_area = settings.FACE_ROI_MIN_AREA if min_area is None else min_area
+        self.min_confidence = settings.FACE_ROI_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        self.max_faces = max_faces or settings.FACE_ROI_MAX_FACES
+        self.margin = settings.FACE_ROI_MARGIN if margin is None else margin
+
+    def detect(self, image: np.ndarray) -> List[FaceBox]:
+        """Face boxes in an RGB (or grayscale: no skin color, so none) frame, most confident first"""
+        if image.ndim != 3 or image.shape[2] < 3:
+            return []
+        height, width = image.shape[:2]
+        step = max(1, width // self.detect_width)
+        small = image[::step, ::step, :3].astype(np.float32)
+        red, green, blue = small[..., 0], small[..., 1], small[..., 2]
+
+        luma = 0.299 * red + 0.587 * green + 0.114 * blue
+        cb = 128 - 0.168736 * red - 0.331264 * green + 0.5 * blue
+        cr = 128 + 0.5 * red - 0.418688 * green - 0.081312 * blue
+        skin = (
+            (cb >= CB_RANGE[0]) & (cb <= CB_RANGE[1])
+            & (cr >= CR_RANGE[0]) & (cr <= CR_RANGE[1])
+            & (luma >= MIN_LUMA)
+        )
+        skin = box_filter(skin.astype(np.float32), SMOOTH_RADIUS) >= 0.5
+
+        luma_table = integral_image(luma)
+        min_pixels = self.min_area * skin.size
+        faces = []
+        for x0, y0, x1, y1, area in label_blobs(skin):
+            if area < min_pixels:
+                continue
+            confidence = self._confidence(luma_table, x0, y0, x1, y1, area)
+            if confidence >= self.min_confidence:
+                faces.append(self._to_frame(x0, y0, x1, y1, step, width, height, confidence))
+        faces.sort(key=lambda face: face.confidence, reverse=True)
+        return faces[:self.max_faces]
+
+    @staticmethod
+    def _confidence(luma_table: np.ndarray, x0: int, y0: int, x1: int, y1: int, area: int) -> float:
+        box_width, box_height = x1 - x0, y1 - y0
+        if box_width < 4 or box_height < 4:
+            return 0.0
+        # Shape: an upright ellipse fills pi/4 of its box
+        fill = area / (box_width * box_height)
+        fill_score = max(0.0, 1 - abs(fill - math.pi / 4) / (math.pi / 4))
+        aspect_score = max(0.0, 1 - abs(math.log(box_height / box_width / FACE_ASPECT)) / math.log(2.5))
+        # Haar-like feature: eyes (20-45% of the height) darker than the cheeks (45-70%)
+        inner_x0, inner_x1 = x0 + box_width // 8, x1 - box_width // 8
+        eyes = box_mean(luma_table, y0 + box_height * 20 // 100, inner_x0, y0 + box_height * 45 // 100, inner_x1)
+        cheeks = box_mean(luma_table, y0 + box_height * 45 // 100, inner_x0, y0 + box_height * 70 // 100, inner_x1)
+        eye_score = min(max((cheeks - eyes) / (cheeks + 1) * 5, 0.0), 1.0)
+        return round(0.35 * fill_score + 0.35 * aspect_score + 0.3 * eye_score, 3)
+
+    def _to_frame(self, x0, y0, x1, y1, step, width, height, confidence) -> FaceBox:
+        pad_x = (x1 - x0) * self.margin
+        pad_y = (y1 - y0) * self.margin
+        left = max(0, int((x0 - pad_x) * step))
+        top = max(0, int((y0 - pad_y) * step))
+        right = min(width, int(math.ceil((x1 + pad_x) * step)))
+        bottom = min(height, int(math.ceil((y1 + pad_y) * step)))
+        return FaceBox(left, top, right - left, bottom - top, confidence)
+
+
+def primary_face(faces: List[FaceBox]) -> Optional[FaceBox]:
+    """The face to recognize: the person nearest the camera is the biggest confident box"""
+    if not faces:
+        return None
+    return max(faces, key=lambda face: face.width * face.height * face.confidence)
+
+
+@lru_cache(maxsize=None)
+def get_face_detector() -> FaceDetector:
+    return FaceDetector()
@@ -1,13 +1,26 @@
 import os
 import base64
+import hashlib
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from fastapi import UploadFile, HTTPException
 from PIL import Image
 import io
 
 from app.core.config import settings
 
+# Inline images in Employee.face_images are data URLs or bare base64; references are short relative paths
+INLINE_IMAGE_MIN_LENGTH = 512
+
+def is_inline_image(value: Optional[str]) -> bool:
+    return bool(value) and (value.startswith("data:") or len(value) >= INLINE_IMAGE_MIN_LENGTH)
+
+def decode_image_data(data: str) -> bytes:
+    """Raw bytes of a base64 image, with or without a data URL prefix"""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[1]
+    return base64.b64decode(data)
+
 class FileService:
     def __init__(self):
         self.upload_dir = settings.UPLOAD_DIR
@@ -50,13 +63,14 @@ class FileService:
     async def save_base64_image(self, base64_data: str, filename: str) -> str:
         """Save base64 image and return file path"""
         try:
-            # Remove data URL prefix if present
-            if base64_data.startswith('data:image/'):
-                base64_data = base64_data.split(',')[1]
-            
-            # Decode base64
-            image_data = base64.b64decode(base64_data)
-            
+            image_data = decode_image_data(base64_data)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image data: {str(e)}")
+        return await self.save_image_bytes(image_data, filename)
+    
+    async def save_image_bytes(self, image_data: bytes, filename: str) -> str:
+        """Save raw image bytes as a JPEG attendance photo and return file path"""
+        try:
             # Validate image
             image = Image.open(io.BytesIO(image_data))
             
@@ -67,8 +81,12 @@ class FileService:
             # Use provided filename
             file_path = os.path.join(attendance_dir, filename)
             
-            # Save image
-            image.save(file_path, "JPEG")
+            # JPEG uploads are stored as sent; anything else is re-encoded
+            if image.format == "JPEG":
+                with open(file_path, "wb") as f:
+                    f.write(image_data)
+            else:
+                image.save(file_path, "JPEG")
             
             return file_path
         except Exception as e:
@@ -89,3 +107,33 @@ class FileService:
         # In production, this would return a CDN URL
         # For now, return relative path
         return f"/uploads/{os.path.basename(file_path)}"
+
+    # ---- Registration face images --------------------------------------
+
+    def save_face_image(self, employee_id, image_data: bytes) -> str:
+        """Store a registration image as-is; returns the reference kept in Employee.face_images"""
+        with Image.open(io.BytesIO(image_data)) as image:
+            extension = (image.format or "jpeg").lower().replace("jpeg", "jpg")
+        reference = f"{employee_id}/{hashlib.sha256(image_data).hexdigest()[:20]}.{extension}"
+        path = self.face_image_path(reference)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_data)
+            os.replace(tmp_path, path)
+        return reference
+
+    def face_image_path(self, reference: str) -> str:
+        """Absolute path of a face image reference, confined to FACE_IMAGE_DIR"""
+        root = os.path.abspath(settings.FACE_IMAGE_DIR)
+        path = os.path.abspath(os.path.join(root, reference))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError("Invalid face image reference")
+        return path
+
+    def delete_face_images(self, references: List[str]) -> None:
+        for reference in references or []:
+            if not is_inline_image(reference):
+                self.delete_file(self.face_image_path(reference))
+
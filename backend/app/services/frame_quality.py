@@ -0,0 +1,160 @@
+"""
+Frame-quality gate in front of face recognition.
+
+A black, overexposed or motion-blurred frame cannot be recognized, but
+identify_face would still extract features from the full frame and scan the
+gallery before answering "Face not recognized", and the kiosk would retry
+with the same kind of frame. The gate measures the frame on a tiny
+grayscale copy first (JPEG frames are decoded at 1/8 scale, so a VGA frame
+takes a fraction of a millisecond) and rejects it with the reason:
+
+  too_dark       mean brightness below FRAME_QUALITY_MIN_BRIGHTNESS
+  overexposed    mean brightness above FRAME_QUALITY_MAX_BRIGHTNESS
+  low_contrast   brightness standard deviation below FRAME_QUALITY_MIN_CONTRAST
+  blurry         Laplacian variance below FRAME_QUALITY_MIN_SHARPNESS
+
+Check-in/check-out answer a rejection with 422 and an X-Error-Code header
+(frame_<reason>), offline sync reports it as the event's status. Counters
+per reason are at GET /api/v1/admin/frame-quality.
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+
+TOO_DARK = "too_dark"
+OVEREXPOSED = "overexposed"
+LOW_CONTRAST = "low_contrast"
+BLURRY = "blurry"
+UNDECODABLE = "undecodable"
+
+MESSAGES = {
+    TOO_DARK: "Image is too dark; improve the lighting and try again",
+    OVEREXPOSED: "Image is overexposed; avoid backlight and try again",
+    LOW_CONTRAST: "Image has too little contrast; make sure the face is in view",
+    BLURRY: "Image is blurred; hold still and try again",
+    UNDECODABLE: "Invalid image data",
+}
+
+
+class FrameQualityError(ValueError):
+    def __init__(self, reason: str, quality: Optional["FrameQuality"] = None):
+        super().__init__(MESSAGES[reason])
+        self.reason = reason
+        self.quality = quality
+
+    @property
+    def code(self) -> str:
+        return f"frame_{self.reason}"
+
+
+@dataclass(frozen=True)
+class FrameQuality:
+    brightness: float
+    contrast: float
+    sharpness: float
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Sharpness: variance of the 4-neighbour Laplacian (blur lowers it)"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def small_gray(image_data: bytes, width: int) -> np.ndarray:
+    """Grayscale float32 copy `width` pixels wide, decoded at reduced scale where the format allows"""
+    image = Image.open(BytesIO(image_data))
+    height = max(1, round(width * image.height / image.width))
+    image.draft("L", (width, height))  # JPEG: DCT scaling, no-op for other formats
+    image = image.convert("L").resize((width, height), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+
+def measure(gray: np.ndarray) -> FrameQuality:
+    return FrameQuality(float(gray.mean()), float(gray.std()), laplacian_variance(gray))
+
+
+class FrameQualityGate:
+    def __init__(self, enabled: Optional[bool] = None, width: Optional[int] = None,
+                 min_brightness: Optional[float] = None, max_brightness: Optional[float] = None,
+                 min_contrast: Optional[float] = None, min_sharpness: Optional[float] = None):
+        self.enabled = settings.FRAME_QUALITY_ENABLED if enabled is None else enabled
+        self.width = width or settings.FRAME_QUALITY_WIDTH
+        self.min_brightness = settings.FRAME_QUALITY_MIN_BRIGHTNESS if min_brightness is None else min_brightness
+        self.max_brightness = settings.FRAME_QUALITY_MAX_BRIGHTNESS if max_brightness is None else max_brightness
+        self.min_contrast = settings.FRAME_QUALITY_MIN_CONTRAST if min_contrast is None else min_contrast
+        self.min_sharpness = settings.FRAME_QUALITY_MIN_SHARPNESS if min_sharpness is None else min_sharpness
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._seconds = 0.0
+
+    def reason(self, quality: FrameQuality) -> Optional[str]:
+        """First failed check, or None for a usable frame"""
+        if quality.brightness < self.min_brightness:
+            return TOO_DARK
+        if quality.brightness > self.max_brightness:
+            return OVEREXPOSED
+        if quality.contrast < self.min_contrast:
+            return LOW_CONTRAST
+        if quality.sharpness < self.min_sharpness:
+            return BLURRY
+        return None
+
+    def check(self, image_data: bytes) -> Optional[FrameQuality]:
+        """Raise FrameQualityError for an unusable frame; returns the measurements (None when disabled)"""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        try:
+            quality = measure(small_gray(image_data, self.width))
+            reason = self.reason(quality)
+        except (OSError, ValueError, ZeroDivisionError):
+            quality, reason = None, UNDECODABLE
+        self._count(reason or "passed", time.perf_counter() - started)
+        if reason is not None:
+            raise FrameQualityError(reason, quality)
+        return quality
+
+    def _count(self, outcome: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+            self._seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            seconds = self._seconds
+        checked = sum(counts.values())
+        return {
+            "enabled": self.enabled,
+            "thresholds": {
+                "width": self.width,
+                "min_brightness": self.min_brightness,
+                "max_brightness": self.max_brightness,
+                "min_contrast": self.min_contrast,
+                "min_sharpness": self.min_sharpness,
+            },
+            "checked": checked,
+            "passed": counts.get("passed", 0),
+            "rejected": {reason: counts.get(reason, 0) for reason in MESSAGES},
+            "mean_check_ms": round(seconds / checked * 1000, 3) if checked else None,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_frame_quality_gate() -> FrameQualityGate:
+    return FrameQualityGate()
@@ -0,0 +1,200 @@
+"""
+Memory-mapped face gallery snapshot shared by worker processes.
+
+The normalized gallery matrix and its employee ids are written to one file
+in FACE_GALLERY_DIR, and every worker maps that file read-only, so the
+matrix lives once in the page cache however many workers there are, and a
+freshly started worker is warm as soon as it maps the file.
+
+A small `generation` file is bumped whenever the gallery is invalidated (in
+any worker); it also records the invalidation event that bumped it, so the
+other workers on the host receiving the same event do not bump it again. A
+snapshot records the generation it was built for; workers compare the two on
+each identification and remap or rebuild when they differ. Snapshots are
+written to a temporary file and moved into place with os.replace, so readers
+see either the old or the new file, never a partial one, and mappings of the
+old file stay valid until they are dropped.
+
+File layout: a fixed header, then the float32 matrix (64-byte aligned),
+then the employee ids as 16-byte UUIDs.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, last writer wins
+    fcntl = None
+
+MAGIC = b"FGAL"
+VERSION = 1
+# magic, version, generation, rows, dims, matrix offset, ids offset
+HEADER = struct.Struct("<4sIQQIQQ")
+ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class SnapshotIds(Sequence):
+    """Employee ids of a mapped snapshot, decoded to strings on access"""
+
+    def __init__(self, raw: memoryview, count: int):
+        self._raw = raw
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return str(uuid.UUID(bytes=bytes(self._raw[index * 16:(index + 1) * 16])))
+
+
+@dataclass
+class MappedGallery:
+    generation: int
+    ids: SnapshotIds
+    matrix: np.ndarray  # read-only view into the mapping
+    _mapping: mmap.mmap
+
+
+class GallerySnapshotStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, "gallery.snapshot")
+        self.generation_path = os.path.join(directory, "generation")
+        self.lock_path = os.path.join(directory, ".lock")
+        os.makedirs(directory, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self._generation_stat = None
+        self._generation = 0
+        self._token = ""
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers across threads and processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a+") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    # ---- Generation ----------------------------------------------------
+
+    def generation(self) -> int:
+        """Current generation; re-read only when the file changed (one stat per call)"""
+        try:
+            stat = os.stat(self.generation_path)
+        except FileNotFoundError:
+            return 0
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._generation_stat:
+            with open(self.generation_path) as f:
+                generation, _, token = f.read().strip().partition(" ")
+            self._generation, self._token = int(generation or 0), token
+            self._generation_stat = key
+        return self._generation
+
+    def bump(self, token: str = "") -> int:
+        """Mark every mapped snapshot stale, once per invalidation `token`"""
+        with self._locked():
+            self._generation_stat = None
+            generation = self.generation()
+            if token and token == self._token:
+                return generation
+            generation += 1
+            self._write_atomic(self.generation_path, f"{generation} {token}".strip().encode())
+            return generation
+
+    # ---- Snapshot ------------------------------------------------------
+
+    def _snapshot_generation(self) -> Optional[int]:
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) < HEADER.size:
+            return None
+        magic, version, generation, *_ = HEADER.unpack(header)
+        return generation if magic == MAGIC and version == VERSION else None
+
+    def publish(self, generation: int, ids: List[str], matrix: np.ndarray) -> bool:
+        """Write a snapshot for `generation` unless a newer one is already in place"""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        rows, dims = matrix.shape
+        matrix_offset = _aligned(HEADER.size)
+        ids_offset = matrix_offset + matrix.nbytes
+        id_bytes = b"".join(uuid.UUID(str(employee_id)).bytes for employee_id in ids)
+
+        buffer = bytearray(ids_offset + len(id_bytes))
+        buffer[:HEADER.size] = HEADER.pack(MAGIC, VERSION, generation, rows, dims, matrix_offset, ids_offset)
+        buffer[matrix_offset:ids_offset] = matrix.tobytes()
+        buffer[ids_offset:] = id_bytes
+
+        with self._locked():
+            existing = self._snapshot_generation()
+            if existing is not None and existing >= generation:
+                return False
+            self._write_atomic(self.snapshot_path, bytes(buffer))
+        return True
+
+    def load(self) -> Optional[MappedGallery]:
+        """Map the current snapshot read-only, or None if there is none"""
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < HEADER.size:
+                    return None
+                mapping = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        magic, version, generation, rows, dims, matrix_offset, ids_offset = HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or version != VERSION or ids_offset + rows * 16 > size:
+            print(f"Ignoring unreadable face gallery snapshot {self.snapshot_path}")
+            return None
+        matrix = np.frombuffer(mapping, dtype=np.float32, count=rows * dims, offset=matrix_offset).reshape(rows, dims)
+        ids = SnapshotIds(memoryview(mapping)[ids_offset:ids_offset + rows * 16], rows)
+        return MappedGallery(generation, ids, matrix, mapping)
+
+
+@lru_cache(maxsize=None)
+def get_gallery_store() -> GallerySnapshotStore:
+    return GallerySnapshotStore(settings.FACE_GALLERY_DIR)
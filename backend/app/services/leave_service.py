@@ -0,0 +1,336 @@
+"""
+Leave requests, department leave calendar and balance recomputation.
+
+Approved leaves are kept in memory as one sorted-interval index per
+department, so "who is off on date X / over range Y" is answered without
+scanning the leaves table. The calendar is loaded once with a single query
+and then updated incrementally as leaves are approved or cancelled.
+"""
+
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+import uuid
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import LEAVE_CALENDAR, get_invalidation_bus
+from app.models.employee import Employee
+from app.models.leave import Leave, LeaveBalance, LeaveStatus, LeaveType
+
+
+class LeaveError(ValueError):
+    """Invalid leave operation"""
+
+
+@dataclass(frozen=True)
+class LeaveInterval:
+    leave_id: uuid.UUID
+    employee_id: uuid.UUID
+    start: date
+    end: date  # inclusive
+    leave_type: LeaveType
+    is_half_day: bool = False
+
+
+class IntervalIndex:
+    """Intervals sorted by start date with a running maximum of end dates.
+
+    An overlap query bisects to the last interval starting on or before the
+    query end, then walks backwards only while the running maximum shows an
+    earlier interval can still reach the query start.
+    """
+
+    def __init__(self, intervals: Optional[List[LeaveInterval]] = None):
+        self._intervals = sorted(intervals or [], key=lambda i: (i.start, i.end))
+        self._starts = [i.start for i in self._intervals]
+        self._max_end: List[date] = []
+        self._rebuild_max_end(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _rebuild_max_end(self, position: int) -> None:
+        del self._max_end[position:]
+        current = self._max_end[-1] if self._max_end else None
+        for interval in self._intervals[position:]:
+            current = interval.end if current is None or interval.end > current else current
+            self._max_end.append(current)
+
+    def add(self, interval: LeaveInterval) -> None:
+        position = bisect_right(self._starts, interval.start)
+        self._intervals.insert(position, interval)
+        self._starts.insert(position, interval.start)
+        self._rebuild_max_end(position)
+
+    def remove(self, leave_id: uuid.UUID) -> bool:
+        for position, interval in enumerate(self._intervals):
+            if interval.leave_id == leave_id:
+                del self._intervals[position]
+                del self._starts[position]
+                self._rebuild_max_end(position)
+                return True
+        return False
+
+    def overlapping(self, start: date, end: date) -> List[LeaveInterval]:
+        """Intervals sharing at least one day with [start, end]"""
+        found = []
+        position = bisect_right(self._starts, end) - 1
+        while position >= 0 and self._max_end[position] >= start:
+            interval = self._intervals[position]
+            if interval.end >= start:
+                found.append(interval)
+            position -= 1
+        found.reverse()
+        return found
+
+
+class LeaveCalendar:
+    """Approved leaves indexed per department (None for employees without one)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._departments: Dict[Optional[uuid.UUID], IntervalIndex] = {}
+        self._leave_department: Dict[uuid.UUID, Optional[uuid.UUID]] = {}
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self, db: Session) -> None:
+        rows = db.execute(
+            select(
+                Leave.id, Leave.employee_id, Leave.start_date, Leave.end_date,
+                Leave.leave_type, Leave.is_half_day, Employee.department_id,
+            ).join(Employee, Leave.employee_id == Employee.id).where(Leave.status == LeaveStatus.APPROVED)
+        ).all()
+
+        grouped: Dict[Optional[uuid.UUID], List[LeaveInterval]] = {}
+        leave_department = {}
+        for leave_id, employee_id, start, end, leave_type, is_half_day, department_id in rows:
+            grouped.setdefault(department_id, []).append(
+                LeaveInterval(leave_id, employee_id, start, end, leave_type, bool(is_half_day))
+            )
+            leave_department[leave_id] = department_id
+
+        with self._lock:
+            self._departments = {department_id: IntervalIndex(intervals) for department_id, intervals in grouped.items()}
+            self._leave_department = leave_department
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def invalidate(self) -> None:
+        """Drop the calendar; the next query reloads it (e.g. after employees change department)"""
+        with self._lock:
+            self._loaded = False
+
+    def add(self, department_id: Optional[uuid.UUID], interval: LeaveInterval) -> None:
+        with self._lock:
+            # A load after the leave was committed already picked it up
+            if not self._loaded or interval.leave_id in self._leave_department:
+                return
+            self._departments.setdefault(department_id, IntervalIndex()).add(interval)
+            self._leave_department[interval.leave_id] = department_id
+
+    def remove(self, leave_id: uuid.UUID) -> None:
+        with self._lock:
+            if not self._loaded or leave_id not in self._leave_department:
+                return
+            department_id = self._leave_department.pop(leave_id)
+            self._departments[department_id].remove(leave_id)
+
+    def overlapping(self, start: date, end: date, department_id: Optional[uuid.UUID] = None, all_departments: bool = False) -> List[LeaveInterval]:
+        with self._lock:
+            if all_departments:
+                indexes = list(self._departments.values())
+            else:
+                indexes = [self._departments[department_id]] if department_id in self._departments else []
+            found = []
+            for index in indexes:
+                found.extend(index.overlapping(start, end))
+        return sorted(found, key=lambda i: (i.start, i.end))
+
+
+@lru_cache(maxsize=None)
+def get_leave_calendar() -> LeaveCalendar:
+    calendar = LeaveCalendar()
+    get_invalidation_bus().subscribe(LEAVE_CALENDAR, lambda events: calendar.invalidate())
+    return calendar
+
+
+class LeaveService:
+    """Leave workflow on top of a database session and the shared calendar"""
+
+    def __init__(self, db: Session, calendar: Optional[LeaveCalendar] = None):
+        self.db = db
+        self.calendar = calendar or get_leave_calendar()
+
+    # ---- Workflow ------------------------------------------------------
+
+    def create_leave(self, employee: Employee, leave_type: LeaveType, start_date: date, end_date: date, reason: str, is_half_day: bool = False, half_day_period: Optional[str] = None, is_emergency: bool = False) -> Leave:
+        if end_date < start_date:
+            raise LeaveError("end_date must not be before start_date")
+        if is_half_day and start_date != end_date:
+            raise LeaveError("A half-day leave must start and end on the same day")
+
+        self.calendar.ensure_loaded(self.db)
+        clash = [
+            i for i in self.calendar.overlapping(start_date, end_date, employee.department_id)
+            if i.employee_id == employee.id
+        ]
+        if clash:
+            raise LeaveError("Employee already has approved leave in this period")
+
+        leave = Leave(
+            employee_id=employee.id,
+            leave_type=leave_type,
+            start_date=start_date,
+            end_date=end_date,
+            total_days=(end_date - start_date).days + 1,
+            is_half_day=is_half_day,
+            half_day_period=half_day_period,
+            reason=reason,
+            is_emergency=is_emergency,
+            status=LeaveStatus.PENDING,
+        )
+        self.db.add(leave)
+        self.db.commit()
+        self.db.refresh(leave)
+        return leave
+
+    def _get(self, leave_id: uuid.UUID) -> Leave:
+        leave = self.db.get(Leave, leave_id)
+        if not leave:
+            raise LookupError("Leave not found")
+        return leave
+
+    def approve(self, leave_id: uuid.UUID, approver_id: Optional[uuid.UUID] = None, notes: Optional[str] = None) -> Leave:
+        leave = self._get(leave_id)
+        if leave.status != LeaveStatus.PENDING:
+            raise LeaveError(f"Only pending leaves can be approved (status is {leave.status.value})")
+        # Other requests for the same days may have been approved since this one was made
+        clash = self.db.execute(
+            select(Leave.id).where(
+                Leave.employee_id == leave.employee_id,
+                Leave.status == LeaveStatus.APPROVED,
+                Leave.id != leave.id,
+                Leave.start_date <= leave.end_date,
+                Leave.end_date >= leave.start_date,
+            ).limit(1)
+        ).scalar()
+        if clash is not None:
+            raise LeaveError("Employee already has approved leave in this period")
+        was_loaded = self.calendar.loaded
+        leave.status = LeaveStatus.APPROVED
+        leave.approved_by = approver_id
+        leave.approval_date = datetime.utcnow()
+        leave.approval_notes = notes
+        self.db.commit()
+
+        # An unloaded calendar picks the leave up when it is first loaded
+        if was_loaded:
+            department_id = self.db.execute(
+                select(Employee.department_id).where(Employee.id == leave.employee_id)
+            ).scalar()
+            self.calendar.add(department_id, LeaveInterval(
+                leave.id, leave.employee_id, leave.start_date, leave.end_date, leave.leave_type, bool(leave.is_half_day)
+            ))
+        # Updated in place here; other workers reload theirs
+        get_invalidation_bus().publish(LEAVE_CALENDAR, keys=[leave.id], local=False)
+        return leave
+
+    def reject(self, leave_id: uuid.UUID, notes: Optional[str] = None) -> Leave:
+        leave = self._get(leave_id)
+        if leave.status != LeaveStatus.PENDING:
+            raise LeaveError(f"Only pending leaves can be rejected (status is {leave.status.value})")
+        leave.status = LeaveStatus.REJECTED
+        leave.approval_notes = notes
+        self.db.commit()
+        return leave
+
+    def cancel(self, leave_id: uuid.UUID) -> Leave:
+        leave = self._get(leave_id)
+        if leave.status not in (LeaveStatus.PENDING, LeaveStatus.APPROVED):
+            raise LeaveError(f"Leave is already {leave.status.value}")
+        was_approved = leave.status == LeaveStatus.APPROVED
+        leave.status = LeaveStatus.CANCELLED
+        self.db.commit()
+        self.calendar.remove(leave.id)
+        if was_approved:
+            get_invalidation_bus().publish(LEAVE_CALENDAR, keys=[leave.id], local=False)
+        return leave
+
+    # ---- Calendar queries ----------------------------------------------
+
+    def who_is_off(self, start: date, end: date, department_id: Optional[uuid.UUID] = None) -> List[LeaveInterval]:
+        """Approved leaves overlapping [start, end]; all departments when none is given"""
+        self.calendar.ensure_loaded(self.db)
+        return self.calendar.overlapping(start, end, department_id, all_departments=department_id is None)
+
+    def availability(self, department_id: uuid.UUID, start: date, end: date) -> dict:
+        """Active employees of a department and which of them are on leave in the range"""
+        self.calendar.ensure_loaded(self.db)
+        employees = self.db.execute(
+            select(Employee.id, Employee.employee_code, Employee.full_name).where(
+                Employee.department_id == department_id, Employee.is_active == True
+            )
+        ).all()
+        leaves = self.calendar.overlapping(start, end, department_id)
+        off_ids = {leave.employee_id for leave in leaves}
+        return {
+            "department_id": department_id,
+            "start_date": start,
+            "end_date": end,
+            "total_employees": len(employees),
+            "available": [
+                {"employee_id": e.id, "employee_code": e.employee_code, "full_name": e.full_name}
+                for e in employees if e.id not in off_ids
+            ],
+            "on_leave": leaves,
+        }
+
+    # ---- Balances ------------------------------------------------------
+
+    def recompute_balances(self, year: int) -> dict:
+        """Set used/remaining of every balance for `year` from one aggregate over approved leaves"""
+        used_rows = self.db.execute(
+            select(Leave.employee_id, Leave.leave_type, func.sum(Leave.total_days)).where(
+                Leave.status == LeaveStatus.APPROVED,
+                Leave.start_date >= date(year, 1, 1),
+                Leave.start_date < date(year + 1, 1, 1),
+            ).group_by(Leave.employee_id, Leave.leave_type)
+        ).all()
+        used = {(employee_id, leave_type): int(total or 0) for employee_id, leave_type, total in used_rows}
+
+        balances = self.db.execute(
+            select(LeaveBalance.id, LeaveBalance.employee_id, LeaveBalance.leave_type,
+                   LeaveBalance.total_allocated, LeaveBalance.carried_forward).where(LeaveBalance.year == year)
+        ).all()
+
+        updates = []
+        for balance_id, employee_id, leave_type, allocated, carried in balances:
+            days = used.pop((employee_id, leave_type), 0)
+            updates.append({
+                "id": balance_id,
+                "used": days,
+                "remaining": (allocated or 0) + (carried or 0) - days,
+            })
+        if updates:
+            self.db.execute(update(LeaveBalance), updates)
+
+        # Leave taken without an allocation still gets a balance row
+        for (employee_id, leave_type), days in used.items():
+            self.db.add(LeaveBalance(
+                employee_id=employee_id, year=year, leave_type=leave_type,
+                total_allocated=0, used=days, remaining=-days, carried_forward=0,
+            ))
+        self.db.commit()
+        return {"year": year, "updated": len(updates), "created": len(used)}
@@ -0,0 +1,160 @@
+"""
+Partition maintenance for attendance_records.
+
+attendance_records is range-partitioned by month on check_in_time (PostgreSQL
+only, see the 3f6c2a9d1e45 migration). This service pre-creates upcoming
+monthly partitions and detaches partitions older than the retention window so
+they can be archived or dropped without touching the live table.
+
+Rows outside every monthly partition land in the DEFAULT partition. PostgreSQL
+refuses to create a partition whose range has rows in DEFAULT, so such a
+month's rows are moved into the new table before it is attached. Maintenance
+runs under an advisory lock: every API worker schedules it, one does the work.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import advisory_lock
+
+PARENT_TABLE = "attendance_records"
+PARTITION_NAME = re.compile(r"^attendance_records_y(\d{4})m(\d{2})$")
+MAINTENANCE_LOCK = "attendance_records_partition_maintenance"
+
+
+@dataclass
+class Partition:
+    name: str
+    month: date
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+class PartitionService:
+    """Creates and detaches monthly partitions of attendance_records"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def is_partitioned(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return False
+        with self.engine.connect() as connection:
+            return bool(connection.execute(text("""
+                SELECT 1 FROM pg_partitioned_table p
+                JOIN pg_class c ON c.oid = p.partrelid
+                WHERE c.relname = :table
+            """), {"table": PARENT_TABLE}).scalar())
+
+    def list_partitions(self) -> List[Partition]:
+        """Monthly partitions currently attached, oldest first"""
+        with self.engine.connect() as connection:
+            names = connection.execute(text("""
+                SELECT child.relname FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table
+            """), {"table": PARENT_TABLE}).scalars().all()
+
+        partitions = []
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions.append(Partition(name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda p: p.month)
+
+    def default_partition(self, connection) -> Optional[str]:
+        return connection.execute(text("""
+            SELECT child.relname FROM pg_partitioned_table p
+            JOIN pg_class parent ON parent.oid = p.partrelid
+            JOIN pg_class child ON child.oid = p.partdefid
+            WHERE parent.relname = :table
+        """), {"table": PARENT_TABLE}).scalar()
+
+    def create_partition(self, connection, month: date) -> str:
+        """Create a month's partition, taking over its rows from the DEFAULT partition"""
+        name = partition_name(month)
+        bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        default = self.default_partition(connection)
+        in_range = "check_in_time >= :start AND check_in_time < :end"
+        params = {"start": month, "end": add_months(month, 1)}
+        if default is None or not connection.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"), params
+        ).scalar():
+            connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}"))
+            return name
+
+        # Build the partition as a plain table, move the month out of DEFAULT,
+        # then attach it (the attach check scans DEFAULT, now clear of the month)
+        connection.execute(text(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        moved = connection.execute(text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), params).rowcount
+        connection.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+        print(f"Moved {moved} rows from {default} to {name}")
+        return name
+
+    def ensure_future_partitions(self, months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+        """Create any missing partitions from the current month to `months_ahead` months out"""
+        months_ahead = settings.ATTENDANCE_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+        current = month_start(today or datetime.utcnow())
+        existing = {p.month for p in self.list_partitions()}
+
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            # One transaction per month: a month that fails does not undo the others
+            with self.engine.begin() as connection:
+                created.append(self.create_partition(connection, month))
+        return created
+
+    def detach_old_partitions(self, retain_months: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+        """Detach partitions that end before the retention window; the tables are kept"""
+        retain_months = settings.ATTENDANCE_PARTITION_RETAIN_MONTHS if retain_months is None else retain_months
+        if retain_months <= 0:
+            return []
+        cutoff = add_months(month_start(today or datetime.utcnow()), -retain_months)
+
+        detached = []
+        with self.engine.begin() as connection:
+            for partition in self.list_partitions():
+                if partition.month >= cutoff:
+                    break
+                connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition.name}"))
+                detached.append(partition.name)
+        return detached
+
+    def run_maintenance(self, months_ahead: Optional[int] = None, retain_months: Optional[int] = None) -> dict:
+        """Pre-create future partitions and detach expired ones, unless another process is already at it"""
+        if not self.is_partitioned():
+            return {"partitioned": False, "skipped": False, "created": [], "detached": []}
+        with advisory_lock(self.engine, MAINTENANCE_LOCK) as acquired:
+            if not acquired:
+                return {"partitioned": True, "skipped": True, "created": [], "detached": []}
+            return {
+                "partitioned": True,
+                "skipped": False,
+                "created": self.ensure_future_partitions(months_ahead),
+                "detached": self.detach_old_partitions(retain_months),
+            }
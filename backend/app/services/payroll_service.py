@@ -0,0 +1,265 @@
+"""
+Vectorized payroll hours calculation.
+
+A month of check-in/out timestamps for every employee is loaded into NumPy
+arrays and evaluated against each employee's resolved work shift in one pass:
+worked hours net of the shift break, late and early-leave minutes beyond the
+shift thresholds, overtime beyond the overtime threshold and a status. The
+results are written back to attendance_records with a single bulk UPDATE.
+
+The status is only recomputed for records of employees with a shift, and
+never replaces a leave, holiday or absence marking.
+
+Times are wall-clock times as stored in attendance_records; overnight shifts
+(end_time <= start_time) end on the following day.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.shift import EmployeeShift, WorkShift
+
+DAY = 86400
+HALF_DAY = DAY // 2
+
+# Status codes produced by compute_payroll, in order of precedence
+STATUS_ON_TIME, STATUS_LATE, STATUS_EARLY_LEAVE, STATUS_OVERTIME = 0, 1, 2, 3
+STATUS_VALUES = {
+    STATUS_ON_TIME: AttendanceStatus.ON_TIME,
+    STATUS_LATE: AttendanceStatus.LATE,
+    STATUS_EARLY_LEAVE: AttendanceStatus.EARLY_LEAVE,
+    STATUS_OVERTIME: AttendanceStatus.OVERTIME,
+}
+# Set by people, not derived from check-in/out times
+KEPT_STATUSES = {AttendanceStatus.LEAVE, AttendanceStatus.HOLIDAY, AttendanceStatus.ABSENT}
+UPDATED_COLUMNS = (
+    "shift_id", "work_hours", "late_minutes", "early_leave_minutes", "overtime_hours",
+    "scheduled_in", "scheduled_out", "status",
+)
+
+
+@dataclass
+class ShiftTable:
+    """Resolved shift per employee index; NaN where an employee has no shift"""
+    start: np.ndarray  # seconds from midnight
+    end: np.ndarray
+    break_start: np.ndarray
+    break_end: np.ndarray
+    late_threshold: np.ndarray  # seconds
+    early_threshold: np.ndarray
+    overtime_threshold: np.ndarray
+    shift_ids: List[Optional[object]]
+
+    @classmethod
+    def empty(cls, size: int) -> "ShiftTable":
+        return cls(*(np.full(size, np.nan) for _ in range(7)), [None] * size)
+
+
+def _seconds(value: time) -> float:
+    return float(value.hour * 3600 + value.minute * 60 + value.second) if value else np.nan
+
+
+def compute_payroll(check_in: np.ndarray, check_out: np.ndarray, employee_index: np.ndarray, shifts: ShiftTable) -> Dict[str, np.ndarray]:
+    """Evaluate all records at once.
+
+    check_in/check_out are epoch seconds as float64 (check_out NaN while the
+    record is still open); employee_index maps each record to a row of `shifts`.
+    """
+    start = shifts.start[employee_index]
+    end = shifts.end[employee_index]
+    has_shift = ~np.isnan(start)
+    closed = ~np.isnan(check_out)
+
+    # Scheduled start on the check-in day; an early-morning check-in for an
+    # overnight shift belongs to the shift that started the previous evening
+    day_start = np.floor(check_in / DAY) * DAY
+    shift_length = np.mod(end - start, DAY)
+    shift_length = np.where(shift_length == 0, DAY, shift_length)
+    scheduled_in = day_start + start
+    overnight = end <= start
+    scheduled_in = np.where(overnight & (check_in < scheduled_in - HALF_DAY), scheduled_in - DAY, scheduled_in)
+    scheduled_out = scheduled_in + shift_length
+
+    # Break window anchored to the scheduled start
+    break_start = scheduled_in + np.mod(shifts.break_start[employee_index] - start, DAY)
+    break_end = break_start + np.mod(shifts.break_end[employee_index] - shifts.break_start[employee_index], DAY)
+    break_overlap = np.clip(np.minimum(check_out, break_end) - np.maximum(check_in, break_start), 0, None)
+    break_overlap = np.nan_to_num(break_overlap, nan=0.0)
+
+    worked = np.where(closed, check_out - check_in - break_overlap, np.nan)
+
+    late = check_in - scheduled_in
+    late = np.where(has_shift & (late > shifts.late_threshold[employee_index]), late, 0.0)
+    early = scheduled_out - check_out
+    early = np.where(has_shift & closed & (early > shifts.early_threshold[employee_index]), early, 0.0)
+    overtime = check_out - scheduled_out
+    overtime = np.where(has_shift & closed & (overtime >= shifts.overtime_threshold[employee_index]), overtime, 0.0)
+
+    status = np.full(check_in.shape, STATUS_ON_TIME, dtype=np.int8)
+    status[overtime > 0] = STATUS_OVERTIME
+    status[early > 0] = STATUS_EARLY_LEAVE
+    status[late > 0] = STATUS_LATE
+
+    return {
+        "work_hours": np.round(worked / 3600, 2),
+        "late_minutes": np.round(late / 60, 1),
+        "early_leave_minutes": np.round(early / 60, 1),
+        "overtime_hours": np.round(overtime / 3600, 2),
+        "break_minutes": np.round(break_overlap / 60, 1),
+        "status": status,
+        "scheduled_in": np.where(has_shift, scheduled_in, np.nan),
+        "scheduled_out": np.where(has_shift, scheduled_out, np.nan),
+    }
+
+
+def _epoch_seconds(values: List[datetime]) -> np.ndarray:
+    array = np.array(values, dtype="datetime64[s]")
+    seconds = array.astype(np.int64).astype(np.float64)
+    seconds[np.isnat(array)] = np.nan
+    return seconds
+
+
+@dataclass
+class MonthRecords:
+    """A month of attendance records as parallel lists and arrays"""
+    ids: list
+    check_in_times: List[datetime]  # as stored, to address the record's partition
+    statuses: List[Optional[AttendanceStatus]]
+    employees: List[str]
+    check_in: np.ndarray  # epoch seconds
+    check_out: np.ndarray
+    employee_index: np.ndarray
+
+
+class PayrollService:
+    """Recalculates a month of attendance records against employee shifts"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _month_bounds(self, year: int, month: int):
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+        return start, end
+
+    def load_month(self, year: int, month: int):
+        start, end = self._month_bounds(year, month)
+        rows = self.db.execute(
+            select(
+                AttendanceRecord.id,
+                AttendanceRecord.employee_id,
+                AttendanceRecord.check_in_time,
+                AttendanceRecord.check_out_time,
+                AttendanceRecord.status,
+            ).where(
+                AttendanceRecord.check_in_time >= start,
+                AttendanceRecord.check_in_time < end,
+            )
+        ).all()
+        if not rows:
+            return MonthRecords([], [], [], [], np.empty(0), np.empty(0), np.empty(0, dtype=np.int64))
+
+        record_ids, employee_ids, check_ins, check_outs, statuses = map(list, zip(*rows))
+        employees, employee_index = np.unique(np.array([str(e) for e in employee_ids]), return_inverse=True)
+        return MonthRecords(
+            record_ids, check_ins, statuses, list(employees),
+            _epoch_seconds(check_ins), _epoch_seconds(check_outs), employee_index,
+        )
+
+    def resolve_shifts(self, employees: List[str], year: int, month: int) -> ShiftTable:
+        """Primary active shift per employee effective during the month (latest wins)"""
+        start, end = self._month_bounds(year, month)
+        table = ShiftTable.empty(len(employees))
+        if not employees:
+            return table
+        position = {employee_id: i for i, employee_id in enumerate(employees)}
+
+        rows = self.db.execute(
+            select(EmployeeShift, WorkShift).join(WorkShift, EmployeeShift.shift_id == WorkShift.id).where(
+                EmployeeShift.is_active == True,
+                EmployeeShift.is_primary == True,
+                EmployeeShift.effective_date < end.date(),
+                or_(EmployeeShift.end_date.is_(None), EmployeeShift.end_date >= start.date()),
+            ).order_by(EmployeeShift.effective_date)
+        ).all()
+
+        for assignment, shift in rows:
+            i = position.get(str(assignment.employee_id))
+            if i is None:
+                continue
+            table.start[i] = _seconds(assignment.custom_start_time or shift.start_time)
+            table.end[i] = _seconds(assignment.custom_end_time or shift.end_time)
+            table.break_start[i] = _seconds(shift.break_start)
+            table.break_end[i] = _seconds(shift.break_end)
+            table.late_threshold[i] = (shift.late_threshold_minutes or 0) * 60
+            table.early_threshold[i] = (shift.early_leave_threshold_minutes or 0) * 60
+            table.overtime_threshold[i] = (shift.overtime_threshold_minutes or 0) * 60
+            table.shift_ids[i] = shift.id
+        return table
+
+    def recalculate_month(self, year: int, month: int) -> dict:
+        """Compute and store payroll figures for every record checked in during the month"""
+        records = self.load_month(year, month)
+        if not records.ids:
+            return {"records": 0, "employees": 0, "updated": 0}
+        employee_index = records.employee_index
+
+        shifts = self.resolve_shifts(records.employees, year, month)
+        results = compute_payroll(records.check_in, records.check_out, employee_index, shifts)
+        # Records whose status follows from the times: with a shift, not marked by hand
+        recompute = ~np.isnan(shifts.start[employee_index]) & np.array(
+            [current not in KEPT_STATUSES for current in records.statuses], dtype=bool
+        )
+        statuses = [
+            STATUS_VALUES[code] if derived else current
+            for code, current, derived in zip(results["status"].tolist(), records.statuses, recompute.tolist())
+        ]
+
+        def optional(values):
+            return [None if np.isnan(v) else v for v in values.tolist()]
+
+        def times_of_day(values):
+            seconds = np.mod(values, DAY)
+            return [None if np.isnan(v) else time(int(v) // 3600, int(v) % 3600 // 60) for v in seconds.tolist()]
+
+        # Columns converted to Python lists once, then zipped into parameter rows
+        columns = {
+            "record_id": records.ids,
+            "record_check_in_time": records.check_in_times,
+            "shift_id": [shifts.shift_ids[i] for i in employee_index.tolist()],
+            "work_hours": optional(results["work_hours"]),
+            "late_minutes": results["late_minutes"].tolist(),
+            "early_leave_minutes": results["early_leave_minutes"].tolist(),
+            "overtime_hours": results["overtime_hours"].tolist(),
+            "scheduled_in": times_of_day(results["scheduled_in"]),
+            "scheduled_out": times_of_day(results["scheduled_out"]),
+            "status": statuses,
+        }
+        names = list(columns)
+        updates = [dict(zip(names, row)) for row in zip(*columns.values())]
+        # One executemany; matching on check_in_time as well lets PostgreSQL
+        # prune to the record's monthly partition instead of probing them all
+        table = AttendanceRecord.__table__
+        statement = update(table).where(and_(
+            table.c.id == bindparam("record_id"),
+            table.c.check_in_time == bindparam("record_check_in_time"),
+        )).values({name: bindparam(name) for name in UPDATED_COLUMNS})
+        self.db.execute(statement, updates)
+        self.db.commit()
+
+        recomputed = results["status"][recompute]
+        return {
+            "records": len(records.ids),
+            "employees": len(records.employees),
+            "updated": len(updates),
+            "late": int(np.count_nonzero(recomputed == STATUS_LATE)),
+            "early_leave": int(np.count_nonzero(recomputed == STATUS_EARLY_LEAVE)),
+            "overtime": int(np.count_nonzero(recomputed == STATUS_OVERTIME)),
+            "total_work_hours": float(np.nansum(results["work_hours"])),
+        }
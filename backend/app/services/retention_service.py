@@ -0,0 +1,295 @@
+"""
+Retention and archival for attendance photos and records.
+
+Policies (all ages measured from check_in_time):
+  * after RETENTION_FULL_IMAGE_DAYS   the check-in/out photos are replaced by thumbnails
+  * after RETENTION_THUMBNAIL_DAYS    the thumbnails are deleted and the references cleared
+  * after RETENTION_RECORD_DAYS       the records move to compressed columnar archive
+                                      files under ARCHIVE_DIR and leave the hot table
+
+Offline-sync idempotency keys are deleted after KIOSK_SYNC_KEY_RETENTION_DAYS
+(measured from when they were synced).
+
+Each pass walks the table in small keyset-ordered batches, commits per batch
+and pauses between batches, so it can run next to live traffic. Every API
+worker schedules passes; a PostgreSQL advisory lock lets one run at a time.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, and_, delete, or_, select, tuple_
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import SessionLocal, advisory_lock, engine
+from app.models.attendance import AttendanceRecord, AttendanceSyncEvent
+
+THUMBNAIL_DIR = "thumbs"
+RETENTION_LOCK = "attendance_retention"
+
+
+def archive_kind(column_type) -> str:
+    """NumPy dtype family a column is archived as; the rest are stored as text"""
+    if isinstance(column_type, DateTime):
+        return "datetime"
+    if isinstance(column_type, (Float, Integer)):
+        return "float"
+    if isinstance(column_type, Boolean):
+        return "bool"
+    if isinstance(column_type, JSON):
+        return "json"
+    return "str"
+
+
+# Every column of the table, so archived records can be restored in full
+ARCHIVE_COLUMNS = {column.key: archive_kind(column.type) for column in AttendanceRecord.__table__.columns}
+
+
+@dataclass
+class RetentionReport:
+    thumbnailed: int = 0
+    images_deleted: int = 0
+    missing_files: int = 0
+    records_archived: int = 0
+    sync_keys_purged: int = 0
+    archive_files: List[str] = field(default_factory=list)
+    skipped: bool = False  # another process held the retention lock
+
+    def as_dict(self) -> dict:
+        return {
+            "thumbnailed": self.thumbnailed,
+            "images_deleted": self.images_deleted,
+            "missing_files": self.missing_files,
+            "records_archived": self.records_archived,
+            "sync_keys_purged": self.sync_keys_purged,
+            "archive_files": self.archive_files,
+            "skipped": self.skipped,
+        }
+
+
+def _column_array(values: list, kind: str) -> np.ndarray:
+    if kind == "datetime":
+        return np.array([np.datetime64(v, "us") if v is not None else np.datetime64("NaT", "us") for v in values])
+    if kind == "float":
+        return np.array([v if v is not None else np.nan for v in values], dtype=np.float64)
+    if kind == "bool":
+        return np.array([bool(v) for v in values], dtype=bool)
+    if kind == "json":
+        return np.array(["" if v is None else json.dumps(v, sort_keys=True) for v in values], dtype=str)
+    # Fixed-width unicode keeps the archive loadable without pickle
+    return np.array(["" if v is None else str(getattr(v, "value", v)) for v in values], dtype=str)
+
+
+def write_archive(path: str, rows: List[AttendanceRecord]) -> None:
+    """Write records as one compressed array per column"""
+    columns = {
+        name: _column_array([getattr(row, name) for row in rows], kind)
+        for name, kind in ARCHIVE_COLUMNS.items()
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **columns)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_archive(path: str) -> Dict[str, np.ndarray]:
+    """Load an archive file back into a dict of column arrays"""
+    with np.load(path, allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+class RetentionService:
+    """Applies the image and record retention policies in rate-limited batches"""
+
+    def __init__(self, session_factory=SessionLocal, bind: Engine = engine):
+        self.session_factory = session_factory
+        self.bind = bind  # where the retention lock is taken
+        self.archive_dir = settings.ARCHIVE_DIR
+        self.batch_size = settings.RETENTION_BATCH_SIZE
+        self.batch_pause = settings.RETENTION_BATCH_PAUSE_SECONDS
+
+    def run(self, now: Optional[datetime] = None, stop: Optional[threading.Event] = None) -> RetentionReport:
+        """Run all retention tiers once, unless another process is already running them"""
+        report = RetentionReport()
+        with advisory_lock(self.bind, RETENTION_LOCK) as acquired:
+            if not acquired:
+                report.skipped = True
+                return report
+            self._run_tiers(now or datetime.utcnow(), report, stop)
+        return report
+
+    def _run_tiers(self, now: datetime, report: RetentionReport, stop: Optional[threading.Event]) -> None:
+        if settings.RETENTION_RECORD_DAYS > 0:
+            self.archive_records(now - timedelta(days=settings.RETENTION_RECORD_DAYS), report, stop)
+        if settings.RETENTION_THUMBNAIL_DAYS > 0:
+            self.delete_images(now - timedelta(days=settings.RETENTION_THUMBNAIL_DAYS), report, stop)
+        if settings.RETENTION_FULL_IMAGE_DAYS > 0:
+            self.thumbnail_images(now - timedelta(days=settings.RETENTION_FULL_IMAGE_DAYS), report, stop)
+        if settings.KIOSK_SYNC_KEY_RETENTION_DAYS > 0:
+            self.purge_sync_keys(now - timedelta(days=settings.KIOSK_SYNC_KEY_RETENTION_DAYS), report)
+
+    # ---- Batching ------------------------------------------------------
+
+    def _batches(self, db, condition, stop: Optional[threading.Event], advance: bool = True):
+        """Yield batches of records matching `condition` in (check_in_time, id) order.
+
+        With advance=False the caller removes each batch from the result set
+        (deletes), so the next batch is read from the start again.
+        """
+        last_key = None
+        while not (stop and stop.is_set()):
+            query = select(AttendanceRecord).where(condition)
+            if advance and last_key is not None:
+                query = query.where(tuple_(AttendanceRecord.check_in_time, AttendanceRecord.id) > last_key)
+            query = query.order_by(AttendanceRecord.check_in_time, AttendanceRecord.id).limit(self.batch_size)
+            batch = db.execute(query).scalars().all()
+            if not batch:
+                return
+            last_key = (batch[-1].check_in_time, batch[-1].id)
+            yield batch
+            if len(batch) < self.batch_size:
+                return
+            time.sleep(self.batch_pause)
+
+    # ---- Tier 1: full image -> thumbnail -------------------------------
+
+    def _is_thumbnail(self, path: Optional[str]) -> bool:
+        return bool(path) and os.path.basename(os.path.dirname(path)) == THUMBNAIL_DIR
+
+    def _thumbnail(self, path: str) -> str:
+        thumb_dir = os.path.join(os.path.dirname(path), THUMBNAIL_DIR)
+        os.makedirs(thumb_dir, exist_ok=True)
+        thumb_path = os.path.join(thumb_dir, os.path.basename(path))
+        with Image.open(path) as image:
+            image.thumbnail((settings.RETENTION_THUMBNAIL_SIZE, settings.RETENTION_THUMBNAIL_SIZE))
+            image.convert("RGB").save(thumb_path, "JPEG", quality=70)
+        return thumb_path
+
+    def thumbnail_images(self, cutoff: datetime, report: RetentionReport, stop=None) -> None:
+        def full_image(column):
+            return and_(column.isnot(None), ~column.contains(f"/{THUMBNAIL_DIR}/"))
+
+        condition = and_(
+            AttendanceRecord.check_in_time < cutoff,
+            or_(full_image(AttendanceRecord.check_in_image), full_image(AttendanceRecord.check_out_image)),
+        )
+        db = self.session_factory()
+        try:
+            for batch in self._batches(db, condition, stop):
+                originals = []
+                for record in batch:
+                    for column in ("check_in_image", "check_out_image"):
+                        path = getattr(record, column)
+                        if not path or self._is_thumbnail(path):
+                            continue
+                        if not os.path.exists(path):
+                            # Keep references consistent with what is on disk
+                            setattr(record, column, None)
+                            report.missing_files += 1
+                            continue
+                        try:
+                            setattr(record, column, self._thumbnail(path))
+                        except Exception as e:
+                            # Leave it for the deletion tier rather than stalling every pass
+                            print(f"Error creating thumbnail for {path}: {e}")
+                            continue
+                        originals.append(path)
+                        report.thumbnailed += 1
+                db.commit()
+                # Originals go only once the new references are committed
+                for path in originals:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
+        finally:
+            db.close()
+
+    # ---- Tier 2: thumbnail -> nothing ----------------------------------
+
+    def delete_images(self, cutoff: datetime, report: RetentionReport, stop=None) -> None:
+        condition = and_(
+            AttendanceRecord.check_in_time < cutoff,
+            or_(AttendanceRecord.check_in_image.isnot(None), AttendanceRecord.check_out_image.isnot(None)),
+        )
+        db = self.session_factory()
+        try:
+            for batch in self._batches(db, condition, stop, advance=False):
+                paths = []
+                for record in batch:
+                    paths += [p for p in (record.check_in_image, record.check_out_image) if p]
+                    record.check_in_image = None
+                    record.check_out_image = None
+                db.commit()
+                report.images_deleted += self._remove_files(paths, report)
+        finally:
+            db.close()
+
+    # ---- Tier 3: records -> archive ------------------------------------
+
+    def archive_records(self, cutoff: datetime, report: RetentionReport, stop=None) -> None:
+        condition = AttendanceRecord.check_in_time < cutoff
+        db = self.session_factory()
+        try:
+            for batch in self._batches(db, condition, stop, advance=False):
+                first = batch[0]
+                month_dir = first.check_in_time.strftime("%Y-%m")
+                path = os.path.join(
+                    self.archive_dir, "attendance", month_dir,
+                    f"records_{first.check_in_time.strftime('%Y%m%d%H%M%S')}_{first.id}.npz"
+                )
+                # The archive is durable on disk before the rows are deleted
+                write_archive(path, batch)
+                paths = []
+                for record in batch:
+                    paths += [p for p in (record.check_in_image, record.check_out_image) if p]
+                    db.delete(record)
+                db.commit()
+                report.images_deleted += self._remove_files(paths, report)
+                report.records_archived += len(batch)
+                report.archive_files.append(path)
+        finally:
+            db.close()
+
+    # ---- Offline sync idempotency keys ---------------------------------
+
+    def purge_sync_keys(self, cutoff: datetime, report: RetentionReport) -> None:
+        db = self.session_factory()
+        try:
+            result = db.execute(delete(AttendanceSyncEvent).where(AttendanceSyncEvent.created_at < cutoff))
+            db.commit()
+            report.sync_keys_purged += result.rowcount or 0
+        finally:
+            db.close()
+
+    def _remove_files(self, paths: List[str], report: RetentionReport) -> int:
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                report.missing_files += 1
+        return removed
+
+
+def run_retention_loop(stop: threading.Event) -> None:
+    """Run retention every RETENTION_INTERVAL_SECONDS until `stop` is set"""
+    service = RetentionService()
+    while not stop.is_set():
+        try:
+            report = service.run(stop=stop)
+            print(f"Retention pass: {report.as_dict()}")
+        except Exception as e:
+            print(f"Error running retention: {e}")
+        stop.wait(settings.RETENTION_INTERVAL_SECONDS)
@@ -0,0 +1,270 @@
+"""
+Employee search by name, code and email with prefix and fuzzy matching.
+
+On PostgreSQL the query runs against pg_trgm GIN indexes (see the
+d8a3f1c6b274 migration). Elsewhere (SQLite in development) an in-memory
+trigram index built from the employees table answers the same query with the
+same ranking: exact code, then prefix, then substring, then trigram
+similarity.
+"""
+
+import re
+import threading
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+import uuid
+
+import numpy as np
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.invalidation import SEARCH, get_invalidation_bus
+from app.models.employee import Employee
+
+SEARCH_FIELDS = ("employee_code", "full_name", "email")
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm's default for the % operator
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text: Optional[str]) -> str:
+    return (text or "").strip().lower()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams as pg_trgm builds them: per word, padded with two spaces before and one after"""
+    grams = set()
+    for word in _WORD.findall(normalize(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _rank(code: str, name: str, email: str, query: str) -> int:
+    """3 exact code, 2 prefix of a field or a name word, 1 substring, 0 otherwise"""
+    if code == query:
+        return 3
+    if code.startswith(query) or email.startswith(query) or name.startswith(query) \
+            or any(word.startswith(query) for word in name.split()):
+        return 2
+    if query in code or query in name or query in email:
+        return 1
+    return 0
+
+
+@dataclass
+class SearchHit:
+    id: uuid.UUID
+    employee_code: str
+    full_name: str
+    email: str
+    department_id: Optional[uuid.UUID]
+    position: Optional[str]
+    is_active: bool
+    score: float
+
+
+class NGramIndex:
+    """Inverted trigram index over the search fields of every employee.
+
+    Each (employee, field) pair is a key; a posting list per trigram holds the
+    keys containing it. A query counts shared trigrams per key with one
+    bincount and turns them into pg_trgm-style similarity.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, array] = {}
+        self._gram_counts = array("I")  # trigrams per key
+        self._docs: List[Optional[dict]] = []
+        self._texts: List[tuple] = []  # normalized search fields per slot
+        self._slots: Dict[uuid.UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, employee: dict) -> None:
+        with self._lock:
+            self._remove(employee["id"])
+            slot = len(self._docs)
+            self._docs.append(employee)
+            self._texts.append(tuple(normalize(employee.get(field)) for field in SEARCH_FIELDS))
+            self._slots[employee["id"]] = slot
+            for field_index, field in enumerate(SEARCH_FIELDS):
+                key = slot * len(SEARCH_FIELDS) + field_index
+                grams = trigrams(employee.get(field))
+                self._gram_counts.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, array("I")).append(key)
+
+    def remove(self, employee_id: uuid.UUID) -> None:
+        with self._lock:
+            self._remove(employee_id)
+
+    def _remove(self, employee_id: uuid.UUID) -> None:
+        # The slot stays in the postings but is skipped; a reload compacts it
+        slot = self._slots.pop(employee_id, None)
+        if slot is not None:
+            self._docs[slot] = None
+
+    def search(self, query: str, limit: int = 20, active_only: bool = True) -> List[SearchHit]:
+        query = normalize(query)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            lists = [np.frombuffer(self._postings[g], dtype=np.uint32) for g in query_grams if g in self._postings]
+            if not lists:
+                return []
+            shared = np.bincount(np.concatenate(lists), minlength=len(self._gram_counts))
+            del lists
+            gram_counts = np.frombuffer(self._gram_counts, dtype=np.uint32).astype(np.float64)
+            similarity = shared / (len(query_grams) + gram_counts - shared)
+            fields = len(SEARCH_FIELDS)
+            doc_similarity = similarity.reshape(-1, fields).max(axis=1)
+            doc_shared = shared.reshape(-1, fields).max(axis=1)
+
+            # Prefix and exact matches share every trigram of the query except
+            # the trailing one of each word; everything else can only be fuzzy
+            words = max(len(_WORD.findall(query)), 1)
+            needed = max(len(query_grams) - words, 1)
+            prefix_like = doc_shared >= needed
+            hits = []
+            seen = set()
+
+            def collect(slots, stop_after_strong: bool):
+                strong = 0
+                for slot in slots:
+                    doc = self._docs[slot]
+                    if slot in seen or doc is None or (active_only and not doc["is_active"]):
+                        continue
+                    rank = _rank(*self._texts[slot], query)
+                    score = float(doc_similarity[slot])
+                    if rank == 0 and score < SIMILARITY_THRESHOLD:
+                        continue
+                    seen.add(slot)
+                    hits.append((rank, score, doc))
+                    strong += rank >= 2
+                    if stop_after_strong and strong >= limit:
+                        return
+
+            # Best similarity first; exact codes have similarity 1.0, so once
+            # `limit` prefix-or-better hits are found nothing later outranks them
+            candidates = np.flatnonzero(prefix_like)
+            collect(candidates[np.argsort(-doc_similarity[candidates], kind="stable")].tolist(), True)
+
+            # Substrings inside a word ("nathan" in "johnathan") need not share
+            # enough trigrams, or any for short queries: scan the fields for them
+            if len(hits) < limit:
+                collect([
+                    slot for slot, texts in enumerate(self._texts)
+                    if slot not in seen and any(query in text for text in texts)
+                ], False)
+
+            if len(hits) < limit:
+                fuzzy = np.flatnonzero(~prefix_like & (doc_similarity >= SIMILARITY_THRESHOLD))
+                wanted = min(len(fuzzy), 2 * limit)
+                if wanted:
+                    top = fuzzy[np.argpartition(-doc_similarity[fuzzy], wanted - 1)[:wanted]]
+                    collect(top.tolist(), False)
+
+        hits.sort(key=lambda hit: (-hit[0], -hit[1], hit[2]["employee_code"]))
+        return [SearchHit(**hit[2], score=round(hit[1], 3)) for hit in hits[:limit]]
+
+
+class EmployeeSearch:
+    """Dispatches to pg_trgm on PostgreSQL and to the in-memory index elsewhere"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[NGramIndex] = None
+
+    # ---- In-memory index -----------------------------------------------
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def index(self, db: Session) -> NGramIndex:
+        with self._lock:
+            if self._index is None:
+                index = NGramIndex()
+                rows = db.execute(select(
+                    Employee.id, Employee.employee_code, Employee.full_name, Employee.email,
+                    Employee.department_id, Employee.position, Employee.is_active,
+                )).mappings().all()
+                for row in rows:
+                    index.add(dict(row))
+                self._index = index
+            return self._index
+
+    def employee_changed(self, employee: Employee) -> None:
+        """Reindex one employee after a create or update, if the index is built"""
+        index = self._index
+        if index is not None:
+            index.add({
+                "id": employee.id,
+                "employee_code": employee.employee_code,
+                "full_name": employee.full_name,
+                "email": employee.email,
+                "department_id": employee.department_id,
+                "position": employee.position,
+                "is_active": employee.is_active,
+            })
+
+    def employee_removed(self, employee_id: uuid.UUID) -> None:
+        index = self._index
+        if index is not None:
+            index.remove(employee_id)
+
+    # ---- Query ---------------------------------------------------------
+
+    def search(self, db: Session, query: str, limit: int = 20, active_only: bool = True) -> List[SearchHit]:
+        if not normalize(query):
+            return []
+        if db.get_bind().dialect.name == "postgresql":
+            return self._search_postgres(db, query, limit, active_only)
+        return self.index(db).search(query, limit, active_only)
+
+    def _search_postgres(self, db: Session, query: str, limit: int, active_only: bool) -> List[SearchHit]:
+        q = normalize(query)
+        pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        code, name, email = (func.lower(getattr(Employee, field)) for field in SEARCH_FIELDS)
+
+        score = func.greatest(func.similarity(code, q), func.similarity(name, q), func.similarity(email, q))
+        prefix = or_(
+            code.like(f"{pattern}%", escape="\\"),
+            name.like(f"{pattern}%", escape="\\"),
+            name.like(f"% {pattern}%", escape="\\"),
+            email.like(f"{pattern}%", escape="\\"),
+        )
+        contains = or_(
+            code.like(f"%{pattern}%", escape="\\"),
+            name.like(f"%{pattern}%", escape="\\"),
+            email.like(f"%{pattern}%", escape="\\"),
+        )
+        rank = case((code == q, 3), (prefix, 2), (contains, 1), else_=0)
+
+        statement = select(
+            Employee.id, Employee.employee_code, Employee.full_name, Employee.email,
+            Employee.department_id, Employee.position, Employee.is_active, score.label("score"),
+        ).where(or_(contains, code.op("%")(q), name.op("%")(q), email.op("%")(q)))
+        if active_only:
+            statement = statement.where(Employee.is_active == True)
+        statement = statement.order_by(rank.desc(), score.desc(), Employee.employee_code).limit(limit)
+
+        return [
+            SearchHit(**{**row, "score": round(float(row["score"] or 0), 3)})
+            for row in db.execute(statement).mappings().all()
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_employee_search() -> EmployeeSearch:
+    search = EmployeeSearch()
+    # This process reindexes its own changes in place (employee_changed/removed)
+    get_invalidation_bus().subscribe(SEARCH, lambda events: search.invalidate(), local=False)
+    return search
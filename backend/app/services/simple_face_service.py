@@ -4,52 +4,93 @@ A lightweight face recognition service that doesn't rely on complex dependencies
 """
 
 import numpy as np
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Tuple, Union
 import base64
 from io import BytesIO
 from PIL import Image
 import hashlib
 import json
 
+from app.core.config import settings
+from app.core.invalidation import GALLERY, get_invalidation_bus
+from app.core.profiling import profile_stage
+from app.services.face_detection import FaceBox, get_face_detector, primary_face
+from app.services.gallery_snapshot import get_gallery_store
+
 
 class SimpleFaceService:
     """Simple face recognition service using basic image features"""
     
+    feature_size = 64
+    match_threshold = 0.5  # Minimum cosine similarity for a match
+    
     def __init__(self):
         """Initialize simple face service"""
+        # (employee ids, L2-normalized float32 encodings matrix), loaded lazily
+        self._gallery = None
+        # Snapshot generation the cached gallery belongs to, and its mapping
+        self._generation = None
+        self._mapped = None
         print("✅ SimpleFaceService initialized")
     
-    def encode_face(self, image_data: str) -> Optional[List[float]]:
-        """Extract simple face features from base64 image"""
+    def encode_face(self, image_data: Union[str, bytes]) -> Optional[List[float]]:
+        """Extract simple face features from a base64 image or raw image bytes"""
         try:
-            # Convert base64 to image
-            image = self._decode_base64_image(image_data)
+            # Convert base64 / bytes to image
+            with profile_stage("face.decode"):
+                if isinstance(image_data, bytes):
+                    image = self._decode_image_bytes(image_data)
+                else:
+                    image = self._decode_base64_image(image_data)
             if image is None:
                 return None
             
+            image = self._face_region(image)
+            
             # Create a simple feature vector based on image characteristics
-            features = self._extract_simple_features(image)
+            with profile_stage("face.features"):
+                features = self._extract_simple_features(image)
             return features
                 
         except Exception as e:
             print(f"Error encoding face: {e}")
             return None
     
-    def identify_face(self, image_data: str, db=None) -> Optional[str]:
+    def detect_faces(self, image_data: Union[str, bytes]) -> Optional[Tuple[Tuple[int, int], List[FaceBox]]]:
+        """Frame (width, height) and the face boxes found in it, or None for an undecodable image"""
+        if isinstance(image_data, bytes):
+            image = self._decode_image_bytes(image_data)
+        else:
+            image = self._decode_base64_image(image_data)
+        if image is None:
+            return None
+        with profile_stage("face.detect"):
+            faces = get_face_detector().detect(image)
+        return (image.shape[1], image.shape[0]), faces
+    
+    def _face_region(self, image: np.ndarray) -> np.ndarray:
+        """Crop to the primary face when FACE_ROI_ENABLED; the whole frame when none is found"""
+        if not settings.FACE_ROI_ENABLED:
+            return image
+        with profile_stage("face.detect"):
+            face = primary_face(get_face_detector().detect(image))
+        if face is None:
+            return image
+        return image[face.y:face.y + face.height, face.x:face.x + face.width]
+    
+    def identify_face(self, image_data: Union[str, bytes], db=None) -> Optional[str]:
         """Identify face by comparing with stored features"""
         try:
-            if db is None:
-                print("Database session not provided")
-                return None
-            
-            # Load employees with face encodings
-            from app.models.employee import Employee
-            employees = db.query(Employee).filter(
-                Employee.face_encoding.isnot(None),
-                Employee.is_active == True
-            ).all()
+            gallery = self._current_gallery()
+            if gallery is None:
+                if db is None:
+                    print("Database session not provided")
+                    return None
+                gallery = self.load_gallery(db)
             
-            if not employees:
+            gallery_ids, gallery_matrix = gallery
+            if not gallery_ids:
                 print("No employees with face encodings found")
                 return None
             
@@ -59,31 +100,17 @@ class SimpleFaceService:
                 print("Could not encode input face")
                 return None
             
-            input_features = np.array(input_features)
-            
-            # Compare with known faces
-            best_match_id = None
-            best_similarity = 0.5  # Minimum similarity threshold
-            
-            for employee in employees:
-                if employee.face_encoding:
-                    try:
-                        employee_features = np.array(employee.face_encoding)
-                        
-                        # Calculate similarity
-                        similarity = self._calculate_similarity(input_features, employee_features)
-                        
-                        print(f"Similarity with employee {employee.id}: {similarity:.3f}")
-                        
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_match_id = str(employee.id)
-                            
-                    except Exception as e:
-                        print(f"Error comparing with employee {employee.id}: {e}")
-                        continue
-            
-            if best_match_id:
+            input_features = np.array(input_features, dtype=np.float32)
+            
+            # Compare with all known faces at once (gallery rows are pre-normalized)
+            with profile_stage("face.matching"):
+                input_norm = input_features / (np.linalg.norm(input_features) + 1e-7)
+                similarities = gallery_matrix @ input_norm
+                best_index = int(np.argmax(similarities))
+                best_similarity = float(similarities[best_index])
+            
+            if best_similarity > self.match_threshold:
+                best_match_id = gallery_ids[best_index]
                 print(f"✅ Face recognized as employee {best_match_id} with similarity {best_similarity:.3f}")
                 return best_match_id
             
@@ -94,6 +121,116 @@ class SimpleFaceService:
             print(f"Error identifying face: {e}")
             return None
     
+    @property
+    def gallery_loaded(self) -> bool:
+        """Whether the face gallery is cached in memory"""
+        return self._gallery is not None
+    
+    def _snapshot_store(self):
+        return get_gallery_store() if settings.FACE_GALLERY_SNAPSHOT_ENABLED else None
+    
+    def _current_gallery(self):
+        """The cached gallery if it is still current, remapping a newer snapshot when one was published"""
+        store = self._snapshot_store()
+        if store is None:
+            return self._gallery
+        generation = store.generation()
+        if self._gallery is not None and self._generation == generation:
+            return self._gallery
+        mapped = store.load()
+        if mapped is None or mapped.generation != generation:
+            return None
+        self._use_mapped(mapped)
+        return self._gallery
+    
+    def _use_mapped(self, mapped) -> None:
+        # Keep the mapping referenced for as long as its matrix view is in use
+        self._mapped = mapped
+        self._generation = mapped.generation
+        self._gallery = (mapped.ids, mapped.matrix)
+    
+    def load_gallery(self, db):
+        """Load face encodings of active employees into a normalized matrix"""
+        generation = self._snapshot_generation()
+        with profile_stage("face.gallery_query"):
+            rows = db.execute(self._gallery_query()).all()
+        return self._set_gallery(rows, generation)
+    
+    async def load_gallery_async(self, db):
+        """Same as load_gallery, for an AsyncSession"""
+        generation = self._snapshot_generation()
+        with profile_stage("face.gallery_query"):
+            rows = (await db.execute(self._gallery_query())).all()
+        return self._set_gallery(rows, generation)
+    
+    def ensure_gallery(self, db):
+        """Map the shared snapshot, or load the gallery from the database if there is no current one"""
+        gallery = self._current_gallery()
+        if gallery is None:
+            gallery = self.load_gallery(db)
+        return gallery
+    
+    async def ensure_gallery_async(self, db):
+        """Same as ensure_gallery, for an AsyncSession"""
+        gallery = self._current_gallery()
+        if gallery is None:
+            gallery = await self.load_gallery_async(db)
+        return gallery
+    
+    def _snapshot_generation(self):
+        # Read before querying: an invalidation during the query leaves the result stale, not current
+        store = self._snapshot_store()
+        return store.generation() if store is not None else None
+    
+    def _gallery_query(self):
+        from sqlalchemy import select
+        from app.models.employee import Employee
+        return select(Employee.id, Employee.face_encoding).where(
+            Employee.face_encoding.isnot(None),
+            Employee.is_active == True
+        )
+    
+    def _set_gallery(self, rows, generation=None):
+        gallery_ids = []
+        vectors = []
+        for employee_id, face_encoding in rows:
+            if not face_encoding or len(face_encoding) != self.feature_size:
+                continue
+            gallery_ids.append(str(employee_id))
+            vectors.append(face_encoding)
+        
+        matrix = np.array(vectors, dtype=np.float32).reshape(len(vectors), self.feature_size)
+        matrix /= (np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-7)
+        print(f"Face gallery loaded with {len(gallery_ids)} employees")
+        
+        store = self._snapshot_store()
+        if store is not None and generation is not None:
+            # Publish for the other workers, then serve from the shared mapping instead of a private copy
+            try:
+                store.publish(generation, gallery_ids, matrix)
+                mapped = store.load()
+                if mapped is not None and mapped.generation == generation:
+                    self._use_mapped(mapped)
+                    return self._gallery
+            except OSError as e:
+                print(f"Error publishing face gallery snapshot: {e}")
+        
+        # Swap in a single assignment so concurrent readers never see a partial gallery
+        self._mapped = None
+        self._generation = generation
+        self._gallery = (gallery_ids, matrix)
+        return self._gallery
+    
+    def invalidate_gallery(self, token: str = "") -> None:
+        """Drop the cached gallery in every worker on this host; it is reloaded on the next identification"""
+        self._gallery = None
+        store = self._snapshot_store()
+        if store is not None:
+            try:
+                store.bump(token)
+            except OSError as e:
+                print(f"Error invalidating face gallery snapshot: {e}")
+    
     def _extract_simple_features(self, image: np.ndarray) -> List[float]:
         """Extract simple features from image"""
         try:
@@ -207,7 +344,14 @@ class SimpleFaceService:
                 img_data = base64.b64decode(base64_string.split(',')[1])
             else:
                 img_data = base64.b64decode(base64_string)
-            
+        except Exception as e:
+            print(f"Error decoding base64 image: {e}")
+            return None
+        return self._decode_image_bytes(img_data)
+    
+    def _decode_image_bytes(self, img_data: bytes) -> Optional[np.ndarray]:
+        """Convert encoded image bytes to an RGB numpy array"""
+        try:
             img = Image.open(BytesIO(img_data))
             
             # Convert to RGB if needed
@@ -217,9 +361,17 @@ class SimpleFaceService:
             return np.array(img)
             
         except Exception as e:
-            print(f"Error decoding base64 image: {e}")
+            print(f"Error decoding image: {e}")
             return None
 
 
 # Create an alias for compatibility
-InsightFaceService = SimpleFaceService
\ No newline at end of file
+InsightFaceService = SimpleFaceService
+
+
+@lru_cache(maxsize=None)
+def get_face_service() -> SimpleFaceService:
+    """Shared face service, constructed on first use (FastAPI dependency)"""
+    service = SimpleFaceService()
+    get_invalidation_bus().subscribe(GALLERY, lambda events: service.invalidate_gallery(events[-1].id))
+    return service
@@ -0,0 +1,392 @@
+"""
+Attendance from fixed-mount camera streams.
+
+Entrance cameras send a continuous stream instead of one frame per button
+press. Recognizing every frame would spend the CPU on empty corridors and
+on dozens of near-identical frames per person, so the worker
+
+  1. decodes each frame at STREAM_ANALYSIS_WIDTH only (JPEG frames are
+     decoded at reduced DCT scale, so the full frame is never decoded);
+  2. compares it with a running background to detect motion;
+  3. during a motion event keeps the sharpest frame of the moving region
+     (variance of the Laplacian);
+  4. when the event ends, submits that one frame through the offline sync
+     service, which recognizes it and applies the check-in/check-out rules.
+
+Submissions reuse AttendanceSyncService with the camera as the device and
+the event start as the idempotency key, so a submission retried after a
+lost database connection is not applied twice.
+
+MJPEG over HTTP and MJPEG files (concatenated JPEGs, the test stand-in) are
+read without extra dependencies. RTSP streams, video files and local
+capture devices need opencv-python.
+"""
+
+import asyncio
+import os
+import time
+import urllib.request
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.frame_quality import laplacian_variance, small_gray
+
+MJPEG_SUFFIXES = (".mjpg", ".mjpeg")
+JPEG_START = b"\xff\xd8"
+JPEG_END = b"\xff\xd9"
+MAX_JPEG_SIZE = 16 * 1024 * 1024  # give up on a frame whose end marker never comes
+
+
+class StreamError(ValueError):
+    """The stream cannot be opened or read"""
+
+
+@dataclass
+class Frame:
+    index: int
+    time: datetime  # naive local time, like kiosk timestamps
+    jpeg: Optional[bytes] = None  # MJPEG sources: the frame as received
+    pixels: Optional[np.ndarray] = None  # OpenCV sources: decoded BGR frame
+
+    def encoded(self) -> bytes:
+        """JPEG bytes for recognition (OpenCV frames are encoded only when selected)"""
+        if self.jpeg is not None:
+            return self.jpeg
+        cv2 = _require_cv2()
+        ok, buffer = cv2.imencode(".jpg", self.pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise StreamError(f"Could not encode frame {self.index}")
+        return buffer.tobytes()
+
+
+@dataclass
+class Selection:
+    """The frame chosen to represent one motion event"""
+    frame: Frame
+    sharpness: float
+    event: int
+    started: datetime
+    frames: int  # frames in the event
+
+
+def _require_cv2():
+    try:
+        import cv2
+    except ImportError:
+        raise StreamError("opencv-python is required for RTSP streams, video files and capture devices")
+    return cv2
+
+
+# ---- Sources --------------------------------------------------------------
+
+def iter_jpegs(read: Callable[[int], bytes], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Split a byte stream into JPEG images by their start/end markers (MJPEG multipart or file)"""
+    buffer = bytearray()
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        while True:
+            start = buffer.find(JPEG_START)
+            if start < 0:
+                del buffer[:-1]  # keep a possible first marker byte
+                break
+            end = buffer.find(JPEG_END, start + 2)
+            if end < 0:
+                if len(buffer) - start > MAX_JPEG_SIZE:
+                    del buffer[:start + 2]
+                else:
+                    del buffer[:start]
+                break
+            yield bytes(buffer[start:end + 2])
+            del buffer[:end + 2]
+
+
+def _mjpeg_frames(stream, fps: float) -> Iterator[Frame]:
+    from app.services.attendance_service import local_now
+
+    # Files get evenly spaced times from now; live streams the time a frame arrived
+    started = local_now()
+    for index, jpeg in enumerate(iter_jpegs(stream.read)):
+        moment = started + timedelta(seconds=index / fps) if fps > 0 else local_now()
+        yield Frame(index, moment, jpeg=jpeg)
+
+
+def _opencv_frames(source: str, live: bool) -> Iterator[Frame]:
+    from app.services.attendance_service import local_now
+
+    cv2 = _require_cv2()
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise StreamError(f"Could not open {source}")
+    started = local_now()
+    try:
+        index = 0
+        while True:
+            ok, pixels = capture.read()
+            if not ok:
+                return
+            if live:
+                moment = local_now()
+            else:
+                moment = started + timedelta(milliseconds=capture.get(cv2.CAP_PROP_POS_MSEC))
+            yield Frame(index, moment, pixels=pixels)
+            index += 1
+    finally:
+        capture.release()
+
+
+def is_live(source: str) -> bool:
+    return source.isdigit() or "://" in source
+
+
+def open_source(source: str, fps: float = 10.0) -> Iterator[Frame]:
+    """
+    Frames of an MJPEG URL or file, or of anything OpenCV opens (RTSP URL,
+    video file, capture device number). fps spaces the frame times of
+    MJPEG files, which carry no timing.
+    """
+    if source.startswith(("http://", "https://")):
+        try:
+            response = urllib.request.urlopen(source, timeout=10)
+        except OSError as e:
+            raise StreamError(f"Could not open {source}: {e}")
+        with response:
+            yield from _mjpeg_frames(response, 0)
+    elif source.lower().endswith(MJPEG_SUFFIXES):
+        if not os.path.isfile(source):
+            raise StreamError(f"No such file: {source}")
+        with open(source, "rb") as stream:
+            yield from _mjpeg_frames(stream, fps)
+    else:
+        yield from _opencv_frames(source, is_live(source))
+
+
+# ---- Analysis -------------------------------------------------------------
+
+def analysis_gray(frame: Frame, width: int) -> np.ndarray:
+    """Grayscale float32 frame scaled to `width`"""
+    if frame.jpeg is not None:
+        return small_gray(frame.jpeg, width)
+    cv2 = _require_cv2()
+    height = max(1, round(width * frame.pixels.shape[0] / frame.pixels.shape[1]))
+    gray = cv2.cvtColor(frame.pixels, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class MotionFrameSelector:
+    """
+    Background-difference motion detection over analysis frames, yielding
+    the sharpest frame of each motion event.
+
+    The background is a running average updated only while nothing moves,
+    so a person standing still stays "in motion". An event longer than
+    STREAM_MOTION_MAX_FRAMES submits its best frame and then waits for the
+    scene to settle, absorbing it into the background meanwhile (someone
+    lingering, or a light switched on, does not produce a stream of events).
+    """
+
+    def __init__(self, pixel_delta: Optional[float] = None, min_area: Optional[float] = None,
+                 quiet_frames: Optional[int] = None, max_frames: Optional[int] = None,
+                 alpha: Optional[float] = None):
+        self.pixel_delta = settings.STREAM_MOTION_PIXEL_DELTA if pixel_delta is None else pixel_delta
+        self.min_area = settings.STREAM_MOTION_MIN_AREA if min_area is None else min_area
+        self.quiet_frames = settings.STREAM_MOTION_QUIET_FRAMES if quiet_frames is None else quiet_frames
+        self.max_frames = settings.STREAM_MOTION_MAX_FRAMES if max_frames is None else max_frames
+        self.alpha = settings.STREAM_BACKGROUND_ALPHA if alpha is None else alpha
+        self._background: Optional[np.ndarray] = None
+        self._events = 0
+        self._quiet = 0
+        self._holding = False
+        self._reset_event()
+
+    def _reset_event(self) -> None:
+        self._best: Optional[Frame] = None
+        self._best_sharpness = -1.0
+        self._started: Optional[datetime] = None
+        self._frames = 0
+
+    def feed(self, frame: Frame, gray: np.ndarray) -> Optional[Selection]:
+        """Account one frame; returns a Selection when a motion event ends"""
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.copy()
+            return None
+
+        changed = np.abs(gray - self._background) > self.pixel_delta
+        moving = float(changed.mean()) >= self.min_area
+
+        if self._holding:
+            self._background += self.alpha * (gray - self._background)
+            if not moving:
+                self._holding = False
+            return None
+
+        if not moving:
+            self._background += self.alpha * (gray - self._background)
+            if self._started is None:
+                return None
+            self._quiet += 1
+            self._frames += 1
+            return self._close() if self._quiet >= self.quiet_frames else None
+
+        if self._started is None:
+            self._events += 1
+            self._started = frame.time
+        self._quiet = 0
+        self._frames += 1
+        sharpness = laplacian_variance(self._moving_region(gray, changed))
+        if sharpness > self._best_sharpness:
+            self._best, self._best_sharpness = frame, sharpness
+        if self._frames >= self.max_frames:
+            self._holding = True
+            return self._close()
+        return None
+
+    def finish(self) -> Optional[Selection]:
+        """Close an event still open at the end of the stream"""
+        return self._close() if self._best is not None else None
+
+    def _close(self) -> Optional[Selection]:
+        selection = None
+        if self._best is not None:
+            selection = Selection(self._best, self._best_sharpness, self._events, self._started, self._frames)
+        self._quiet = 0
+        self._reset_event()
+        return selection
+
+    @staticmethod
+    def _moving_region(gray: np.ndarray, changed: np.ndarray) -> np.ndarray:
+        # Sharpness of the subject, not of the static background around it
+        rows = np.flatnonzero(changed.any(axis=1))
+        cols = np.flatnonzero(changed.any(axis=0))
+        region = gray[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        return region if region.shape[0] >= 3 and region.shape[1] >= 3 else gray
+
+
+def select_frames(frames: Iterable[Frame], selector: Optional[MotionFrameSelector] = None,
+                  width: Optional[int] = None, stats: Optional[Counter] = None) -> Iterator[Selection]:
+    """The sharpest frame of every motion event in `frames`"""
+    selector = selector or MotionFrameSelector()
+    width = width or settings.STREAM_ANALYSIS_WIDTH
+    stats = stats if stats is not None else Counter()
+    for frame in frames:
+        stats["frames"] += 1
+        try:
+            gray = analysis_gray(frame, width)
+        except (OSError, ValueError) as e:
+            stats["undecodable"] += 1
+            print(f"Skipping frame {frame.index}: {e}")
+            continue
+        selection = selector.feed(frame, gray)
+        if selection is not None:
+            stats["selected"] += 1
+            yield selection
+    selection = selector.finish()
+    if selection is not None:
+        stats["selected"] += 1
+        yield selection
+
+
+# ---- Worker ---------------------------------------------------------------
+
+class StreamAttendanceWorker:
+    """Reads one camera and applies `action` for every person it selects a frame of"""
+
+    def __init__(self, camera_id: str, action: str, face_service=None, file_service=None,
+                 sessionmaker=None, queue_size: int = 8):
+        if action not in ("check_in", "check_out"):
+            raise ValueError(f"Unknown action {action!r}")
+        self.device_id = f"stream:{camera_id}"[:100]
+        self.action = action
+        self.face_service = face_service
+        self.file_service = file_service
+        self.sessionmaker = sessionmaker
+        self.queue_size = queue_size
+        self.stats: Counter = Counter()
+
+    def _services(self):
+        # Imported late so the selector above can be used without a database
+        from app.core.database import get_async_sessionmaker
+        from app.services.file_service import FileService
+        from app.services.simple_face_service import get_face_service
+
+        self.face_service = self.face_service or get_face_service()
+        self.file_service = self.file_service or FileService()
+        self.sessionmaker = self.sessionmaker or get_async_sessionmaker()
+
+    async def submit(self, selection: Selection) -> dict:
+        """Recognize the selected frame and apply the check-in/check-out rules"""
+        from app.schemas.attendance import KioskSyncEvent
+        from app.services.attendance_service import AttendanceSyncService
+
+        event = KioskSyncEvent(
+            idempotency_key=selection.started.strftime("%Y%m%dT%H%M%S.%f"),
+            action=self.action,
+            timestamp=selection.frame.time.isoformat(),
+            image_data=selection.frame.encoded(),
+            device_info={"camera": self.device_id, "sharpness": round(selection.sharpness, 1)},
+        )
+        async with self.sessionmaker() as db:
+            service = AttendanceSyncService(db, self.face_service, self.file_service)
+            result = (await service.sync(self.device_id, [event]))[0]
+        self.stats["submitted"] += 1
+        self.stats[result["status"]] += 1
+        return result
+
+    async def run(self, frames: Iterable[Frame], on_result: Optional[Callable[[Selection, dict], None]] = None) -> None:
+        """
+        Select frames in a thread and submit them as they come. The reader
+        waits while queue_size selections are pending, so a slow database
+        slows reading down instead of dropping check-ins.
+        """
+        self._services()
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[Selection]]" = asyncio.Queue(self.queue_size)
+
+        def read() -> None:
+            try:
+                for selection in select_frames(frames, stats=self.stats):
+                    asyncio.run_coroutine_threadsafe(queue.put(selection), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+        reader = loop.run_in_executor(None, read)
+        while True:
+            selection = await queue.get()
+            if selection is None:
+                break
+            try:
+                result = await self.submit(selection)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Error submitting frame {selection.frame.index}: {e}")
+                continue
+            if on_result is not None:
+                on_result(selection, result)
+        await reader  # re-raises a read error
+
+    async def run_source(self, source: str, fps: float = 10.0, on_result=None, max_backoff: float = 30.0) -> None:
+        """Run until a file ends; reconnect to live sources with backoff"""
+        live = is_live(source)
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run(open_source(source, fps), on_result)
+                if not live:
+                    return
+                print(f"Stream {source} ended, reconnecting")
+            except (StreamError, OSError) as e:
+                if not live:
+                    raise
+                print(f"Stream {source} failed: {e}")
+            if time.monotonic() - started > max_backoff:
+                backoff = 1.0  # it ran for a while, so this is a fresh failure
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
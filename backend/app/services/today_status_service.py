@@ -0,0 +1,50 @@
+"""
+Cached counters for today's attendance summary.
+
+The dashboard polls /attendance/today-status from every open browser, and
+each poll counts active employees and today's records. The counters are
+kept until a check-in, check-out or employee change is published on the
+invalidation bus, or the day changes. Like the employee directory, an
+invalidation bumps a version, so a count that raced with a write is not
+installed.
+"""
+
+import threading
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+from app.core.invalidation import ATTENDANCE, get_invalidation_bus
+
+
+class TodayStatusCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._summary: Optional[dict] = None
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, day: date) -> Optional[dict]:
+        with self._lock:
+            return self._summary if self._day == day else None
+
+    def put(self, day: date, summary: dict, version: int) -> None:
+        with self._lock:
+            if self._version == version:
+                self._day, self._summary = day, summary
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._summary = None
+
+
+@lru_cache(maxsize=None)
+def get_today_status_cache() -> TodayStatusCache:
+    cache = TodayStatusCache()
+    get_invalidation_bus().subscribe(ATTENDANCE, lambda events: cache.invalidate())
+    return cache
@@ -0,0 +1,139 @@
+"""
+Rotating refresh tokens.
+
+A refresh token is "<row id>.<secret>". Only an HMAC-SHA256 of the secret,
+keyed with SECRET_KEY, is stored, so renewing an access token is a primary
+key lookup and one HMAC instead of a bcrypt verify. Every refresh marks the
+presented token used and issues its successor in the same family; presenting
+a used or revoked token again means it was copied, and the whole family is
+revoked so neither the thief nor the victim can continue with it.
+"""
+
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import secrets
+from typing import Optional, Tuple
+import uuid
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import RefreshToken, User
+
+
+class TokenError(ValueError):
+    """Refresh token missing, expired, revoked or reused"""
+
+
+def hash_secret(secret: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+
+def split_token(raw: str) -> Tuple[Optional[uuid.UUID], str]:
+    token_id, _, secret = (raw or "").partition(".")
+    try:
+        return uuid.UUID(token_id), secret
+    except ValueError:
+        return None, secret
+
+
+class RefreshTokenService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def issue(self, user: User, family_id: Optional[uuid.UUID] = None,
+              user_agent: Optional[str] = None, ip_address: Optional[str] = None) -> Tuple[RefreshToken, str]:
+        """Create a token for the user; without a family_id it starts a new session. The caller commits."""
+        secret = secrets.token_urlsafe(32)
+        token = RefreshToken(
+            id=uuid.uuid4(),
+            user_id=user.id,
+            family_id=family_id or uuid.uuid4(),
+            token_hash=hash_secret(secret),
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            user_agent=(user_agent or "")[:255] or None,
+            ip_address=ip_address,
+        )
+        self.db.add(token)
+        return token, f"{token.id}.{secret}"
+
+    def _lookup(self, raw: str) -> RefreshToken:
+        token_id, secret = split_token(raw)
+        token = self.db.get(RefreshToken, token_id) if token_id and secret else None
+        if token is None or not hmac.compare_digest(token.token_hash, hash_secret(secret)):
+            raise TokenError("Invalid refresh token")
+        return token
+
+    def rotate(self, raw: str, user_agent: Optional[str] = None,
+               ip_address: Optional[str] = None) -> Tuple[User, str]:
+        """Exchange a refresh token for its successor; returns the user and the new token"""
+        token = self._lookup(raw)
+        now = datetime.utcnow()
+
+        if token.revoked_at is not None and token.used_at is None:
+            raise TokenError("Refresh token revoked")
+        if token.used_at is not None:
+            self.revoke_family(token.family_id)
+            self.db.commit()
+            print(f"Refresh token reuse for user {token.user_id}; revoked family {token.family_id}")
+            raise TokenError("Refresh token reuse detected; please log in again")
+        if token.expires_at <= now:
+            raise TokenError("Refresh token expired")
+
+        user = self.db.get(User, token.user_id)
+        if user is None or not user.is_active or user.is_locked:
+            self.revoke_family(token.family_id)
+            self.db.commit()
+            raise TokenError("Invalid refresh token")
+
+        successor, new_raw = self.issue(user, token.family_id, user_agent, ip_address)
+        self.db.flush()
+
+        # Conditional update so two concurrent refreshes of the same token
+        # cannot both succeed; the loser is treated as reuse
+        claimed = self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == token.id, RefreshToken.used_at.is_(None), RefreshToken.revoked_at.is_(None))
+            .values(used_at=now, replaced_by_id=successor.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            self.db.rollback()
+            self.revoke_family(token.family_id)
+            self.db.commit()
+            raise TokenError("Refresh token reuse detected; please log in again")
+
+        self.db.commit()
+        return user, new_raw
+
+    def revoke(self, raw: str) -> None:
+        """Log out the session the token belongs to"""
+        token = self._lookup(raw)
+        self.revoke_family(token.family_id)
+        self.db.commit()
+
+    def revoke_family(self, family_id: uuid.UUID) -> int:
+        return self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    def revoke_user(self, user_id: uuid.UUID) -> int:
+        """Revoke every session of a user. The caller commits."""
+        return self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    def purge_expired(self, user_id: Optional[uuid.UUID] = None) -> int:
+        """Delete expired tokens; kept rows are only needed until expiry for reuse detection"""
+        statement = delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow())
+        if user_id is not None:
+            statement = statement.where(RefreshToken.user_id == user_id)
+        return self.db.execute(statement.execution_options(synchronize_session=False)).rowcount
@@ -0,0 +1,102 @@
+"""
+Admission control benchmark.
+
+Simulates shift change on one worker: a steady stream of check-ins (short
+queries) arrives while a burst of reporting requests (long queries, e.g.
+history exports) is running. Database connections are modelled as a
+semaphore of the pool size. Check-in latency is compared between
+
+- shared: every request takes a connection from one 10+20 pool, first come
+  first served (the behaviour without admission control)
+- admission: requests go through AdmissionController and take connections
+  from their class's pool partition, as with the default settings
+
+Usage (from backend/):
+    python -m benchmarks.admission --checkins 2000 --reports 60
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.admission import MUTATION, RECOGNITION, REPORTING, AdmissionController, AdmissionRejected
+from app.core.config import settings
+
+
+class Pool:
+    def __init__(self, size: int):
+        self.semaphore = asyncio.Semaphore(size)
+
+    async def query(self, seconds: float) -> None:
+        async with self.semaphore:
+            await asyncio.sleep(seconds)
+
+
+async def request(name, duration, pool, controller, latencies):
+    started = time.perf_counter()
+    try:
+        if controller is not None:
+            await controller.acquire(name)
+        try:
+            await pool.query(duration)
+        finally:
+            if controller is not None:
+                controller.release(name)
+    except AdmissionRejected:
+        latencies.setdefault(f"{name}_rejected", []).append(1)
+        return
+    latencies.setdefault(name, []).append(time.perf_counter() - started)
+
+
+async def run(args, use_admission: bool) -> dict:
+    shared = Pool(30)
+    if use_admission:
+        controller = AdmissionController(
+            settings.ADMISSION_MAX_CONCURRENT, settings.ADMISSION_LIMITS,
+            settings.ADMISSION_QUEUE_LIMITS, {name: 120.0 for name in settings.ADMISSION_LIMITS},
+        )
+        pools = {name: Pool(sum(settings.DB_POOL_PARTITIONS[name])) for name in settings.DB_POOL_PARTITIONS}
+    else:
+        controller, pools = None, {}
+
+    latencies = {}
+    tasks = []
+    # Reports first, so they already hold connections when check-ins arrive
+    for _ in range(args.reports):
+        tasks.append(asyncio.create_task(request(REPORTING, args.report_ms / 1000, pools.get(REPORTING, shared), controller, latencies)))
+    interval = 1 / args.rate
+    for index in range(args.checkins):
+        name = MUTATION if index % 10 == 9 else RECOGNITION
+        tasks.append(asyncio.create_task(request(name, args.checkin_ms / 1000, pools.get(name, shared), controller, latencies)))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def summarize(label: str, latencies: dict) -> None:
+    for name in (RECOGNITION, MUTATION, REPORTING):
+        values = np.array(latencies.get(name, [])) * 1000
+        if not len(values):
+            continue
+        p50, p99 = np.percentile(values, [50, 99])
+        rejected = len(latencies.get(f"{name}_rejected", []))
+        print(f"{label:>10} {name:<12} n={len(values):>5}  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  max {values.max():8.1f} ms  rejected {rejected}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkins", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=400.0, help="check-ins per second")
+    parser.add_argument("--checkin-ms", type=float, default=8.0)
+    parser.add_argument("--reports", type=int, default=60)
+    parser.add_argument("--report-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    for label, use_admission in (("shared", False), ("admission", True)):
+        summarize(label, asyncio.run(run(args, use_admission)))
+
+
+if __name__ == "__main__":
+    main()
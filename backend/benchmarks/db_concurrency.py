@@ -0,0 +1,191 @@
+"""
+Sync vs async database concurrency benchmark.
+
+Runs the same mix of attendance queries (the "already checked in today" probe
+and a history range scan) from many concurrent coroutines, once through the
+synchronous Session as the old `async def` handlers did, and once through an
+AsyncSession. A heartbeat task measures how long the event loop is stalled,
+which is what other requests on the same worker experience.
+
+Defaults to a SQLite file through aiosqlite as a stand-in; pass a Postgres URL
+to --database-url for a realistic run. SQLite answers in-process with no
+network wait, so it flatters raw sync throughput; the loop-lag column is the
+number to compare there. The benchmark creates, fills and finally drops
+its own bench_attendance_records table; it never touches attendance_records.
+
+Usage (from backend/):
+    python -m benchmarks.db_concurrency --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Float, MetaData, Table, Uuid, create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.database import to_async_url
+
+# Mirror of the attendance_records columns used by the hot queries, with
+# portable types so it can be created on the SQLite stand-in as well. A
+# table of its own, so pointing --database-url at a real database cannot
+# drop the attendance data.
+metadata = MetaData()
+attendance_records = Table(
+    "bench_attendance_records",
+    metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("employee_id", Uuid, nullable=False, index=True),
+    Column("check_in_time", DateTime, index=True),
+    Column("check_out_time", DateTime),
+    Column("work_hours", Float),
+)
+
+
+def seed(engine, employees: int, days: int) -> list:
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    employee_ids = [uuid.uuid4() for _ in range(employees)]
+    start = datetime(2024, 1, 1, 8, 0)
+    rows = []
+    for day in range(days):
+        for employee_id in employee_ids:
+            check_in = start + timedelta(days=day, minutes=random.randint(0, 60))
+            rows.append({
+                "id": uuid.uuid4(),
+                "employee_id": employee_id,
+                "check_in_time": check_in,
+                "check_out_time": check_in + timedelta(hours=8),
+                "work_hours": 8.0,
+            })
+    with engine.begin() as connection:
+        connection.execute(attendance_records.insert(), rows)
+    return employee_ids
+
+
+def queries(employee_id, day: datetime):
+    records = attendance_records.c
+    probe = select(records.id).where(
+        records.employee_id == employee_id,
+        records.check_in_time >= day,
+        records.check_in_time < day + timedelta(days=1),
+    ).limit(1)
+    history = select(func.count(records.id)).where(
+        records.check_in_time >= day - timedelta(days=7),
+        records.check_in_time < day,
+    )
+    return probe, history
+
+
+async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+    interval = 0.001
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - before - interval)
+
+
+def pool_options(concurrency: int, poolclass) -> dict:
+    # The same queue pool for both modes (aiosqlite would otherwise get a
+    # NullPool), sized so no request waits for a connection
+    return {"poolclass": poolclass, "pool_pre_ping": True, "pool_size": concurrency, "max_overflow": 0}
+
+
+async def run_mode(mode: str, sync_url: str, async_url: str, employee_ids, days, total, concurrency):
+    if mode == "sync":
+        engine = create_engine(sync_url, **pool_options(concurrency, QueuePool))
+        SessionLocal = sessionmaker(bind=engine)
+    else:
+        engine = create_async_engine(async_url, **pool_options(concurrency, AsyncAdaptedQueuePool))
+        SessionLocal = async_sessionmaker(engine)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request():
+        employee_id = random.choice(employee_ids)
+        day = datetime(2024, 1, 1) + timedelta(days=random.randint(7, days - 1))
+        probe, history = queries(employee_id, day)
+        async with semaphore:
+            start = time.perf_counter()
+            if mode == "sync":
+                # What the old handlers did: blocking calls inside a coroutine
+                with SessionLocal() as db:
+                    db.execute(probe).first()
+                    db.execute(history).scalar()
+            else:
+                async with SessionLocal() as db:
+                    (await db.execute(probe)).first()
+                    (await db.execute(history)).scalar()
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lags: list = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Sync SQLAlchemy URL (default: temporary SQLite file)")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.database_url:
+        sync_url = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        sync_url = f"sqlite:///{path}"
+    async_url = to_async_url(sync_url)
+
+    seed_engine = create_engine(sync_url)
+    employee_ids = seed(seed_engine, args.employees, args.days)
+    seed_engine.dispose()
+    print(f"Seeded {args.employees * args.days} attendance records")
+
+    try:
+        for mode in ("sync", "async"):
+            result = asyncio.run(run_mode(
+                mode, sync_url, async_url, employee_ids, args.days, args.requests, args.concurrency
+            ))
+            print(
+                f"{mode:<6} {result['throughput']:8.1f} req/s"
+                f"  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms"
+                f"  max loop lag {result['max_loop_lag_ms']:7.2f} ms"
+            )
+    finally:
+        cleanup_engine = create_engine(sync_url)
+        metadata.drop_all(cleanup_engine)
+        cleanup_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Employee search latency benchmark.
+
+Builds the in-memory trigram index used on SQLite from synthetic employees
+and times prefix, substring, exact-code and misspelled-name queries. With
+--database-url pointing at PostgreSQL (migrated to head, so the pg_trgm
+indexes exist) the same queries run through the SQL path against whatever
+employees are in that database.
+
+Usage (from backend/):
+    python -m benchmarks.employee_search --employees 100000
+    python -m benchmarks.employee_search --database-url postgresql://...
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from app.services.search_service import NGramIndex
+
+FIRST = ["Anan", "Somchai", "Nattapong", "Kanya", "Malee", "Preecha", "Suda", "Wichai", "Ratana", "Thanawat",
+         "John", "Maria", "David", "Linh", "Minh", "Hoa", "Tuan", "Sarah", "Kenji", "Aiko"]
+LAST = ["Srisuk", "Chaiyaporn", "Wongsawat", "Nguyen", "Tran", "Le", "Pham", "Smith", "Garcia", "Tanaka",
+        "Boonmee", "Rattanakul", "Suksawat", "Jones", "Kim", "Lee", "Park", "Sato", "Ito", "Yamamoto"]
+
+
+def synthetic_employees(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST) + rng.choice(["", "a", "on", "ian", "ski", "wat"])
+        yield {
+            "id": uuid.uuid4(),
+            "employee_code": f"EMP{i:06d}",
+            "full_name": f"{first} {last}",
+            "email": f"{first}.{last}{i}@example.com".lower(),
+            "department_id": None,
+            "position": None,
+            "is_active": rng.random() > 0.05,
+        }
+
+
+QUERIES = {
+    "exact code": ["EMP012345", "EMP099999", "EMP000042"],
+    "code prefix": ["EMP0123", "EMP0999"],
+    "name prefix": ["som", "nguy", "yamam", "kan"],
+    "full name": ["malee boonmee", "kenji tanaka"],
+    "misspelled": ["somchia", "wongsawar", "yamamato", "nattapog"],
+    "email": ["sarah.smith", "linh.tran1"],
+}
+
+
+def timed(search, queries, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            hits = search(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples, hits
+
+
+def report(search, repeat: int) -> None:
+    print(f"{'query kind':<14} {'p50 ms':>8} {'p99 ms':>8}  top hit")
+    for kind, queries in QUERIES.items():
+        samples, hits = timed(search, queries, repeat)
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        top = f"{hits[0].employee_code} {hits[0].full_name} ({hits[0].score})" if hits else "-"
+        print(f"{kind:<14} {statistics.median(samples):8.2f} {p99:8.2f}  {top}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", help="Run against PostgreSQL instead of the in-memory index")
+    args = parser.parse_args()
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+        from app.services.search_service import EmployeeSearch
+
+        search_service = EmployeeSearch()
+        with Session(create_engine(args.database_url)) as db:
+            report(lambda q: search_service.search(db, q, 20), args.repeat)
+        return
+
+    index = NGramIndex()
+    started = time.perf_counter()
+    for employee in synthetic_employees(args.employees):
+        index.add(employee)
+    print(f"indexed {len(index):,} employees in {time.perf_counter() - started:.2f} s")
+    report(lambda q: index.search(q, 20), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Face gallery memory and warm-start benchmark.
+
+Starts W worker processes that each get the gallery of N employees ready to
+match, either
+
+- private: building their own normalized matrix from the encodings rows
+  (what every worker did after reloading from the database), or
+- snapshot: mapping the shared memory-mapped snapshot,
+
+and reports per worker the time to become ready, the proportional set size
+it added (PSS from Linux /proc/self/smaps_rollup, shared pages divided
+among the processes mapping them) and the time of one identification
+matrix product. The database query itself is not included, so the private
+numbers understate the real cost.
+
+Usage (from backend/):
+    python -m benchmarks.face_gallery --employees 200000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.services.gallery_snapshot import GallerySnapshotStore
+
+FEATURE_SIZE = 64
+
+
+def pss_kb() -> int:
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def encoding_rows(employees: int):
+    rng = np.random.default_rng(0)
+    return [(str(uuid.uuid4()), encoding.tolist()) for encoding in rng.random((employees, FEATURE_SIZE))]
+
+
+def worker(mode: str, directory: str, employees: int, barrier, queue) -> None:
+    # Private workers get their rows before measuring, like a finished query result
+    rows = encoding_rows(employees) if mode == "private" else None
+    before = pss_kb()
+    started = time.perf_counter()
+    if mode == "snapshot":
+        mapped = GallerySnapshotStore(directory).load()
+        matrix = mapped.matrix
+    else:
+        matrix = np.array([encoding for _, encoding in rows], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-7
+    ready = time.perf_counter() - started
+
+    probe = np.random.default_rng(1).random(FEATURE_SIZE, dtype=np.float32)
+    started = time.perf_counter()
+    int(np.argmax(matrix @ probe))
+    match = time.perf_counter() - started
+
+    # Measure once every worker has touched the gallery, so shared pages are split between them
+    barrier.wait()
+    queue.put((ready * 1000, (pss_kb() - before) / 1024, match * 1000))
+    barrier.wait()
+
+
+def run(mode: str, directory: str, employees: int, workers: int):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, directory, employees, barrier, queue))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rows = encoding_rows(args.employees)
+    directory = tempfile.mkdtemp(prefix="gallery-bench-")
+
+    matrix = np.array([encoding for _, encoding in rows], dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-7
+    GallerySnapshotStore(directory).publish(1, [employee_id for employee_id, _ in rows], matrix)
+
+    print(f"{args.employees} employees, matrix {matrix.nbytes / 1e6:.1f} MB, {args.workers} workers")
+    for mode in ("private", "snapshot"):
+        results = np.array(run(mode, directory, args.employees, args.workers))
+        print(
+            f"{mode:>9}: ready {results[:, 0].mean():8.2f} ms  "
+            f"PSS +{results[:, 1].mean():7.1f} MB/worker  match {results[:, 2].mean():6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Response serialization benchmark.
+
+Serializes N synthetic rows shaped like the list endpoints' output and
+compares:
+
+- fastapi: per-row EmployeeListItem validation + jsonable_encoder +
+  json.dumps (FastAPI's default path for a response_model list)
+- encoder: plain dicts through jsonable_encoder + json.dumps (the default
+  JSONResponse path for endpoints without a response_model)
+- orjson: plain row dicts through FastJSONResponse's dumps
+
+then the size and time of compressing the orjson body with gzip and brotli.
+
+Usage (from backend/):
+    python -m benchmarks.json_serialization --rows 10000
+"""
+
+import argparse
+import gzip
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.core.responses import dumps
+from app.models.attendance import AttendanceStatus
+from app.schemas.employee import EmployeeListItem
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def employee_rows(count: int):
+    return [
+        {
+            "id": uuid.uuid4(),
+            "employee_code": f"E{index:06d}",
+            "full_name": f"Employee Number {index}",
+            "first_name": "Employee",
+            "last_name": f"Number {index}",
+            "email": f"employee{index}@example.com",
+            "phone": "+66 2 123 4567",
+            "department_id": uuid.uuid4(),
+            "position": "Operator",
+            "hire_date": date(2020, 1, 1) + timedelta(days=index % 1500),
+            "is_active": True,
+            "has_face": index % 3 != 0,
+        }
+        for index in range(count)
+    ]
+
+
+def attendance_rows(count: int):
+    start = datetime(2026, 10, 1, 8, 0)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "employee_id": uuid.uuid4(),
+            "employee_name": f"Employee Number {index}",
+            "check_in_time": start + timedelta(minutes=index),
+            "check_out_time": start + timedelta(minutes=index, hours=9),
+            "status": AttendanceStatus.ON_TIME,
+            "work_hours": 9.0,
+            "location": "13.7563,100.5018",
+        }
+        for index in range(count)
+    ]
+
+
+def best_of(function, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def stdlib_dumps(content) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    employees = employee_rows(args.rows)
+    attendance = attendance_rows(args.rows)
+
+    cases = {
+        "employees fastapi": lambda: stdlib_dumps(jsonable_encoder([EmployeeListItem(**row) for row in employees])),
+        "employees encoder": lambda: stdlib_dumps(jsonable_encoder(employees)),
+        "employees orjson": lambda: dumps(employees),
+        "attendance encoder": lambda: stdlib_dumps(jsonable_encoder(attendance)),
+        "attendance orjson": lambda: dumps(attendance),
+    }
+    print(f"{args.rows} rows, best of {args.runs}")
+    for label, function in cases.items():
+        print(f"{label:>20}: {best_of(function, args.runs):8.2f} ms")
+
+    body = dumps(attendance)
+    print(f"\nattendance body {len(body) / 1e6:.2f} MB")
+    gzip_level = settings.COMPRESSION_GZIP_LEVEL
+    gzipped = gzip.compress(body, compresslevel=gzip_level)
+    print(f"{'gzip ' + str(gzip_level):>20}: {best_of(lambda: gzip.compress(body, compresslevel=gzip_level), args.runs):8.2f} ms  {len(gzipped) / 1e3:8.1f} KB")
+    if brotli is not None:
+        quality = settings.COMPRESSION_BROTLI_QUALITY
+        compressed = brotli.compress(body, quality=quality)
+        print(f"{'brotli ' + str(quality):>20}: {best_of(lambda: brotli.compress(body, quality=quality), args.runs):8.2f} ms  {len(compressed) / 1e3:8.1f} KB")
+    else:
+        print("brotli not installed, skipping")
+
+
+if __name__ == "__main__":
+    main()
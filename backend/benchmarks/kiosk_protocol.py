@@ -0,0 +1,106 @@
+"""
+Kiosk request parsing benchmark.
+
+Builds a check-in body around a camera-sized JPEG and times getting from
+request bytes to raw image bytes:
+
+- json-dict: json.loads into Dict[str, Any], then base64-decode image_data
+  (what check-in did before the typed schema)
+- json-model: json.loads + KioskAttendanceRequest.model_validate +
+  image_bytes() (the JSON path of parse_kiosk_request)
+- msgpack: msgpack.unpackb + KioskAttendanceRequest.model_validate, image
+  already raw bytes
+
+Peak allocations per parse are measured with tracemalloc.
+
+Usage (from backend/):
+    python -m benchmarks.kiosk_protocol --width 1920 --height 1080 --runs 50
+"""
+
+import argparse
+import base64
+import io
+import json
+import time
+import tracemalloc
+
+import msgpack
+import numpy as np
+from PIL import Image
+
+from app.schemas.attendance import KioskAttendanceRequest
+
+
+def make_jpeg(width: int, height: int, quality: int) -> bytes:
+    rng = np.random.default_rng(3)
+    # Smooth gradient plus noise compresses roughly like a camera frame
+    y, x = np.mgrid[0:height, 0:width]
+    base = ((x / width * 200) + (y / height * 55))[..., None]
+    pixels = np.clip(base + rng.normal(0, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def fields():
+    return {
+        "location": "13.7563,100.5018",
+        "device_info": {"userAgent": "Mozilla/5.0 (Kiosk)", "platform": "Linux", "screenResolution": "1920x1080"},
+        "timestamp": "2026-10-19T08:01:02.345Z",
+    }
+
+
+def parse_json_dict(body: bytes) -> bytes:
+    data = json.loads(body)
+    image_data = data.get("image_data")
+    return base64.b64decode(image_data.split(",")[1] if "," in image_data else image_data)
+
+
+def parse_json_model(body: bytes) -> bytes:
+    return KioskAttendanceRequest.model_validate(json.loads(body)).image_bytes()
+
+
+def parse_msgpack(body: bytes) -> bytes:
+    return KioskAttendanceRequest.model_validate(msgpack.unpackb(body, raw=False)).image_bytes()
+
+
+def measure(parse, body: bytes, runs: int) -> dict:
+    parse(body)  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse(body)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = np.array(timings) * 1000
+    return {"p50": np.percentile(timings, 50), "p95": np.percentile(timings, 95), "peak_mb": peak / 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, default=92)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    jpeg = make_jpeg(args.width, args.height, args.quality)
+    json_body = json.dumps({"image_data": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode(), **fields()}).encode()
+    msgpack_body = msgpack.packb({"image_data": jpeg, **fields()}, use_bin_type=True)
+
+    assert parse_json_dict(json_body) == parse_json_model(json_body) == parse_msgpack(msgpack_body) == jpeg
+    print(f"image {len(jpeg) / 1e6:.2f} MB, JSON body {len(json_body) / 1e6:.2f} MB, msgpack body {len(msgpack_body) / 1e6:.2f} MB")
+    for label, parse, body in (
+        ("json-dict", parse_json_dict, json_body),
+        ("json-model", parse_json_model, json_body),
+        ("msgpack", parse_msgpack, msgpack_body),
+    ):
+        result = measure(parse, body, args.runs)
+        print(f"{label:>10}: p50 {result['p50']:7.3f} ms  p95 {result['p95']:7.3f} ms  peak {result['peak_mb']:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
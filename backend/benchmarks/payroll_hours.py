@@ -0,0 +1,211 @@
+"""
+Payroll hours calculation benchmark.
+
+Generates a month of synthetic check-in/out timestamps (day, evening and
+overnight shifts with breaks, some open records) and times the vectorized
+compute_payroll kernel against an equivalent per-record Python loop of the
+kind calculate_work_hours is. The loop is run on a sample and extrapolated.
+
+With --database-url it also times the whole PayrollService.recalculate_month
+(load, shift resolution, kernel and bulk write-back) on a scratch database
+migrated to head: it inserts BENCH- employees, their shifts and a month of
+records, refuses to run if that month already holds records, and deletes
+what it inserted afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.payroll_hours --employees 50000 --days 31
+    python -m benchmarks.payroll_hours --database-url postgresql://.../scratch --db-employees 5000
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.attendance import AttendanceRecord
+from app.models.employee import Employee
+from app.models.shift import EmployeeShift, WorkShift
+from app.services.payroll_service import DAY, PayrollService, ShiftTable, compute_payroll
+
+BENCH_PREFIX = "BENCH-"
+MONTH = (2024, 1)  # generate() lays the records out in January 2024
+
+# (start, end, break_start, break_end) in hours
+SHIFT_PATTERNS = [
+    (8, 17, 12, 13),
+    (14, 22, 18, 18.5),
+    (22, 6, 2, 2.5),
+]
+
+
+def generate(employees: int, days: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    pattern = rng.integers(0, len(SHIFT_PATTERNS), employees)
+    hours = np.array(SHIFT_PATTERNS, dtype=np.float64)[pattern] * 3600
+
+    shifts = ShiftTable.empty(employees)
+    shifts.start, shifts.end, shifts.break_start, shifts.break_end = hours.T.copy()
+    shifts.late_threshold[:] = 15 * 60
+    shifts.early_threshold[:] = 15 * 60
+    shifts.overtime_threshold[:] = 30 * 60
+
+    employee_index = np.repeat(np.arange(employees), days)
+    day = np.tile(np.arange(days), employees)
+    month_start = np.datetime64("2024-01-01", "s").astype(np.int64)
+    start = shifts.start[employee_index]
+    length = np.mod(shifts.end[employee_index] - start, DAY)
+
+    check_in = month_start + day * DAY + start + rng.normal(0, 15 * 60, day.size)
+    check_out = check_in + length + rng.normal(0, 40 * 60, day.size)
+    check_out[rng.random(day.size) < 0.01] = np.nan
+    return check_in, check_out, employee_index, shifts
+
+
+def scalar_reference(check_in, check_out, employee_index, shifts):
+    """The same rules applied one record at a time"""
+    results = []
+    for i in range(check_in.size):
+        e = employee_index[i]
+        start, end = shifts.start[e], shifts.end[e]
+        scheduled_in = (check_in[i] // DAY) * DAY + start
+        if end <= start and check_in[i] < scheduled_in - DAY / 2:
+            scheduled_in -= DAY
+        scheduled_out = scheduled_in + ((end - start) % DAY or DAY)
+        break_start = scheduled_in + (shifts.break_start[e] - start) % DAY
+        break_end = break_start + (shifts.break_end[e] - shifts.break_start[e]) % DAY
+        if np.isnan(check_out[i]):
+            results.append((None, 0.0, 0.0, 0.0))
+            continue
+        overlap = max(0.0, min(check_out[i], break_end) - max(check_in[i], break_start))
+        late = check_in[i] - scheduled_in
+        early = scheduled_out - check_out[i]
+        overtime = check_out[i] - scheduled_out
+        results.append((
+            round((check_out[i] - check_in[i] - overlap) / 3600, 2),
+            late if late > shifts.late_threshold[e] else 0.0,
+            early if early > shifts.early_threshold[e] else 0.0,
+            overtime if overtime >= shifts.overtime_threshold[e] else 0.0,
+        ))
+    return results
+
+
+def _time_of_day(seconds: float):
+    return (datetime.min + timedelta(seconds=float(seconds) % DAY)).time()
+
+
+def seed_database(db: Session, check_in, check_out, employee_index, shifts) -> None:
+    employee_ids = [uuid.uuid4() for _ in range(len(shifts.start))]
+    db.execute(insert(Employee), [
+        {"id": employee_id, "employee_code": f"{BENCH_PREFIX}{i}", "full_name": f"Bench {i}",
+         "email": f"bench{i}@bench.invalid", "is_active": True}
+        for i, employee_id in enumerate(employee_ids)
+    ])
+    shift_ids = {}
+    for i, pattern in enumerate(sorted({(s, e, bs, be) for s, e, bs, be in zip(
+            shifts.start, shifts.end, shifts.break_start, shifts.break_end)})):
+        shift_ids[pattern] = uuid.uuid4()
+        start, end, break_start, break_end = (_time_of_day(value) for value in pattern)
+        db.execute(insert(WorkShift).values(
+            id=shift_ids[pattern], shift_name=f"{BENCH_PREFIX}{i}", shift_code=f"{BENCH_PREFIX}{i}",
+            start_time=start, end_time=end, break_start=break_start, break_end=break_end,
+        ))
+    db.execute(insert(EmployeeShift), [
+        {"employee_id": employee_id, "effective_date": datetime(*MONTH, 1).date(), "is_active": True,
+         "is_primary": True, "shift_id": shift_ids[(shifts.start[i], shifts.end[i], shifts.break_start[i], shifts.break_end[i])]}
+        for i, employee_id in enumerate(employee_ids)
+    ])
+    epoch = datetime(1970, 1, 1)
+    rows = [
+        {"employee_id": employee_ids[e], "check_in_time": epoch + timedelta(seconds=round(cin)),
+         "check_out_time": None if np.isnan(cout) else epoch + timedelta(seconds=round(cout))}
+        for cin, cout, e in zip(check_in.tolist(), check_out.tolist(), employee_index.tolist())
+    ]
+    for offset in range(0, len(rows), 10000):
+        db.execute(insert(AttendanceRecord), rows[offset:offset + 10000])
+    db.commit()
+
+
+def remove_seeded(db: Session) -> None:
+    bench_employees = select(Employee.id).where(Employee.employee_code.like(f"{BENCH_PREFIX}%"))
+    db.execute(delete(AttendanceRecord).where(AttendanceRecord.employee_id.in_(bench_employees)))
+    db.execute(delete(EmployeeShift).where(EmployeeShift.employee_id.in_(bench_employees)))
+    db.execute(delete(WorkShift).where(WorkShift.shift_name.like(f"{BENCH_PREFIX}%")))
+    db.execute(delete(Employee).where(Employee.employee_code.like(f"{BENCH_PREFIX}%")))
+    db.commit()
+
+
+def end_to_end(database_url: str, employees: int, days: int) -> None:
+    """Time recalculate_month, as the admin endpoint runs it, on a scratch database"""
+    engine = create_engine(database_url)
+    start, end = datetime(*MONTH, 1), datetime(MONTH[0], MONTH[1] + 1, 1)
+    with Session(engine) as db:
+        existing = db.scalar(select(func.count()).select_from(AttendanceRecord).where(
+            AttendanceRecord.check_in_time >= start, AttendanceRecord.check_in_time < end))
+        if existing:
+            raise SystemExit(f"{start:%Y-%m} already has {existing} attendance records; use a scratch database")
+
+    check_in, check_out, employee_index, shifts = generate(employees, days)
+    print(f"\nrecalculate_month on {engine.url.get_backend_name()}: {check_in.size:,} records "
+          f"({employees:,} employees x {days} days)")
+    try:
+        with Session(engine) as db:
+            started = time.perf_counter()
+            seed_database(db, check_in, check_out, employee_index, shifts)
+            print(f"seeded in {time.perf_counter() - started:.1f} s")
+
+        with Session(engine) as db:
+            started = time.perf_counter()
+            result = PayrollService(db).recalculate_month(*MONTH)
+            elapsed = time.perf_counter() - started
+        print(f"recalculate_month: {elapsed:8.3f} s  ({result['records'] / elapsed:,.0f} records/s, "
+              f"load + kernel + write-back)")
+        print({key: value for key, value in result.items() if key != "total_work_hours"})
+    finally:
+        with Session(engine) as db:
+            remove_seeded(db)
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--sample", type=int, default=200000, help="Records run through the scalar loop")
+    parser.add_argument("--database-url", help="Scratch database (migrated to head) for the recalculate_month timing")
+    parser.add_argument("--db-employees", type=int, default=2000, help="Employees seeded for recalculate_month")
+    args = parser.parse_args()
+
+    check_in, check_out, employee_index, shifts = generate(args.employees, args.days)
+    records = check_in.size
+    print(f"{records:,} records ({args.employees:,} employees x {args.days} days)")
+
+    started = time.perf_counter()
+    results = compute_payroll(check_in, check_out, employee_index, shifts)
+    vectorized = time.perf_counter() - started
+
+    sample = min(args.sample, records)
+    started = time.perf_counter()
+    reference = scalar_reference(check_in[:sample], check_out[:sample], employee_index[:sample], shifts)
+    scalar = (time.perf_counter() - started) * records / sample
+
+    # Same answers on the sample
+    expected = np.array([np.nan if r[0] is None else r[0] for r in reference])
+    assert np.allclose(results["work_hours"][:sample], expected, equal_nan=True)
+
+    print(f"vectorized:  {vectorized:8.3f} s  ({records / vectorized:,.0f} records/s)")
+    print(f"scalar loop: {scalar:8.3f} s  (extrapolated from {sample:,} records)")
+    print(f"speed-up:    {scalar / vectorized:8.1f}x")
+    print(f"late: {np.count_nonzero(results['late_minutes'])}, "
+          f"early leave: {np.count_nonzero(results['early_leave_minutes'])}, "
+          f"overtime: {np.count_nonzero(results['overtime_hours'])}")
+
+    if args.database_url:
+        end_to_end(args.database_url, args.db_employees, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Startup-time benchmark.
+
+Measures, each in a fresh interpreter:
+  * import time of app.main (module-level work such as service construction)
+  * time until the lifespan startup finishes and /health answers (liveness)
+  * time until /health/ready reports the face gallery warm (readiness)
+
+The lifespan phases need a reachable DATABASE_URL; they are skipped otherwise.
+
+Usage (from backend/):
+    python -m benchmarks.startup_time --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+LIFESPAN_SNIPPET = """
+import json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    live = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "live": live - start, "ready": ready - start}))
+"""
+
+
+def run_snippet(snippet: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return result.stdout.strip().splitlines()[-1]
+
+
+def summarize(name: str, samples) -> None:
+    samples_ms = [s * 1000 for s in samples]
+    print(
+        f"{name:<10} median {statistics.median(samples_ms):8.1f} ms"
+        f"  min {min(samples_ms):8.1f} ms  max {max(samples_ms):8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import_times = [float(run_snippet(IMPORT_SNIPPET)) for _ in range(args.runs)]
+    summarize("import", import_times)
+
+    try:
+        phases = [json.loads(run_snippet(LIFESPAN_SNIPPET)) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"Skipping lifespan phases (database unavailable?): {e}")
+        return
+    summarize("live", [p["live"] for p in phases])
+    summarize("ready", [p["ready"] for p in phases])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Export attendance for payroll as Parquet, Arrow IPC stream or gzipped CSV.
+
+Streams from a server-side cursor in chunks, so memory use stays flat no
+matter how long the date range is.
+
+Usage (from backend/):
+    python -m scripts.export_attendance --start 2024-01-01 --end 2024-01-31 \\
+        --format parquet --output attendance_2024_01.parquet \\
+        [--department ENG] [--columns employee_code,check_in_time,work_hours]
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from app.core.database import engine
+from app.services.export_service import AttendanceExporter, EXPORT_COLUMNS, EXPORT_FORMATS, ExportError
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=date.fromisoformat, required=True)
+    parser.add_argument("--end", type=date.fromisoformat, required=True)
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--department", help="Department code")
+    parser.add_argument("--columns", help=f"Comma-separated subset of: {', '.join(EXPORT_COLUMNS)}")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        exporter = AttendanceExporter(
+            engine,
+            args.start,
+            args.end,
+            department_code=args.department,
+            columns=args.columns.split(",") if args.columns else None,
+            chunk_size=args.chunk_size,
+        )
+        written = exporter.write_to(args.output, args.format)
+    except ExportError as e:
+        sys.exit(str(e))
+    print(f"Wrote {written} bytes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
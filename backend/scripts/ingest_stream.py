@@ -0,0 +1,76 @@
+"""
+Check employees in or out from a fixed camera stream.
+
+Reads an MJPEG URL or file, or (with opencv-python) an RTSP URL, video file
+or capture device, and submits the sharpest frame of every motion event for
+recognition (see app/services/stream_service.py). Entrance and exit cameras
+each run their own process with their --action.
+
+Usage (from backend/):
+    python -m scripts.ingest_stream http://camera-1/video.mjpg --camera-id entrance-1 --action check_in
+    python -m scripts.ingest_stream rtsp://camera-2/stream --camera-id exit-1 --action check_out
+    python -m scripts.ingest_stream recording.mjpeg --dry-run --save-dir selected/
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from app.services.stream_service import StreamAttendanceWorker, StreamError, open_source, select_frames
+
+
+def dry_run(args) -> Counter:
+    """Only select frames; print them and optionally save them"""
+    stats = Counter()
+    if args.save_dir:
+        os.makedirs(args.save_dir, exist_ok=True)
+    for selection in select_frames(open_source(args.source, args.fps), stats=stats):
+        print(
+            f"event {selection.event}: frame {selection.frame.index} at {selection.frame.time:%H:%M:%S.%f}, "
+            f"sharpness {selection.sharpness:.1f}, {selection.frames} frames"
+        )
+        if args.save_dir:
+            path = os.path.join(args.save_dir, f"event_{selection.event:05d}_frame_{selection.frame.index:06d}.jpg")
+            with open(path, "wb") as f:
+                f.write(selection.frame.encoded())
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="MJPEG URL or file, RTSP URL, video file or capture device number")
+    parser.add_argument("--camera-id", default="camera", help="Recorded as the device of the attendance events")
+    parser.add_argument("--action", choices=["check_in", "check_out"], default="check_in")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frame rate of MJPEG files (they carry no timing)")
+    parser.add_argument("--dry-run", action="store_true", help="Select frames without recognition or database writes")
+    parser.add_argument("--save-dir", help="With --dry-run, write the selected frames here")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        if args.dry_run:
+            stats = dry_run(args)
+        else:
+            worker = StreamAttendanceWorker(args.camera_id, args.action)
+
+            def report(selection, result):
+                name = result["employee_name"] or "-"
+                print(f"event {selection.event} at {selection.frame.time:%H:%M:%S}: {result['status']} {name}")
+
+            asyncio.run(worker.run_source(args.source, args.fps, on_result=report))
+            stats = worker.stats
+    except StreamError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        return
+
+    elapsed = time.perf_counter() - started
+    print(f"{elapsed:.1f}s: " + ", ".join(f"{key} {value}" for key, value in sorted(stats.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Maintain monthly partitions of attendance_records.
+
+Creates partitions ATTENDANCE_PARTITION_MONTHS_AHEAD months ahead and detaches
+partitions older than ATTENDANCE_PARTITION_RETAIN_MONTHS (0 keeps everything).
+Meant to be run from cron; the API also runs it once a day.
+
+Usage (from backend/):
+    python -m scripts.maintain_partitions [--months-ahead 3] [--retain-months 24] [--list]
+"""
+
+import argparse
+
+from app.core.database import engine
+from app.services.partition_service import PartitionService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int)
+    parser.add_argument("--retain-months", type=int)
+    parser.add_argument("--list", action="store_true", help="Only list attached partitions")
+    args = parser.parse_args()
+
+    service = PartitionService(engine)
+    if not service.is_partitioned():
+        print("attendance_records is not partitioned (run `alembic upgrade head` on PostgreSQL)")
+        return
+
+    if not args.list:
+        result = service.run_maintenance(args.months_ahead, args.retain_months)
+        if result["skipped"]:
+            print("Partition maintenance is already running elsewhere")
+        for name in result["created"]:
+            print(f"Created {name}")
+        for name in result["detached"]:
+            print(f"Detached {name}")
+
+    for partition in service.list_partitions():
+        print(f"{partition.name}  {partition.month.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Run the attendance retention policies once.
+
+Thumbnails old check-in/out photos, deletes expired thumbnails and moves old
+attendance records into compressed archive files (see
+app/services/retention_service.py for the policy settings).
+
+Usage (from backend/):
+    python -m scripts.run_retention
+    python -m scripts.run_retention --read-archive archive/attendance/2024-01/records_....npz
+"""
+
+import argparse
+
+from app.services.retention_service import RetentionService, read_archive
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--read-archive", metavar="PATH", help="Print the contents of an archive file instead")
+    args = parser.parse_args()
+
+    if args.read_archive:
+        columns = read_archive(args.read_archive)
+        rows = len(next(iter(columns.values()), []))
+        print(f"{rows} records, columns: {', '.join(columns)}")
+        for i in range(min(rows, 10)):
+            print({name: values[i].item() for name, values in columns.items()})
+        return
+
+    report = RetentionService().run()
+    for key, value in report.as_dict().items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
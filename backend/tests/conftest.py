@@ -0,0 +1,143 @@
+"""
+Test fixtures: the API against a SQLite database through aiosqlite.
+
+PostgreSQL-only column types are compiled as their closest SQLite
+equivalents, and face recognition is replaced by a fake that maps each
+test image to an employee, so the endpoints' own logic is what runs.
+"""
+
+import io
+import os
+import tempfile
+import uuid
+
+# Before the app is imported: settings are read once
+_scratch = tempfile.mkdtemp(prefix="attendance-tests-")
+os.environ.setdefault("INVALIDATION_BACKEND", "memory")
+os.environ.setdefault("FRAME_QUALITY_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("FACE_GALLERY_DIR", os.path.join(_scratch, "gallery"))
+
+import pytest
+from PIL import Image
+from sqlalchemy import ARRAY, create_engine
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+
+@compiles(PGUUID, "sqlite")
+def _compile_uuid(type_, compiler, **kw):
+    return "CHAR(36)"
+
+
+@compiles(ARRAY, "sqlite")
+def _compile_array(type_, compiler, **kw):
+    return "TEXT"
+
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.api.v1.attendance as attendance_api  # noqa: E402
+from app.api.v1.auth import create_access_token  # noqa: E402
+from app.core.database import Base, get_async_db, get_db  # noqa: E402
+from app.core.db_routing import get_read_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.employee import Employee  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.directory_service import get_employee_directory  # noqa: E402
+from app.services.simple_face_service import get_face_service  # noqa: E402
+from app.services.today_status_service import get_today_status_cache  # noqa: E402
+
+
+
+def jpeg(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeFaceService:
+    """Recognizes an image by the employee it was registered for"""
+
+    def __init__(self):
+        self.faces = {}
+
+    def register(self, employee_id: uuid.UUID, color) -> bytes:
+        image = jpeg(color)
+        self.faces[image] = str(employee_id)
+        return image
+
+    async def ensure_gallery_async(self, db):
+        return None
+
+    def identify_face(self, image_data, db=None):
+        return self.faces.get(image_data)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "attendance.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield sessionmaker(bind=engine), async_sessionmaker(async_engine, expire_on_commit=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def employees(database):
+    Session, _ = database
+    ids = [uuid.uuid4() for _ in range(3)]
+    with Session() as db:
+        for i, employee_id in enumerate(ids):
+            db.add(Employee(id=employee_id, employee_code=f"E{i:03d}", full_name=f"Employee {i}",
+                            email=f"e{i}@example.com", is_active=True))
+        db.commit()
+    return ids
+
+
+@pytest.fixture
+def face_service():
+    return FakeFaceService()
+
+
+@pytest.fixture
+def client(database, employees, face_service, tmp_path):
+    Session, AsyncSession = database
+
+    def sync_db():
+        with Session() as db:
+            yield db
+
+    async def async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = sync_db
+    app.dependency_overrides[get_read_db] = sync_db
+    app.dependency_overrides[get_async_db] = async_db
+    app.dependency_overrides[get_face_service] = lambda: face_service
+    attendance_api.file_service.upload_dir = str(tmp_path / "uploads")
+    get_employee_directory().invalidate()
+    get_today_status_cache().invalidate()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def bearer(username: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+@pytest.fixture
+def users(database, employees):
+    """An admin, and an employee account linked to the first employee"""
+    Session, _ = database
+    with Session() as db:
+        db.add(User(username="admin", email="admin@example.com", hashed_password="-", role=UserRole.ADMIN))
+        db.add(User(username="staff", email="staff@example.com", hashed_password="-",
+                    role=UserRole.EMPLOYEE, employee_id=employees[0]))
+        db.commit()
+    return {"admin": bearer("admin"), "staff": bearer("staff")}
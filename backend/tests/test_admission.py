@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission
+from app.core.admission import (
+    MUTATION, RECOGNITION, REPORTING, AdmissionController, AdmissionMiddleware, AdmissionRejected, classify,
+)
+
+TIMEOUTS = {RECOGNITION: 5.0, MUTATION: 5.0, REPORTING: 5.0}
+
+
+def controller(max_concurrent, limits=None, queue_limits=None, timeouts=None):
+    return AdmissionController(max_concurrent, limits or {}, queue_limits or {}, timeouts or TIMEOUTS)
+
+
+def test_routes_are_classified():
+    assert classify("POST", "/api/v1/attendance/check-in") == RECOGNITION
+    assert classify("GET", "/api/v1/attendance/history") == REPORTING
+    assert classify("POST", "/api/v1/attendance/history") == MUTATION
+    assert classify("PUT", "/api/v1/employees/E000") == MUTATION
+    assert classify("GET", "/health") is None
+
+
+def test_waiters_are_admitted_in_priority_order():
+    async def run():
+        scheduler = controller(1)
+        await scheduler.acquire(MUTATION)
+        admitted = []
+
+        async def request(name):
+            await scheduler.acquire(name)
+            admitted.append(name)
+
+        tasks = [asyncio.create_task(request(name)) for name in (REPORTING, MUTATION, RECOGNITION)]
+        await asyncio.sleep(0)
+        assert scheduler.queued == {RECOGNITION: 1, MUTATION: 1, REPORTING: 1}
+        holder = MUTATION
+        for expected in (RECOGNITION, MUTATION, REPORTING):
+            scheduler.release(holder)
+            await asyncio.sleep(0.01)
+            assert admitted[-1] == expected
+            holder = expected
+        await asyncio.gather(*tasks)
+        assert admitted == [RECOGNITION, MUTATION, REPORTING]
+
+    asyncio.run(run())
+
+
+def test_full_class_does_not_block_other_classes():
+    async def run():
+        scheduler = controller(4, limits={REPORTING: 1})
+        await scheduler.acquire(REPORTING)
+        report = asyncio.create_task(scheduler.acquire(REPORTING))
+        await asyncio.sleep(0)
+
+        # Reporting is at its own limit; a write still gets one of the shared slots
+        assert await scheduler.acquire(MUTATION) == 0.0
+        assert not report.done()
+        assert scheduler.in_flight == {RECOGNITION: 0, MUTATION: 1, REPORTING: 1}
+
+        scheduler.release(REPORTING)
+        await report
+        assert scheduler.in_flight[REPORTING] == 1
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_rejected_at_once():
+    async def run():
+        scheduler = controller(1, queue_limits={REPORTING: 0})
+        await scheduler.acquire(MUTATION)
+        with pytest.raises(AdmissionRejected):
+            await scheduler.acquire(REPORTING)
+        assert scheduler.stats[REPORTING].rejected == 1
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def busy_app(monkeypatch):
+    scheduler = controller(1, timeouts={MUTATION: 0.05})
+    scheduler.in_flight[MUTATION] = 1  # a request that never finishes holds the only slot
+    monkeypatch.setattr(admission, "get_admission_controller", lambda: scheduler)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+
+    @app.put("/api/v1/employees/E000")
+    def update():
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    return TestClient(app), scheduler
+
+
+def test_queue_timeout_answers_503_with_retry_after(busy_app):
+    client, scheduler = busy_app
+
+    response = client.put("/api/v1/employees/E000")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert scheduler.stats[MUTATION].timed_out == 1
+    # Exempt routes skip the queue entirely
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,113 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.invalidation import get_invalidation_bus
+from app.models.attendance import AttendanceRecord
+from app.services import attendance_service
+from app.services.attendance_service import local_now
+
+
+def body(image: bytes, timestamp=None) -> dict:
+    payload = {"image_data": base64.b64encode(image).decode()}
+    if timestamp is not None:
+        payload["timestamp"] = timestamp
+    return payload
+
+
+def stored_records(database):
+    Session, _ = database
+    with Session() as db:
+        return db.execute(select(AttendanceRecord).order_by(AttendanceRecord.check_in_time)).scalars().all()
+
+
+def test_check_in_stores_naive_local_time(client, database, employees, face_service):
+    image = face_service.register(employees[0], (200, 10, 10))
+
+    response = client.post("/api/v1/attendance/check-in", json=body(image, "2026-10-19T01:00:00Z"))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["check_in_time"] == "2026-10-19T08:00:00"
+    [record] = stored_records(database)
+    assert record.check_in_time == datetime(2026, 10, 19, 8, 0)
+    assert record.check_in_time.tzinfo is None
+
+
+def test_check_in_then_check_out_with_utc_timestamps(client, database, employees, face_service):
+    image = face_service.register(employees[0], (200, 10, 10))
+
+    check_in = client.post("/api/v1/attendance/check-in", json=body(image, "2026-10-19T01:00:00Z"))
+    check_out = client.post("/api/v1/attendance/check-out", json=body(image, "2026-10-19T10:30:00Z"))
+
+    assert check_in.status_code == 200, check_in.text
+    assert check_out.status_code == 200, check_out.text
+    assert check_out.json()["check_out_time"] == "2026-10-19T17:30:00"
+    assert check_out.json()["work_hours"] == 9.5
+    [record] = stored_records(database)
+    assert record.check_out_time == datetime(2026, 10, 19, 17, 30)
+
+
+def test_server_time_is_naive_local_time(client, database, employees, face_service):
+    image = face_service.register(employees[0], (200, 10, 10))
+
+    response = client.post("/api/v1/attendance/check-in", json=body(image))
+
+    assert response.status_code == 200, response.text
+    [record] = stored_records(database)
+    assert record.check_in_time.tzinfo is None
+    assert abs(record.check_in_time - local_now()) < timedelta(minutes=1)
+
+
+def test_invalid_timestamp_is_rejected(client, employees, face_service):
+    image = face_service.register(employees[0], (200, 10, 10))
+
+    response = client.post("/api/v1/attendance/check-in", json=body(image, "yesterday"))
+
+    assert response.status_code == 400
+
+
+def test_live_and_offline_sync_store_the_same_instant_alike(client, database, employees, face_service):
+    live = face_service.register(employees[0], (200, 10, 10))
+    offline = face_service.register(employees[1], (10, 200, 10))
+
+    client.post("/api/v1/attendance/check-in", json=body(live, "2026-10-19T01:00:00Z"))
+    response = client.post("/api/v1/attendance/sync", json={"device_id": "kiosk-1", "events": [{
+        **body(offline, "2026-10-19T01:00:00Z"), "idempotency_key": "k1", "action": "check_in",
+    }]})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["status"] == "checked_in"
+    times = {record.employee_id: record.check_in_time for record in stored_records(database)}
+    assert times[employees[0]] == times[employees[1]] == datetime(2026, 10, 19, 8, 0)
+
+
+def test_sync_announces_each_employee_once(client, employees, face_service, monkeypatch):
+    published = []
+    monkeypatch.setattr(get_invalidation_bus(), "publish", lambda *topics, **kwargs: published.append(kwargs))
+    image = face_service.register(employees[0], (200, 10, 10))
+    events = [
+        {**body(image, f"2026-10-19T0{hour}:00:00Z"), "idempotency_key": f"k{hour}", "action": action}
+        for hour, action in ((1, "check_in"), (2, "check_out"), (3, "check_in"))
+    ]
+
+    response = client.post("/api/v1/attendance/sync", json={"device_id": "kiosk-1", "events": events})
+
+    assert response.status_code == 200, response.text
+    assert published == [{"keys": [employees[0]]}]
+
+
+def test_large_sync_announces_the_whole_topic(client, employees, face_service, monkeypatch):
+    published = []
+    monkeypatch.setattr(get_invalidation_bus(), "publish", lambda *topics, **kwargs: published.append(kwargs))
+    monkeypatch.setattr(attendance_service, "INVALIDATION_MAX_KEYS", 1)
+    events = [
+        {**body(face_service.register(employee_id, (200, 10 + 100 * i, 10)), "2026-10-19T01:00:00Z"),
+         "idempotency_key": f"k{i}", "action": "check_in"}
+        for i, employee_id in enumerate(employees[:2])
+    ]
+
+    response = client.post("/api/v1/attendance/sync", json={"device_id": "kiosk-1", "events": events})
+
+    assert response.status_code == 200, response.text
+    assert published == [{"keys": ()}]
@@ -0,0 +1,57 @@
+import gzip
+import json
+import uuid
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware
+from app.core.responses import FastJSONResponse, dumps
+
+EXPORT = gzip.compress(b"employee_code,check_in_time\n" * 2000)
+
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/rows")
+    def rows():
+        return [{"id": uuid.UUID(int=i), "name": f"Employee {i}"} for i in range(500)]
+
+    @app.get("/export")
+    def export():
+        return Response(EXPORT, media_type="application/gzip")
+
+    return TestClient(app)
+
+
+def test_large_json_is_gzipped_with_its_compressed_length():
+    with make_client().stream("GET", "/rows", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(raw)
+    rows = json.loads(gzip.decompress(raw))
+    assert len(rows) == 500
+    assert rows[1] == {"id": str(uuid.UUID(int=1)), "name": "Employee 1"}
+    assert len(raw) < len(gzip.decompress(raw))
+
+
+def test_gzipped_export_passes_through_unchanged():
+    response = make_client().get("/export", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.content == EXPORT
+    assert int(response.headers["content-length"]) == len(EXPORT)
+
+
+def test_fast_json_renders_numpy_and_uuid_natively():
+    assert dumps({"id": uuid.UUID(int=1), "scores": np.array([0.5, 1.0])}) == (
+        b'{"id":"00000000-0000-0000-0000-000000000001","scores":[0.5,1.0]}'
+    )
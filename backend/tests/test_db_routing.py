@@ -0,0 +1,75 @@
+"""Read-replica routing: read-your-writes across workers and fallback to the primary"""
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from starlette.requests import Request
+
+import app.core.db_routing as db_routing
+from app.core.config import settings
+from app.core.db_routing import ReadYourWritesMiddleware, ReplicaRouter, RoutingSession, is_connection_error
+
+
+def request(headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "headers": raw, "client": ("10.0.0.1", 1234)})
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/replica.db"])
+    monkeypatch.setattr(db_routing, "get_replica_router", lambda: router)
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [router.replicas[0].url])
+    return router
+
+
+def test_last_write_marker_from_another_worker_pins_to_primary(router):
+    assert router.choose(request()) is router.replicas[0]
+    assert router.choose(request({"X-Last-Write": f"{time.time():.3f}"})) is None
+    assert router.choose(request({"Cookie": f"last_write={time.time():.3f}"})) is None
+    expired = time.time() - settings.READ_YOUR_WRITES_SECONDS - 1
+    assert router.choose(request({"X-Last-Write": f"{expired:.3f}"})) is router.replicas[0]
+    assert router.choose(request({"X-Last-Write": "garbage"})) is router.replicas[0]
+
+
+def test_middleware_hands_out_the_marker(router):
+    app = FastAPI()
+
+    @app.post("/items")
+    def create():
+        return {}
+
+    @app.get("/items")
+    def read():
+        return {}
+
+    client = TestClient(ReadYourWritesMiddleware(app))
+    assert "x-last-write" not in client.get("/items").headers
+    response = client.post("/items")
+    marker = float(response.headers["x-last-write"])
+    assert abs(marker - time.time()) < 5
+    assert client.cookies["last_write"] == response.headers["x-last-write"]
+
+
+def test_replica_connection_error_falls_back_to_primary(tmp_path, router):
+    primary = create_engine(f"sqlite:///{tmp_path}/primary.db")
+    unreachable = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+    router.replicas[0].engine = unreachable
+    router.replicas[0].checked_at = time.monotonic()
+
+    with RoutingSession(bind=primary, replica=unreachable, on_replica_error=router.replica_failed) as db:
+        assert db.scalar(text("SELECT 42")) == 42
+        assert db.replica is None
+    assert router.replicas[0].healthy is False
+    assert router.choose(request()) is None
+
+
+def test_only_connection_errors_count_as_replica_failures():
+    assert is_connection_error(OperationalError("SELECT 1", {}, Exception("server closed the connection")))
+    assert is_connection_error(ConnectionRefusedError())
+    assert not is_connection_error(ProgrammingError("SELECT x", {}, Exception("column x does not exist")))
+    assert not is_connection_error(ValueError())
@@ -0,0 +1,86 @@
+import uuid
+
+from app.models.employee import Employee
+from app.services.department_service import DepartmentService
+
+
+def create(client, users, code, parent_id=None):
+    response = client.post("/api/v1/departments/", headers=users["admin"], json={
+        "department_code": code, "department_name": f"Department {code}", "parent_department_id": parent_id,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def subtree(client, users, department_id):
+    response = client.get(f"/api/v1/departments/{department_id}/subtree", headers=users["admin"])
+    assert response.status_code == 200, response.text
+    return {node["department"]["department_code"]: node["depth"] for node in response.json()}
+
+
+def move(client, users, department_id, parent_id):
+    return client.put(f"/api/v1/departments/{department_id}", headers=users["admin"], json={"parent_department_id": parent_id})
+
+
+def test_moving_a_department_moves_its_subtree(client, users):
+    a = create(client, users, "A")
+    b = create(client, users, "B")
+    a1 = create(client, users, "A1", a)
+    create(client, users, "A1X", a1)
+
+    response = move(client, users, a1, b)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["department_level"] == 2
+    assert subtree(client, users, a) == {"A": 0}
+    assert subtree(client, users, b) == {"B": 0, "A1": 1, "A1X": 2}
+    assert client.get(f"/api/v1/departments/{a1}/subtree", headers=users["admin"]).json()[1]["department"]["department_level"] == 3
+
+
+def test_department_cannot_move_under_its_own_descendant(client, users):
+    a = create(client, users, "A")
+    a1 = create(client, users, "A1", a)
+    a1x = create(client, users, "A1X", a1)
+
+    response = move(client, users, a, a1x)
+
+    assert response.status_code == 400
+    assert subtree(client, users, a) == {"A": 0, "A1": 1, "A1X": 2}
+
+
+def test_duplicate_department_code_on_update_is_rejected(client, users):
+    create(client, users, "A")
+    b = create(client, users, "B")
+
+    response = client.put(f"/api/v1/departments/{b}", headers=users["admin"], json={"department_code": "A"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Department code already exists"
+
+
+def test_employee_count_rolls_up_the_subtree(client, database, users):
+    a = create(client, users, "A")
+    a1 = create(client, users, "A1", a)
+    b = create(client, users, "B")
+    Session, _ = database
+    with Session() as db:
+        for index, department_id in enumerate([a, a1, a1, b]):
+            db.add(Employee(employee_code=f"D{index}", full_name=f"Dept {index}", email=f"d{index}@example.com",
+                            department_id=uuid.UUID(department_id), is_active=True))
+            DepartmentService(db).employee_moved(None, False, uuid.UUID(department_id), True)
+        db.commit()
+
+    def totals():
+        response = client.get(f"/api/v1/departments/{a}/rollup", headers=users["admin"], params={"start_date": "2026-10-19"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return body["department"]["total_employees"], [child["total_employees"] for child in body["children"]]
+
+    assert totals() == (3, [2])
+
+    assert client.patch("/api/v1/employees/D1", headers=users["admin"], json={"is_active": False}).status_code == 200
+    assert client.patch("/api/v1/employees/D3", headers=users["admin"], json={"department_id": a1}).status_code == 200
+
+    assert totals() == (3, [2])
+    assert move(client, users, a1, b).status_code == 200
+    assert totals() == (1, [])
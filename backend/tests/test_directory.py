@@ -0,0 +1,53 @@
+import base64
+
+from app.services.directory_service import get_employee_directory
+
+
+def kiosk(client, action, image):
+    response = client.post(f"/api/v1/attendance/{action}", json={"image_data": base64.b64encode(image).decode()})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_employee_update_invalidates_the_directory(client, employees, face_service, users):
+    image = face_service.register(employees[0], (200, 10, 10))
+    directory = get_employee_directory()
+
+    assert kiosk(client, "check-in", image)["employee_name"] == "Employee 0"
+    assert directory.loaded
+
+    response = client.patch("/api/v1/employees/E000", headers=users["admin"], json={"full_name": "Renamed Employee"})
+    assert response.status_code == 200, response.text
+    assert not directory.loaded
+
+    assert kiosk(client, "check-out", image)["employee_name"] == "Renamed Employee"
+
+
+def test_department_rename_reaches_directory_entries(client, database, employees, users):
+    response = client.post("/api/v1/departments/", headers=users["admin"], json={"department_code": "OPS", "department_name": "Operations"})
+    department_id = response.json()["id"]
+    assert client.patch("/api/v1/employees/E001", headers=users["admin"], json={"department_id": department_id}).status_code == 200
+    Session, _ = database
+    directory = get_employee_directory()
+    with Session() as db:
+        assert directory.get(db, employees[1]).department_name == "Operations"
+
+        response = client.put(f"/api/v1/departments/{department_id}", headers=users["admin"], json={"department_name": "Field Operations"})
+        assert response.status_code == 200, response.text
+
+        assert directory.get(db, employees[1]).department_name == "Field Operations"
+
+
+def test_load_racing_an_invalidation_is_not_installed(database, employees):
+    Session, _ = database
+    directory = get_employee_directory()
+    directory.invalidate()
+    with Session() as db:
+        rows = db.execute(directory._query()).all()
+        version = directory.version
+        directory.invalidate()  # an employee changed while the rows were in flight
+        directory._install(rows, version)
+
+        assert not directory.loaded
+        assert directory.get(db, employees[0]).display_name == "Employee 0"
+        assert directory.loaded
@@ -0,0 +1,58 @@
+from app.models.employee import Employee
+
+
+def seed(database, count):
+    Session, _ = database
+    with Session() as db:
+        for i in range(count):
+            db.add(Employee(employee_code=f"K{i:03d}", full_name=f"Keyset {i}", email=f"k{i}@example.com", is_active=True))
+        db.commit()
+
+
+def test_cursor_pages_walk_every_employee_once(client, database, users):
+    seed(database, 6)
+    codes, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 4, "count": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/employees/", headers=users["admin"], params=params)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert "total" not in body
+        codes += [item["employee_code"] for item in body["items"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert codes == ["E000", "E001", "E002"] + [f"K{i:03d}" for i in range(6)]
+
+    offset_page = client.get("/api/v1/employees/", headers=users["admin"], params={"limit": 4, "page": 2}).json()
+    assert [item["employee_code"] for item in offset_page["items"]] == codes[4:8]
+    assert offset_page["total"] == 9
+    assert offset_page["pages"] == 3
+
+
+def test_invalid_cursor_is_rejected(client, users):
+    response = client.get("/api/v1/employees/", headers=users["admin"], params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+def test_fields_projects_the_list(client, users):
+    response = client.get("/api/v1/employees/", headers=users["admin"], params={"fields": "employee_code,full_name"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["items"][0] == {"employee_code": "E000", "full_name": "Employee 0"}
+
+
+def test_face_columns_only_on_request(client, users):
+    default = client.get("/api/v1/employees/", headers=users["admin"]).json()["items"][0]
+    assert "face_encoding" not in default and "face_images" not in default
+    assert default["has_face"] is False
+
+    unknown = client.get("/api/v1/employees/", headers=users["admin"], params={"fields": "employee_code,salary"})
+    assert unknown.status_code == 400
+    assert unknown.json()["detail"] == "Unknown fields: salary"
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.face_detection import FaceBox, FaceDetector, primary_face
+from app.services.simple_face_service import SimpleFaceService
+
+BACKGROUND = (120, 130, 150)
+SKIN = (224, 172, 140)
+SHADED_SKIN = (150, 110, 90)  # still skin chrominance, darker: the eye band
+
+
+def frame_with_face(cx=400, cy=240, width=120, height=156, size=(480, 640)):
+    image = np.empty(size + (3,), dtype=np.uint8)
+    image[:] = BACKGROUND
+    ys, xs = np.mgrid[:size[0], :size[1]]
+    inside = ((xs - cx) / (width / 2)) ** 2 + ((ys - cy) / (height / 2)) ** 2 <= 1
+    image[inside] = SKIN
+    top = cy - height // 2
+    eyes = inside & (ys >= top + height * 25 // 100) & (ys < top + height * 40 // 100)
+    image[eyes] = SHADED_SKIN
+    return image
+
+
+@pytest.fixture
+def detector():
+    return FaceDetector(detect_width=160, min_area=0.01, min_confidence=0.4, max_faces=5, margin=0.15)
+
+
+def test_detects_a_synthetic_face(detector):
+    [face] = detector.detect(frame_with_face())
+
+    assert face.confidence >= 0.4
+    # The box (with its margin) covers the ellipse and not much more
+    assert face.x <= 340 and face.x + face.width >= 460
+    assert face.y <= 162 and face.y + face.height >= 318
+    assert face.width < 200 and face.height < 250
+
+
+def test_no_skin_or_no_color_means_no_face(detector):
+    background = np.empty((480, 640, 3), dtype=np.uint8)
+    background[:] = BACKGROUND
+
+    assert detector.detect(background) == []
+    assert detector.detect(frame_with_face()[..., 0]) == []
+
+
+def test_specks_below_the_minimum_area_are_ignored(detector):
+    assert detector.detect(frame_with_face(width=20, height=26)) == []
+
+
+def test_primary_face_is_the_biggest_confident_box():
+    near = FaceBox(0, 0, 200, 260, 0.6)
+    far = FaceBox(300, 0, 60, 80, 0.9)
+
+    assert primary_face([far, near]) is near
+    assert primary_face([]) is None
+
+
+@pytest.fixture
+def roi_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "FACE_ROI_ENABLED", True)
+
+
+def test_face_region_crops_to_the_detected_face(roi_enabled):
+    image = frame_with_face()
+
+    region = SimpleFaceService()._face_region(image)
+
+    assert region.shape[0] < image.shape[0] and region.shape[1] < image.shape[1]
+    assert np.all(region[region.shape[0] // 2, region.shape[1] // 2] == SKIN)
+
+
+def test_face_region_falls_back_to_the_whole_frame(roi_enabled):
+    image = np.empty((480, 640, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+
+    assert SimpleFaceService()._face_region(image) is image
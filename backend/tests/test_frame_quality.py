@@ -0,0 +1,91 @@
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import app.api.v1.attendance as attendance_api
+from app.services import attendance_service
+from app.services.frame_quality import (
+    BLURRY, LOW_CONTRAST, OVEREXPOSED, TOO_DARK, UNDECODABLE, FrameQualityError, FrameQualityGate,
+)
+
+
+def encode(pixels: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8), "L").convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def flat(level: int) -> bytes:
+    return encode(np.full((240, 320), level))
+
+
+def textured() -> bytes:
+    blocks = np.random.default_rng(0).integers(30, 225, (30, 40))
+    return encode(np.kron(blocks, np.ones((8, 8))))
+
+
+def gradient() -> bytes:
+    # Plenty of contrast, no edges at all
+    return encode(np.tile(np.linspace(60, 200, 320), (240, 1)))
+
+
+@pytest.fixture
+def gate():
+    return FrameQualityGate(enabled=True)
+
+
+def test_textured_frame_passes(gate):
+    quality = gate.check(textured())
+
+    assert gate.min_brightness < quality.brightness < gate.max_brightness
+    assert quality.sharpness > gate.min_sharpness
+    assert gate.snapshot()["passed"] == 1
+
+
+@pytest.mark.parametrize("image, reason", [
+    (flat(10), TOO_DARK),
+    (flat(245), OVEREXPOSED),
+    (flat(128), LOW_CONTRAST),
+    (gradient(), BLURRY),
+    (b"not an image", UNDECODABLE),
+])
+def test_unusable_frames_are_rejected_with_their_reason(gate, image, reason):
+    with pytest.raises(FrameQualityError) as error:
+        gate.check(image)
+
+    assert error.value.reason == reason
+    assert error.value.code == f"frame_{reason}"
+    assert gate.snapshot()["rejected"][reason] == 1
+
+
+def test_disabled_gate_lets_everything_through():
+    assert FrameQualityGate(enabled=False).check(b"not an image") is None
+
+
+@pytest.fixture
+def enabled_gate(monkeypatch):
+    gate = FrameQualityGate(enabled=True)
+    monkeypatch.setattr(attendance_api, "get_frame_quality_gate", lambda: gate)
+    monkeypatch.setattr(attendance_service, "get_frame_quality_gate", lambda: gate)
+    return gate
+
+
+def test_check_in_answers_422_with_error_code(client, enabled_gate):
+    response = client.post("/api/v1/attendance/check-in", json={"image_data": base64.b64encode(flat(10)).decode()})
+
+    assert response.status_code == 422
+    assert response.headers["x-error-code"] == "frame_too_dark"
+    assert response.json()["detail"] == str(FrameQualityError(TOO_DARK))
+
+
+def test_offline_sync_reports_the_rejection_per_event(client, enabled_gate):
+    response = client.post("/api/v1/attendance/sync", json={"device_id": "kiosk-1", "events": [{
+        "image_data": base64.b64encode(gradient()).decode(), "timestamp": "2026-10-19T01:00:00Z",
+        "idempotency_key": "k1", "action": "check_in",
+    }]})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["status"] == "frame_blurry"
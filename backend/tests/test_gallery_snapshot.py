@@ -0,0 +1,80 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.gallery_snapshot import GallerySnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return GallerySnapshotStore(str(tmp_path / "gallery"))
+
+
+def gallery(rows, dims=8):
+    ids = [str(uuid.uuid4()) for _ in range(rows)]
+    matrix = np.random.default_rng(rows).random((rows, dims), dtype=np.float32)
+    return ids, matrix
+
+
+def test_published_snapshot_maps_back(store):
+    ids, matrix = gallery(5)
+
+    assert store.publish(3, ids, matrix)
+    mapped = store.load()
+
+    assert mapped.generation == 3
+    assert list(mapped.ids) == ids
+    assert mapped.ids[-1] == ids[-1]
+    np.testing.assert_array_equal(mapped.matrix, matrix)
+    assert not mapped.matrix.flags.writeable
+
+
+def test_empty_gallery_round_trips(store):
+    assert store.publish(1, [], np.zeros((0, 8), dtype=np.float32))
+
+    mapped = store.load()
+
+    assert len(mapped.ids) == 0
+    assert mapped.matrix.shape == (0, 8)
+
+
+def test_older_generation_does_not_replace_a_newer_snapshot(store):
+    newer_ids, newer = gallery(2)
+    store.publish(5, newer_ids, newer)
+
+    assert not store.publish(4, *gallery(3))
+    assert store.load().generation == 5
+    assert list(store.load().ids) == newer_ids
+
+
+def test_mapping_survives_a_republish(store):
+    ids, matrix = gallery(4)
+    store.publish(1, ids, matrix)
+    mapped = store.load()
+
+    store.publish(2, *gallery(6))
+
+    np.testing.assert_array_equal(mapped.matrix, matrix)
+    assert store.load().generation == 2
+
+
+def test_bump_counts_each_invalidation_once(store):
+    assert store.generation() == 0
+
+    assert store.bump("event-1") == 1
+    assert store.bump("event-1") == 1  # another worker handling the same event
+    assert store.bump("event-2") == 2
+    assert store.bump() == 3
+
+    # A second store on the same directory (another worker) sees the bumps
+    assert GallerySnapshotStore(store.directory).generation() == 3
+
+
+def test_missing_or_corrupt_snapshot_loads_as_none(store):
+    assert store.load() is None
+
+    with open(store.snapshot_path, "wb") as f:
+        f.write(b"not a snapshot" * 10)
+
+    assert store.load() is None
@@ -0,0 +1,78 @@
+"""Invalidation bus: NOTIFY payload limit and send failures"""
+
+import json
+
+import psycopg2
+import pytest
+
+from app.core.invalidation import ATTENDANCE, MAX_PAYLOAD_BYTES, InvalidationEvent, PostgresInvalidationBus
+
+
+class FakeCursor:
+    def __init__(self, errors):
+        self.errors = errors
+        self.sent = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(params[1])
+
+
+class FakeConnection:
+    def __init__(self, *errors):
+        self.cursor_ = FakeCursor(list(errors))
+
+    def cursor(self):
+        return self.cursor_
+
+
+@pytest.fixture
+def bus():
+    bus = PostgresInvalidationBus("postgresql://unused", "test_channel", debounce=0)
+    bus.start = lambda: None  # no listener thread: the tests drive the sends
+    return bus
+
+
+def test_oversized_event_is_sent_without_keys():
+    event = InvalidationEvent((ATTENDANCE,), "origin", 1, tuple(f"{i:036d}" for i in range(400)))
+
+    payload = event.to_payload()
+
+    assert len(payload.encode()) <= MAX_PAYLOAD_BYTES
+    assert json.loads(payload)["k"] == []
+    small = InvalidationEvent((ATTENDANCE,), "origin", 2, ("a", "b"))
+    assert json.loads(small.to_payload())["k"] == ["a", "b"]
+
+
+def test_rejected_event_is_dropped_and_counted(bus):
+    bus.publish(ATTENDANCE, keys=["a"])
+    bus.publish(ATTENDANCE, keys=["b"])
+    connection = FakeConnection(psycopg2.DataError("payload string too long"))
+
+    bus._send_pending(connection)
+
+    assert bus.failed == 1
+    [sent] = connection.cursor_.sent
+    assert json.loads(sent)["k"] == ["b"]
+
+
+def test_connection_error_requeues_and_only_a_send_resets_backoff(bus):
+    bus.publish(ATTENDANCE, keys=["a"])
+    bus._backoff = 8.0
+
+    with pytest.raises(psycopg2.OperationalError):
+        bus._send_pending(FakeConnection(psycopg2.OperationalError("server closed the connection")))
+    assert bus._backoff == 8.0
+
+    connection = FakeConnection()
+    bus._send_pending(connection)
+    assert [json.loads(payload)["k"] for payload in connection.cursor_.sent] == [["a"]]
+    assert bus._backoff == 1.0
+    assert bus.failed == 0
@@ -0,0 +1,19 @@
+import msgpack
+
+from app.core.kiosk_protocol import MSGPACK_MEDIA_TYPE
+
+
+def test_msgpack_check_in_round_trip(client, employees, face_service):
+    image = face_service.register(employees[0], (200, 10, 10))
+
+    response = client.post(
+        "/api/v1/attendance/check-in",
+        content=msgpack.packb({"image_data": image, "timestamp": "2026-10-19T01:00:00Z"}, use_bin_type=True),
+        headers={"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE},
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    result = msgpack.unpackb(response.content, raw=False)
+    assert result["employee_id"] == str(employees[0])
+    assert result["check_in_time"] == "2026-10-19T08:00:00"
@@ -0,0 +1,61 @@
+"""Leave workflow: calendar consistency, overlapping approvals, who may cancel"""
+
+from datetime import date
+
+import pytest
+
+from app.models.employee import Employee
+from app.models.leave import LeaveType
+from app.services.leave_service import LeaveCalendar, LeaveError, LeaveService
+
+
+@pytest.fixture
+def leaves(database, employees):
+    Session, _ = database
+    db = Session()
+    service = LeaveService(db, LeaveCalendar())
+    employee = db.get(Employee, employees[0])
+    yield service, employee
+    db.close()
+
+
+def request(service, employee, start, end):
+    return service.create_leave(employee, LeaveType.ANNUAL, start, end, "holiday")
+
+
+@pytest.mark.parametrize("preload", [False, True])
+def test_approve_then_cancel_keeps_the_calendar_consistent(leaves, preload):
+    service, employee = leaves
+    leave = request(service, employee, date(2026, 11, 2), date(2026, 11, 4))
+    if preload:
+        service.calendar.ensure_loaded(service.db)
+
+    service.approve(leave.id)
+    assert len(service.who_is_off(date(2026, 11, 3), date(2026, 11, 3))) == 1
+
+    service.cancel(leave.id)
+    assert service.who_is_off(date(2026, 11, 3), date(2026, 11, 3)) == []
+
+
+def test_overlapping_approval_is_rejected(leaves):
+    service, employee = leaves
+    first = request(service, employee, date(2026, 11, 2), date(2026, 11, 4))
+    second = request(service, employee, date(2026, 11, 4), date(2026, 11, 6))
+    service.approve(first.id)
+
+    with pytest.raises(LeaveError):
+        service.approve(second.id)
+    later = request(service, employee, date(2026, 11, 5), date(2026, 11, 6))
+    service.approve(later.id)
+
+
+def test_only_the_owner_or_an_admin_cancels(client, users, database, employees):
+    Session, _ = database
+    with Session() as db:
+        service = LeaveService(db, LeaveCalendar())
+        own = request(service, db.get(Employee, employees[0]), date(2026, 11, 2), date(2026, 11, 2)).id
+        other = request(service, db.get(Employee, employees[1]), date(2026, 11, 2), date(2026, 11, 2)).id
+
+    assert client.post(f"/api/v1/leaves/{other}/cancel", headers=users["staff"]).status_code == 403
+    assert client.post(f"/api/v1/leaves/{own}/cancel", headers=users["staff"]).status_code == 200
+    assert client.post(f"/api/v1/leaves/{other}/cancel", headers=users["admin"]).status_code == 200
@@ -0,0 +1,49 @@
+"""Payroll recalculation: derived statuses only, partition-friendly write-back"""
+
+from datetime import date, datetime, time
+
+from sqlalchemy import event, select
+
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.models.shift import EmployeeShift, WorkShift
+from app.services.payroll_service import PayrollService
+
+
+def test_recalculate_keeps_manual_statuses(database, employees):
+    Session, _ = database
+    with Session() as db:
+        shift = WorkShift(shift_name="Day", start_time=time(8), end_time=time(17),
+                          break_start=time(12), break_end=time(13))
+        db.add(shift)
+        db.flush()
+        for employee_id in employees[:2]:
+            db.add(EmployeeShift(employee_id=employee_id, shift_id=shift.id, effective_date=date(2026, 1, 1)))
+        records = {
+            "late": AttendanceRecord(employee_id=employees[0], check_in_time=datetime(2026, 10, 5, 8, 40),
+                                     check_out_time=datetime(2026, 10, 5, 17, 0), status=AttendanceStatus.ON_TIME),
+            "leave": AttendanceRecord(employee_id=employees[1], check_in_time=datetime(2026, 10, 5, 8, 40),
+                                      check_out_time=datetime(2026, 10, 5, 12, 0), status=AttendanceStatus.LEAVE),
+            "no_shift": AttendanceRecord(employee_id=employees[2], check_in_time=datetime(2026, 10, 5, 9, 0),
+                                         check_out_time=datetime(2026, 10, 5, 18, 0), status=AttendanceStatus.HOLIDAY),
+        }
+        db.add_all(records.values())
+        db.commit()
+        ids = {name: record.id for name, record in records.items()}
+
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        result = PayrollService(db).recalculate_month(2026, 10)
+
+    assert result["updated"] == 3 and result["late"] == 1
+    [write] = [s for s in statements if s.startswith("UPDATE attendance_records")]
+    assert "check_in_time = ?" in write.split("WHERE")[1]
+    with Session() as db:
+        stored = {name: db.get(AttendanceRecord, record_id) for name, record_id in ids.items()}
+    assert stored["late"].status == AttendanceStatus.LATE
+    assert stored["late"].late_minutes == 40
+    assert stored["late"].work_hours == 7.33
+    assert stored["leave"].status == AttendanceStatus.LEAVE
+    assert stored["leave"].work_hours == 3.33
+    assert stored["no_shift"].status == AttendanceStatus.HOLIDAY
+    assert stored["no_shift"].work_hours == 9.0
@@ -0,0 +1,72 @@
+"""Request profiler: admin-only API, one profiled request at a time, threadpool attribution"""
+
+import asyncio
+
+import pytest
+
+from app.core.profiling import RequestProfiler, _load_stats, profiled_threadpool, profiler
+
+
+def busy_work(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def function_names(stats_data: bytes) -> set:
+    return {name for _, _, name in _load_stats(stats_data).stats}
+
+
+@pytest.fixture(autouse=True)
+def disarmed():
+    yield
+    profiler.disarm()
+    profiler.clear()
+
+
+def test_profiling_api_is_admin_only(client, users):
+    assert client.get("/api/v1/admin/profiling/status").status_code == 401
+    assert client.get("/api/v1/admin/profiling/status", headers=users["staff"]).status_code == 403
+    assert client.post("/api/v1/admin/profiling/arm", json={"requests": 1}, headers=users["staff"]).status_code == 403
+    response = client.get("/api/v1/admin/profiling/status", headers=users["admin"])
+    assert response.status_code == 200 and response.json()["enabled"] is False
+
+
+def test_one_request_is_profiled_at_a_time():
+    request_profiler = RequestProfiler(keep_slowest=5)
+    request_profiler.arm(route_prefix="/api")
+
+    assert request_profiler.should_profile("/api/v1/a")
+    assert not request_profiler.should_profile("/api/v1/b")  # first one still active
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+
+    async def ignore(message):
+        pass
+
+    asyncio.run(request_profiler.profile_request(app, {"type": "http", "method": "GET", "path": "/api/v1/a"}, None, ignore))
+    assert request_profiler.should_profile("/api/v1/b")
+    [captured] = request_profiler.profiles()
+    assert captured.status_code == 204
+
+
+def test_threadpool_work_is_profiled_in_the_worker_thread():
+    request_profiler = RequestProfiler(keep_slowest=5)
+
+    async def app(scope, receive, send):
+        assert await profiled_threadpool(busy_work, 10000) == 333283335000
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def ignore(message):
+        pass
+
+    async def run():
+        await request_profiler.profile_request(app, {"type": "http", "method": "POST", "path": "/x"}, None, ignore)
+        # Outside a profiled request it is a plain threadpool call
+        assert await profiled_threadpool(busy_work, 10) == busy_work(10)
+
+    asyncio.run(run())
+    [captured] = request_profiler.profiles()
+    assert captured.thread_calls == 1
+    assert "busy_work" in function_names(captured.thread_stats_data)
+    assert "busy_work" not in function_names(captured.stats_data)
+    assert "Threadpool work of this request (1 calls)" in captured.top_functions()
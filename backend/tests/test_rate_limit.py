@@ -0,0 +1,84 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.admission import MUTATION, RECOGNITION, classify
+from app.core.config import settings
+from app.core.rate_limit import BucketRule, MemoryRateLimitStore, RateLimiter, RateLimitMiddleware
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # Slow refill so a test never earns a token back while it runs
+    limiter = RateLimiter(
+        MemoryRateLimitStore(), BucketRule.per_minute(1, 3), BucketRule.per_minute(60, 100), failure_cost=3.0,
+    )
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "get_rate_limiter", lambda: limiter)
+    return limiter
+
+
+@pytest.fixture
+def kiosk(limiter):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware)
+
+    @app.post("/api/v1/attendance/check-in")
+    def check_in(recognized: bool = True):
+        if not recognized:
+            raise HTTPException(status_code=404, detail="Face not recognized")
+        return {"status": "checked_in"}
+
+    @app.post("/api/v1/attendance/sync")
+    def sync():
+        return {"results": []}
+
+    @app.get("/api/v1/employees/E000")
+    def employee():
+        return {}
+
+    return TestClient(app)
+
+
+def test_offline_sync_is_a_recognition_request():
+    assert classify("POST", "/api/v1/attendance/sync") == RECOGNITION
+    assert classify("POST", "/api/v1/attendance/check-in") == RECOGNITION
+    assert classify("GET", "/api/v1/employees/E000") == MUTATION
+
+
+def test_empty_bucket_answers_429_with_retry_after(kiosk):
+    headers = {"X-Device-Id": "kiosk-1"}
+    for _ in range(3):
+        assert kiosk.post("/api/v1/attendance/check-in", headers=headers).status_code == 200
+
+    response = kiosk.post("/api/v1/attendance/check-in", headers=headers)
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    # Another kiosk and non-kiosk routes are unaffected
+    assert kiosk.post("/api/v1/attendance/check-in", headers={"X-Device-Id": "kiosk-2"}).status_code == 200
+    assert kiosk.get("/api/v1/employees/E000", headers=headers).status_code == 200
+
+
+def test_sync_batches_share_the_device_bucket(kiosk):
+    headers = {"X-Device-Id": "kiosk-1"}
+    for _ in range(3):
+        assert kiosk.post("/api/v1/attendance/sync", headers=headers).status_code == 200
+
+    assert kiosk.post("/api/v1/attendance/sync", headers=headers).status_code == 429
+    assert kiosk.post("/api/v1/attendance/check-in", headers=headers).status_code == 429
+
+
+def test_failed_recognition_costs_the_failure_penalty(kiosk, limiter):
+    headers = {"X-Device-Id": "kiosk-1"}
+
+    response = kiosk.post("/api/v1/attendance/check-in", params={"recognized": False}, headers=headers)
+
+    assert response.status_code == 404
+    # One failure drains all three tokens
+    limited = kiosk.post("/api/v1/attendance/check-in", headers=headers)
+    assert limited.status_code == 429
+    stats = {device["key"]: device for device in limiter.snapshot()["devices"]}
+    assert stats["device:kiosk-1"]["failures"] == 1
+    assert stats["device:kiosk-1"]["limited"] == 1
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models.user import RefreshToken, User
+from app.services.token_service import RefreshTokenService
+
+
+@pytest.fixture
+def login(database, users):
+    """Start a session for the admin the way /auth/login does, without the password hash"""
+    Session, _ = database
+
+    def start():
+        with Session() as db:
+            user = db.execute(select(User).where(User.username == "admin")).scalar_one()
+            _, raw = RefreshTokenService(db).issue(user)
+            db.commit()
+        return raw
+    return start
+
+
+def refresh(client, raw):
+    return client.post("/api/v1/auth/refresh", json={"refresh_token": raw})
+
+
+def test_refresh_rotates_the_token(client, login):
+    first = login()
+
+    response = refresh(client, first)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["refresh_token"] != first
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {body['access_token']}"})
+    assert me.status_code == 200
+    assert me.json()["username"] == "admin"
+    assert refresh(client, body["refresh_token"]).status_code == 200
+
+
+def test_reusing_a_rotated_token_revokes_its_family(client, database, login):
+    first = login()
+    other_session = login()
+    second = refresh(client, first).json()["refresh_token"]
+
+    reused = refresh(client, first)
+
+    assert reused.status_code == 401
+    assert reused.json()["detail"] == "Refresh token reuse detected; please log in again"
+    # The successor the thief or the victim holds is dead as well
+    assert refresh(client, second).status_code == 401
+    Session, _ = database
+    with Session() as db:
+        tokens = db.execute(select(RefreshToken)).scalars().all()
+        families = {}
+        for token in tokens:
+            families.setdefault(token.family_id, []).append(token.revoked_at is not None)
+        assert sorted(families.values()) == [[False], [True, True]]
+    # Another login of the same user is a separate family and keeps working
+    assert refresh(client, other_session).status_code == 200
+
+
+def test_expired_token_is_rejected(client, database, login):
+    raw = login()
+    Session, _ = database
+    with Session() as db:
+        db.execute(update(RefreshToken).values(expires_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.commit()
+
+    response = refresh(client, raw)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Refresh token expired"
+
+
+def test_tampered_token_is_rejected(client, login):
+    token_id, _, secret = login().partition(".")
+
+    assert refresh(client, f"{token_id}.{secret[::-1]}").status_code == 401
+    assert refresh(client, "garbage").status_code == 401
+
+
+def test_logout_revokes_the_session(client, login):
+    raw = login()
+
+    assert client.post("/api/v1/auth/logout", json={"refresh_token": raw}).status_code == 200
+    response = refresh(client, raw)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Refresh token revoked"
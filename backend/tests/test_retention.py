@@ -0,0 +1,63 @@
+"""Retention: complete archives and passes that tolerate concurrent workers"""
+
+import json
+import uuid
+from datetime import datetime, time
+
+from sqlalchemy import func, select
+
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.retention_service import ARCHIVE_COLUMNS, RetentionService, read_archive
+from tests.conftest import jpeg
+
+
+def test_archive_keeps_every_column(database, employees, tmp_path):
+    Session, _ = database
+    record_id = uuid.uuid4()
+    with Session() as db:
+        db.add(AttendanceRecord(
+            id=record_id, employee_id=employees[0], check_in_time=datetime(2020, 1, 6, 8, 5),
+            check_out_time=datetime(2020, 1, 6, 17, 0), scheduled_in=time(8, 0), scheduled_out=time(17, 0),
+            check_in_coords={"lat": 10.7769, "lng": 106.7009}, check_in_device={"id": "kiosk-1"},
+            status=AttendanceStatus.LATE, late_minutes=5, approved_by=employees[1], approval_notes="ok",
+        ))
+        db.commit()
+    service = RetentionService(session_factory=Session, bind=Session.kw["bind"])
+    service.archive_dir = str(tmp_path / "archive")
+
+    report = service.run(now=datetime(2026, 10, 19))
+
+    assert report.records_archived == 1 and not report.skipped
+    assert set(ARCHIVE_COLUMNS) == {column.key for column in AttendanceRecord.__table__.columns}
+    columns = read_archive(report.archive_files[0])
+    assert set(columns) == set(ARCHIVE_COLUMNS)
+    assert columns["id"][0] == str(record_id)
+    assert columns["approved_by"][0] == str(employees[1])
+    assert columns["scheduled_in"][0] == "08:00:00"
+    assert json.loads(columns["check_in_coords"][0]) == {"lat": 10.7769, "lng": 106.7009}
+    assert columns["check_out_coords"][0] == ""
+    with Session() as db:
+        assert db.scalar(select(func.count()).select_from(AttendanceRecord)) == 0
+
+
+def test_thumbnail_pass_tolerates_originals_removed_concurrently(database, employees, tmp_path, monkeypatch):
+    Session, _ = database
+    photo = tmp_path / "uploads" / "in.jpg"
+    photo.parent.mkdir()
+    photo.write_bytes(jpeg((120, 120, 120)))
+    with Session() as db:
+        db.add(AttendanceRecord(employee_id=employees[0], check_in_time=datetime(2026, 1, 5, 8, 0),
+                                check_in_image=str(photo)))
+        db.commit()
+    service = RetentionService(session_factory=Session, bind=Session.kw["bind"])
+    original_thumbnail = service._thumbnail
+
+    def thumbnail_then_lose_original(path):
+        thumb = original_thumbnail(path)
+        photo.unlink()  # another worker's pass got there first
+        return thumb
+
+    monkeypatch.setattr(service, "_thumbnail", thumbnail_then_lose_original)
+    report = service.run(now=datetime(2026, 10, 19))
+
+    assert report.thumbnailed == 1
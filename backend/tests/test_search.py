@@ -0,0 +1,68 @@
+"""In-memory employee search returns what the pg_trgm query would"""
+
+import uuid
+
+import pytest
+
+from app.services.search_service import SIMILARITY_THRESHOLD, NGramIndex, _rank, normalize, trigrams
+
+PEOPLE = [
+    ("E001", "Johnathan Smith", "john.smith@example.com"),
+    ("E002", "Nathan Lee", "nathan.lee@example.com"),
+    ("E010", "Anna Nguyen", "anna@example.com"),
+    ("E100", "Jonathan Tran", "jtran@example.com"),
+    ("X001", "Minh Pham", "minh@corp.example"),
+    ("E011", "Hanna Smithers", "hanna.s@example.com"),
+]
+
+
+def similarity(a: str, b: str) -> float:
+    a, b = trigrams(a), trigrams(b)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def fields(doc) -> list:
+    return [normalize(doc[name]) for name in ("employee_code", "full_name", "email")]
+
+
+def postgres_search(docs, query, limit):
+    """The ranking of EmployeeSearch._search_postgres, evaluated in Python"""
+    q = normalize(query)
+    hits = []
+    for doc in docs:
+        texts = fields(doc)
+        score = max(similarity(text, q) for text in texts)
+        if any(q in text for text in texts) or score >= SIMILARITY_THRESHOLD:
+            hits.append((_rank(*texts, q), score, doc["employee_code"]))
+    hits.sort(key=lambda hit: (-hit[0], -hit[1], hit[2]))
+    return [(code, rank) for rank, _, code in hits[:limit]]
+
+
+@pytest.fixture
+def docs():
+    return [
+        {"id": uuid.uuid4(), "employee_code": code, "full_name": name, "email": email,
+         "department_id": None, "position": None, "is_active": True}
+        for code, name, email in PEOPLE
+    ]
+
+
+@pytest.mark.parametrize("query", ["nathan", "001", "e01", "smith", "E001", "jonathon", "mi", "example", "han"])
+def test_matches_postgres_ranking(docs, query):
+    index = NGramIndex()
+    for doc in docs:
+        index.add(doc)
+
+    hits = index.search(query, limit=10)
+
+    ranked = [(hit.employee_code, _rank(*fields(vars(hit)), normalize(query))) for hit in hits]
+    assert ranked == postgres_search(docs, query, 10)
+
+
+def test_substrings_inside_words_are_found(docs):
+    index = NGramIndex()
+    for doc in docs:
+        index.add(doc)
+
+    assert "E001" in [hit.employee_code for hit in index.search("nathan")]
+    assert [hit.employee_code for hit in index.search("001")][:2] == ["E001", "X001"]
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.core.migrations import get_alembic_heads
+from app.models.user import User
+from app.services.simple_face_service import get_face_service
+
+
+@pytest.fixture
+def fresh_engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.setattr(main, "engine", engine)
+    monkeypatch.setattr(main, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    engine.dispose()
+
+
+def test_bootstrap_creates_tables_and_admin_on_an_unmanaged_database(fresh_engine, monkeypatch):
+    monkeypatch.setattr(main, "get_password_hash", lambda password: "-")
+
+    main.bootstrap_schema()
+
+    assert "employees" in inspect(fresh_engine).get_table_names()
+    with sessionmaker(bind=fresh_engine)() as db:
+        assert db.query(User).filter(User.username == "admin").count() == 1
+
+
+def test_bootstrap_leaves_a_migrated_database_alone(fresh_engine):
+    with fresh_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+        for head in get_alembic_heads():
+            connection.execute(text("INSERT INTO alembic_version VALUES (:head)"), {"head": head})
+
+    main.bootstrap_schema()
+
+    assert inspect(fresh_engine).get_table_names() == ["alembic_version"]
+
+
+def test_face_service_is_built_on_first_use():
+    get_face_service.cache_clear()
+
+    # Serving a request without lifespan (no warm-up) does not build it
+    assert TestClient(main.app).get("/health").status_code == 200
+    assert get_face_service.cache_info().currsize == 0
+
+    assert get_face_service() is get_face_service()
+    assert get_face_service.cache_info().currsize == 1
+
+
+def test_readiness_waits_for_the_gallery_warm_up(fresh_engine, monkeypatch):
+    get_face_service().invalidate_gallery()
+    with TestClient(main.app) as client:
+        assert client.get("/health").status_code == 200
+        deadline = time.monotonic() + 10
+        response = client.get("/health/ready")
+        while response.status_code == 503 and time.monotonic() < deadline:
+            assert response.json()["status"] == "starting"
+            time.sleep(0.05)
+            response = client.get("/health/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "face_gallery_loaded": True}
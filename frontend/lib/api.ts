@@ -6,6 +6,8 @@ import type {
   CheckInRequest,
   CheckInResponse,
   CheckOutResponse,
+  KioskSyncEvent,
+  KioskSyncResponse,
   AuthResponse,
   User
 } from '@/types';
@@ -27,16 +29,73 @@ api.interceptors.request.use((config) => {
     // eslint-disable-next-line @typescript-eslint/no-explicit-any
     (config.headers as any).Authorization = `Bearer ${token}`;
   }
+  // Echo the time of our last write so any backend worker keeps our reads on the primary
+  const lastWrite = typeof window !== 'undefined' ? sessionStorage.getItem('last_write') : null;
+  if (lastWrite) {
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    (config.headers as any)['X-Last-Write'] = lastWrite;
+  }
   return config;
 });
 
+const storeTokens = (data: AuthResponse) => {
+  if (typeof window === 'undefined') return;
+  if (data.access_token) localStorage.setItem('access_token', data.access_token);
+  if (data.refresh_token) localStorage.setItem('refresh_token', data.refresh_token);
+};
+
+const clearTokens = () => {
+  if (typeof window === 'undefined') return;
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+};
+
+// One refresh in flight at a time: concurrent 401s wait for the same rotation,
+// since presenting an already rotated refresh token revokes the session
+let refreshing: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = typeof window !== 'undefined' ? localStorage.getItem('refresh_token') : null;
+  if (!refreshToken) return Promise.resolve(null);
+  if (!refreshing) {
+    refreshing = axios
+      .post<AuthResponse>(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        storeTokens(response.data);
+        return response.data.access_token;
+      })
+      .catch(() => {
+        clearTokens();
+        return null;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
 // Add response interceptor for error handling
 api.interceptors.response.use(
-  (response) => response,
-  (error) => {
-    // Just clean up token on 401, but don't redirect automatically
+  (response) => {
+    const lastWrite = response.headers?.['x-last-write'];
+    if (lastWrite && typeof window !== 'undefined') sessionStorage.setItem('last_write', lastWrite);
+    return response;
+  },
+  async (error) => {
+    const original = error.config;
     if (error.response?.status === 401 && typeof window !== 'undefined') {
-      localStorage.removeItem('access_token');
+      // Renew with the refresh token once before giving up on the session
+      if (original && !original._retried && !original.url?.startsWith('/auth/')) {
+        original._retried = true;
+        const token = await refreshAccessToken();
+        if (token) {
+          // eslint-disable-next-line @typescript-eslint/no-explicit-any
+          (original.headers as any).Authorization = `Bearer ${token}`;
+          return api(original);
+        }
+      }
+      clearTokens();
       // Let components handle the redirect logic themselves
     }
     return Promise.reject(error);
@@ -47,9 +106,7 @@ api.interceptors.response.use(
 export const authApi = {
   login: async (username: string, password: string) => {
     const response = await api.post<AuthResponse>('/auth/login', { username, password });
-    if (response.data.access_token && typeof window !== 'undefined') {
-      localStorage.setItem('access_token', response.data.access_token);
-    }
+    storeTokens(response.data);
     return response.data;
   },
 
@@ -63,7 +120,12 @@ export const authApi = {
 
   logout: () => {
     if (typeof window !== 'undefined') {
-      localStorage.removeItem('access_token');
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (refreshToken) {
+        // Best effort: the session is forgotten locally either way
+        api.post('/auth/logout', { refresh_token: refreshToken }).catch(() => {});
+      }
+      clearTokens();
       // Don't force redirect here, let the calling component handle it
     }
   },
@@ -115,15 +177,39 @@ export const employeeApi = {
   },
 };
 
+// Stable per-browser kiosk id; the backend rate-limits check-ins per device
+const getDeviceId = () => {
+  if (typeof window === 'undefined') return undefined;
+  let deviceId = localStorage.getItem('device_id');
+  if (!deviceId) {
+    deviceId = typeof crypto !== 'undefined' && 'randomUUID' in crypto
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    localStorage.setItem('device_id', deviceId);
+  }
+  return deviceId;
+};
+
+const kioskHeaders = () => {
+  const deviceId = getDeviceId();
+  return deviceId ? { 'X-Device-Id': deviceId } : {};
+};
+
 // Attendance API
 export const attendanceApi = {
   checkIn: async (data: CheckInRequest) => {
-    const response = await api.post<CheckInResponse>('/attendance/check-in', data);
+    const response = await api.post<CheckInResponse>('/attendance/check-in', data, { headers: kioskHeaders() });
     return response.data;
   },
 
   checkOut: async (data: CheckInRequest) => {
-    const response = await api.post<CheckOutResponse>('/attendance/check-out', data);
+    const response = await api.post<CheckOutResponse>('/attendance/check-out', data, { headers: kioskHeaders() });
+    return response.data;
+  },
+
+  // Replay check-ins/outs queued while offline; resending the same keys is safe
+  syncOffline: async (events: KioskSyncEvent[]) => {
+    const response = await api.post<KioskSyncResponse>('/attendance/sync', { events }, { headers: kioskHeaders() });
     return response.data;
   },
 
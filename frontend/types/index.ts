@@ -49,6 +49,31 @@ export interface Employee {
     message: string;
     work_hours: number;
   }
+
+  export interface KioskSyncEvent extends CheckInRequest {
+    idempotency_key: string;
+    action: 'check_in' | 'check_out';
+    timestamp: string;  // when it happened, not when it is sent
+  }
+
+  export interface KioskSyncResult {
+    idempotency_key: string;
+    action: 'check_in' | 'check_out';
+    status: string;
+    success: boolean;
+    message: string;
+    employee_id: string | null;
+    employee_name: string | null;
+    attendance_id: string | null;
+    time: string | null;
+    replayed: boolean;
+  }
+
+  export interface KioskSyncResponse {
+    device_id: string;
+    results: KioskSyncResult[];
+    summary: Record<string, number>;
+  }
   export interface User {
     id: string;
     email: string;
@@ -59,5 +84,7 @@ export interface Employee {
   export interface AuthResponse {
     access_token: string;
     token_type: string;
+    refresh_token?: string;
+    expires_in?: number;
     user: User;
   }
\ No newline at end of file